@@ -1,12 +1,31 @@
 #!/usr/bin/env python3
-"""Simple file-driven CodexHive MCP client for manual orchestration."""
+"""CodexHive MCP driver for manual orchestration.
+
+Controllers connect to a Unix socket (``--socket``) and exchange
+newline-delimited JSON: requests are ``{"id", "action", "args"}`` objects and
+each reply echoes ``id`` on the connection that sent the request.
+``--file-commands`` additionally follows the old JSONL command file and
+appends results to the event file.
+"""
 
 from __future__ import annotations
 
+import argparse
+import ctypes
+import ctypes.util
 import json
+import os
+import queue
+import select
+import socket
+import stat
+import struct
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
 
 import sys
 
@@ -19,18 +38,500 @@ from dev_smoke_client import SmokeClient  # type: ignore  # pylint: disable=wron
 
 CMD_FILE = Path("/tmp/codexhive_cmds.jsonl")
 EVENT_FILE = Path("/tmp/codexhive_events.jsonl")
+POS_FILE = Path("/tmp/codexhive_cmds.pos")
+SOCKET_PATH = Path("/tmp/codexhive_driver.sock")
+# The event file is rolled to <name>.1 past this size, so it holds at most twice this much.
+EVENT_FILE_MAX_BYTES = 16 * 1024 * 1024
+CONTROL_MAX_LINE = 8 * 1024 * 1024
 POLL_INTERVAL = 0.5
+INOTIFY_SAFETY_TIMEOUT = 5.0
+DEFAULT_WORKERS = 8
+
+ACTIONS = {
+    "launch": "launch_codex",
+    "send_input": "send_input",
+    "read_output": "read_output",
+    "terminate": "terminate_instance",
+    "signal": "signal_instance",
+    "list_instances": "list_instances",
+    "status_report": "status_report",
+    "assign_role": "assign_role",
+    "checkpoint": "checkpoint_instance",
+    "ping": "ping",
+}
+NO_ARG_ACTIONS = {"list_instances", "status_report", "ping"}
+
+
+EventSink = Callable[[Dict[str, Any]], None]
+
+_EVENT_LOCK = threading.Lock()
+_EVENT_SINKS: List[EventSink] = []
+
+
+def add_event_sink(sink: EventSink) -> Callable[[], None]:
+    """Receive driver-wide events (warnings, server handshake); returns a removal hook."""
+    with _EVENT_LOCK:
+        _EVENT_SINKS.append(sink)
+
+    def remove() -> None:
+        with _EVENT_LOCK:
+            if sink in _EVENT_SINKS:
+                _EVENT_SINKS.remove(sink)
+
+    return remove
 
 
 def append_event(event: Dict[str, Any]) -> None:
-    EVENT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with EVENT_FILE.open("a", encoding="utf-8") as handle:
-        handle.write(json.dumps(event, separators=(",", ":")) + "\n")
+    with _EVENT_LOCK:
+        sinks = list(_EVENT_SINKS)
+    for sink in sinks:
+        sink(event)
+
+
+class EventLog:
+    """The compatibility event file, kept open and rolled to ``<name>.1`` past ``max_bytes``."""
+
+    def __init__(self, path: Path, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._handle: Optional[Any] = None
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        line = json.dumps(event, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._handle is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._handle = self.path.open("a", encoding="utf-8")
+            self._handle.write(line)
+            self._handle.flush()
+            if self.max_bytes and self._handle.tell() >= self.max_bytes:
+                self._handle.close()
+                self._handle = None
+                os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+
+class _Inotify:
+    """Minimal ctypes binding for inotify; raises OSError where unsupported."""
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, directory: Path, name: str) -> None:
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify unavailable")
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_FROM | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch({directory}) failed")
+        self.name = os.fsencode(name)
+
+    def wait(self, timeout: float) -> bool:
+        """Block until the watched file changes; False on timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if not ready:
+                return False
+            if self._drain():
+                return True
+
+    def _drain(self) -> bool:
+        relevant = False
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return relevant
+            offset = 0
+            while offset + self._EVENT.size <= len(data):
+                _, _, _, name_len = self._EVENT.unpack_from(data, offset)
+                start = offset + self._EVENT.size
+                name = data[start : start + name_len].rstrip(b"\0")
+                relevant = relevant or name == self.name
+                offset = start + name_len
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class CommandTailer:
+    """Follows the JSONL command file and remembers how far it got.
+
+    Blocks on inotify when the filesystem supports it and falls back to
+    polling every ``POLL_INTERVAL``.  The consumed position is persisted with
+    the file's inode so a restarted driver resumes instead of replaying, and a
+    truncated or rotated command file is read again from the start.
+    """
+
+    def __init__(self, path: Path, pos_path: Path) -> None:
+        self.path = path
+        self.pos_path = pos_path
+        self.path.touch(exist_ok=True)
+        self.inode, self.pos = self._load_position()
+        self.handle: Optional[Any] = None
+        self.partial = b""
+        self.closed = False
+        try:
+            self.notifier: Optional[_Inotify] = _Inotify(path.parent, path.name)
+        except OSError as exc:
+            append_event({"type": "warning", "warning": f"inotify unavailable ({exc}); polling every {POLL_INTERVAL}s"})
+            self.notifier = None
+
+    def _load_position(self) -> Tuple[Optional[int], int]:
+        try:
+            saved = json.loads(self.pos_path.read_text(encoding="utf-8"))
+            return int(saved["inode"]), int(saved["pos"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, 0
+
+    def commit(self, pos: int) -> None:
+        self.pos = pos
+        tmp = self.pos_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"inode": self.inode, "pos": pos}), encoding="utf-8")
+        os.replace(tmp, self.pos_path)
+
+    def read_lines(self) -> Iterator[Tuple[str, int]]:
+        """Yield complete new lines with the file position just after each."""
+        try:
+            stat: Optional[os.stat_result] = self.path.stat()
+        except FileNotFoundError:
+            stat = None
+        if self.handle is not None and (stat is None or stat.st_ino != self.inode):
+            # Rotated or removed: finish what was appended to the old file first.
+            yield from self._consume()
+            self._close_handle()
+        if stat is None:
+            return
+        if stat.st_ino != self.inode:
+            self.inode, self.pos, self.partial = stat.st_ino, 0, b""
+        elif stat.st_size < self.pos:
+            self.pos, self.partial = 0, b""
+        if self.handle is None:
+            self.handle = self.path.open("rb")
+        yield from self._consume()
+
+    def _consume(self) -> Iterator[Tuple[str, int]]:
+        assert self.handle is not None
+        base = self.pos
+        self.handle.seek(base + len(self.partial))
+        data = self.partial + self.handle.read()
+        start = 0
+        while True:
+            newline = data.find(b"\n", start)
+            if newline == -1:
+                break
+            line = data[start:newline].decode("utf-8", errors="replace")
+            start = newline + 1
+            self.partial = data[start:]
+            yield line, base + start
+        self.partial = data[start:]
+
+    def _close_handle(self) -> None:
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+    def wait(self) -> None:
+        if self.notifier is not None:
+            self.notifier.wait(INOTIFY_SAFETY_TIMEOUT)
+        else:
+            time.sleep(POLL_INTERVAL)
+
+    def close(self) -> None:
+        self.closed = True
+        self._close_handle()
+        if self.notifier is not None:
+            self.notifier.close()
+
+
+def dispatch(client: SmokeClient, action: Optional[str], args: Dict[str, Any]) -> Dict[str, Any]:
+    tool = ACTIONS.get(action or "")
+    if tool is None:
+        raise KeyError(f"Unknown action {action}")
+    return client.call_tool(tool, {} if action in NO_ARG_ACTIONS else args)
+
+
+Job = Tuple[Any, Optional[str], Dict[str, Any], float, EventSink]
+
+
+class CommandDispatcher:
+    """Runs commands on a bounded pool while keeping per-instance order.
+
+    Commands that name an ``instanceId`` are chained behind earlier commands
+    for the same instance; everything else (launch, ping, status_report, ...)
+    runs as soon as a worker is free.  With ``workers=1`` this degenerates to
+    the old one-at-a-time behaviour.
+    """
+
+    def __init__(self, run: Callable[[Optional[str], Dict[str, Any]], Dict[str, Any]], workers: int) -> None:
+        self._run = run
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="codexhive-dispatch")
+        self._lock = threading.Lock()
+        self._lanes: Dict[str, Deque[Job]] = {}
+        self._closed = False
+
+    def submit(self, cmd_id: Any, action: Optional[str], args: Dict[str, Any], reply: EventSink) -> None:
+        """Queue a command; its result event goes to ``reply`` (the issuing controller).
+
+        Once ``drain`` has started, commands are answered with an error event instead.
+        """
+        job = (cmd_id, action, args, time.time(), reply)
+        key = args.get("instanceId") if isinstance(args.get("instanceId"), str) else None
+        with self._lock:
+            accepted = not self._closed
+            if accepted and key is not None:
+                lane = self._lanes.get(key)
+                if lane is not None:
+                    lane.append(job)
+                    return
+                self._lanes[key] = deque()
+            if accepted:
+                # Submitted under the lock so drain cannot shut the pool down in between.
+                self._pool.submit(self._execute, job, key)
+        if not accepted:
+            reply({"id": cmd_id, "status": "error", "error": "driver is shutting down"})
+
+    def _execute(self, job: Job, key: Optional[str]) -> None:
+        cmd_id, action, args, enqueued_at, reply = job
+        timing = {"enqueuedAt": enqueued_at, "startedAt": time.time()}
+        try:
+            result = self._run(action, args)
+            event = {"id": cmd_id, "status": "ok", "result": result}
+        except KeyError as exc:
+            event = {"id": cmd_id, "status": "error", "error": str(exc.args[0])}
+        except Exception as exc:  # pragma: no cover
+            event = {"id": cmd_id, "status": "error", "error": str(exc)}
+        timing["finishedAt"] = time.time()
+        try:
+            reply({**event, **timing})
+        except Exception as exc:  # pragma: no cover
+            # Surface the lost reply to every controller and the event file, not the driver's stderr.
+            append_event({"type": "warning", "warning": f"reply to command {cmd_id!r} failed: {exc}"})
+        finally:
+            # Always hand the lane on, or later commands for this instance would wait forever.
+            if key is not None:
+                self._advance_lane(key)
+
+    def _advance_lane(self, key: str) -> None:
+        with self._lock:
+            lane = self._lanes[key]
+            if not lane:
+                del self._lanes[key]
+                return
+            next_job = lane.popleft()
+        self._pool.submit(self._execute, next_job, key)
+
+    def drain(self) -> None:
+        """Refuse new commands, then wait for queued ones, including chained per-instance ones."""
+        with self._lock:
+            self._closed = True
+        while True:
+            with self._lock:
+                busy = bool(self._lanes)
+            if not busy:
+                break
+            time.sleep(0.05)
+        self._pool.shutdown(wait=True)
+
+
+class ControlConnection:
+    """One controller on the control socket; replies are written only to it."""
+
+    def __init__(self, sock: socket.socket, number: int, handle: Callable[[Dict[str, Any], EventSink], None]) -> None:
+        self.sock = sock
+        self.number = number
+        self._handle = handle
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def send(self, event: Dict[str, Any]) -> None:
+        data = (json.dumps(event, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            if self.closed:
+                return
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                self.closed = True
+
+    def serve(self, hello: Dict[str, Any]) -> None:
+        remove_sink = add_event_sink(self.send)
+        self.send({**hello, "controller": self.number})
+        try:
+            reader = self.sock.makefile("rb")
+            while not self.closed:
+                line = reader.readline(CONTROL_MAX_LINE + 1)
+                if not line:
+                    break
+                if not line.endswith(b"\n") and len(line) > CONTROL_MAX_LINE:
+                    self.send({"type": "error", "error": f"request longer than {CONTROL_MAX_LINE} bytes"})
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    cmd = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    self.send({"type": "error", "error": f"Invalid JSON: {exc}", "raw": line.decode("utf-8", "replace")})
+                    continue
+                if not isinstance(cmd, dict):
+                    self.send({"type": "error", "error": "request must be a JSON object"})
+                    continue
+                self._handle(cmd, self.send)
+        except OSError:
+            pass
+        finally:
+            remove_sink()
+            with self._lock:
+                self.closed = True
+            self.sock.close()
+
+
+class ControlServer:
+    """Accepts any number of controllers on a Unix stream socket.
+
+    A stale socket left by a crashed driver is replaced; a live one (another
+    driver still answering) is an error.  The socket is created owner-only
+    and removed again by ``close``.
+    """
+
+    def __init__(self, path: Path, handle: Callable[[Dict[str, Any], EventSink], None], hello: Dict[str, Any]) -> None:
+        self.path = path
+        self._handle = handle
+        self._hello = hello
+        self._numbers = iter(range(1, 1 << 62))
+        self._claim_path()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(str(path))
+        os.chmod(path, 0o600)
+        self.sock.listen(16)
+        self._thread = threading.Thread(target=self._accept_loop, name="codexhive-control", daemon=True)
+        self._thread.start()
+
+    def _claim_path(self) -> None:
+        try:
+            mode = self.path.lstat().st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise RuntimeError(f"{self.path} exists and is not a socket")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(self.path))
+        except OSError:
+            self.path.unlink()
+        else:
+            raise RuntimeError(f"another driver is listening on {self.path}")
+        finally:
+            probe.close()
+
+    def _accept_loop(self) -> None:
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            controller = ControlConnection(conn, next(self._numbers), self._handle)
+            threading.Thread(
+                target=controller.serve,
+                args=(self._hello,),
+                name=f"codexhive-controller-{controller.number}",
+                daemon=True,
+            ).start()
+
+    def close(self) -> None:
+        self.sock.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def follow_command_file(tailer: CommandTailer, reply: EventSink, handle: Callable[[Dict[str, Any], EventSink], None]) -> None:
+    """Compatibility adapter: feed commands appended to the JSONL file, answering via ``reply``."""
+    try:
+        while not tailer.closed:
+            for line, next_pos in tailer.read_lines():
+                if tailer.closed:
+                    return  # left uncommitted, so the next driver picks it up
+                line = line.strip()
+                if not line:
+                    tailer.commit(next_pos)
+                    continue
+                try:
+                    cmd = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    reply({"type": "error", "error": f"Invalid JSON: {exc}", "raw": line})
+                    tailer.commit(next_pos)
+                    continue
+                tailer.commit(next_pos)
+                handle(cmd, reply)
+            tailer.wait()
+    except (OSError, ValueError):
+        # The tailer was closed under us during shutdown.
+        return
 
 
 def main() -> int:
+    parser = argparse.ArgumentParser(description="CodexHive MCP driver with a Unix-socket control plane")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Commands dispatched concurrently (1 = strictly sequential); order is kept per instanceId",
+    )
+    parser.add_argument("--socket", type=Path, default=SOCKET_PATH, help=f"Control socket path (default {SOCKET_PATH})")
+    parser.add_argument(
+        "--file-commands",
+        action="store_true",
+        help=f"Also follow {CMD_FILE} and append results to {EVENT_FILE} (rolled at {EVENT_FILE_MAX_BYTES} bytes)",
+    )
+    options = parser.parse_args()
+
     client = SmokeClient("python3", [str(MCP_DIR / "codexctl-mcp.py")], timeout=120.0)
+    dispatcher = CommandDispatcher(lambda action, args: dispatch(client, action, args), options.workers)
+    shutdown: "queue.Queue[Tuple[Any, EventSink]]" = queue.Queue()
+    event_log: Optional[EventLog] = None
+    tailer: Optional[CommandTailer] = None
+    control: Optional[ControlServer] = None
+
+    def handle(cmd: Dict[str, Any], reply: EventSink) -> None:
+        if cmd.get("action") == "shutdown":
+            shutdown.put((cmd.get("id"), reply))
+            return
+        dispatcher.submit(cmd.get("id"), cmd.get("action"), cmd.get("args") or {}, reply)
+
     try:
+        if options.file_commands:
+            event_log = EventLog(EVENT_FILE, EVENT_FILE_MAX_BYTES)
+            add_event_sink(event_log)
         ready = client.read()
         append_event({"type": "serverReady", "payload": ready})
         init = client.request(
@@ -42,63 +543,34 @@ def main() -> int:
             },
         )
         append_event({"type": "initialize", "payload": init})
+        client.notify("notifications/initialized")
         tools = client.request("tools/list", {})
         append_event({"type": "tools", "payload": tools})
 
-        last_pos = 0
-        CMD_FILE.touch(exist_ok=True)
-        while True:
-            with CMD_FILE.open("r", encoding="utf-8") as handle:
-                handle.seek(last_pos)
-                while True:
-                    line = handle.readline()
-                    if not line:
-                        break
-                    last_pos = handle.tell()
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        cmd = json.loads(line)
-                    except json.JSONDecodeError as exc:
-                        append_event({"type": "error", "error": f"Invalid JSON: {exc}", "raw": line})
-                        continue
-                    cmd_id = cmd.get("id")
-                    action = cmd.get("action")
-                    args = cmd.get("args") or {}
-                    try:
-                        if action == "shutdown":
-                            append_event({"id": cmd_id, "status": "ok", "result": "shutting down"})
-                            return 0
-                        elif action == "launch":
-                            result = client.call_tool("launch_codex", args)
-                        elif action == "send_input":
-                            result = client.call_tool("send_input", args)
-                        elif action == "read_output":
-                            result = client.call_tool("read_output", args)
-                        elif action == "terminate":
-                            result = client.call_tool("terminate_instance", args)
-                        elif action == "signal":
-                            result = client.call_tool("signal_instance", args)
-                        elif action == "list_instances":
-                            result = client.call_tool("list_instances", {})
-                        elif action == "status_report":
-                            result = client.call_tool("status_report", {})
-                        elif action == "assign_role":
-                            result = client.call_tool("assign_role", args)
-                        elif action == "checkpoint":
-                            result = client.call_tool("checkpoint_instance", args)
-                        elif action == "ping":
-                            result = client.call_tool("ping", {})
-                        else:
-                            append_event({"id": cmd_id, "status": "error", "error": f"Unknown action {action}"})
-                            continue
-                        append_event({"id": cmd_id, "status": "ok", "result": result})
-                    except Exception as exc:  # pragma: no cover
-                        append_event({"id": cmd_id, "status": "error", "error": str(exc)})
-            time.sleep(POLL_INTERVAL)
+        hello = {"type": "hello", "actions": sorted([*ACTIONS, "shutdown"]), "pid": os.getpid()}
+        control = ControlServer(options.socket, handle, hello)
+        if event_log is not None:
+            tailer = CommandTailer(CMD_FILE, POS_FILE)
+            threading.Thread(
+                target=follow_command_file, args=(tailer, event_log, handle), name="codexhive-cmdfile", daemon=True
+            ).start()
+
+        cmd_id, reply = shutdown.get()
+        # Stop taking commands before draining; anything that still slips in is refused, not lost.
+        if tailer is not None:
+            tailer.close()
+        control.close()
+        dispatcher.drain()
+        reply({"id": cmd_id, "status": "ok", "result": "shutting down"})
+        return 0
     finally:
+        if control is not None:
+            control.close()
+        if tailer is not None:
+            tailer.close()
         client.close()
+        if event_log is not None:
+            event_log.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,169 @@
+"""Incremental ANSI normalizer that turns a raw terminal stream into plain lines."""
+from __future__ import annotations
+
+import codecs
+import re
+from typing import List, Optional
+
+from vterm import ESCAPE_SEQUENCE, PARTIAL_ESCAPE
+
+_CONTROL = re.compile(r"[\x00-\x1f\x7f]")
+_SPINNER_PREFIX = re.compile(r"^[\s⠀-⣿○-●◐-◓◴-◷✶-✽|/\\*·•-]+")
+_VOLATILE = re.compile(r"\d+(?:\.\d+)?\s*(?:ms|s|m|%|/s)\b|\d+/\d+|\d+(?:\.\d+)?\s*[KMG]i?B\b")
+ROW_MOVES = set("ABEFHdf")
+MAX_PENDING_CHARS = 65_536
+
+
+class AnsiNormalizer:
+    """Strips SGR/OSC/cursor sequences and collapses carriage-return redraws.
+
+    ``feed`` returns only newly *committed* text (complete lines ending in
+    ``\\n``); the line still being drawn is available as ``partial``.  Lines
+    that differ from the previous one only by spinner glyphs, counters,
+    percentages or durations are treated as repeats: the first of a run is
+    emitted immediately and the last one once the run ends, so progress bars
+    collapse to their start and final state.
+    """
+
+    def __init__(self, max_line_chars: int = 4096) -> None:
+        self.max_line_chars = max_line_chars
+        self.raw_bytes = 0
+        self.clean_bytes = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = ""
+        self._line: List[str] = []
+        self._col = 0
+        self._out: List[str] = []
+        self._last_key: Optional[str] = None
+        self._last_text = ""
+        self._held: Optional[str] = None
+
+    @property
+    def partial(self) -> str:
+        current = "".join(self._line).rstrip()
+        if self._held is not None:
+            return self._held + ("\n" + current if current else "")
+        return current
+
+    def feed(self, data: bytes) -> str:
+        self.raw_bytes += len(data)
+        text = self._pending + self._decoder.decode(data)
+        self._pending = ""
+        self._process(text)
+        if not self._out:
+            return ""
+        committed = "".join(self._out)
+        self._out = []
+        self.clean_bytes += len(committed.encode("utf-8"))
+        return committed
+
+    def finish(self) -> str:
+        """End of stream: commit a held repeat line so the final progress state is emitted."""
+        self._flush_held()
+        if not self._out:
+            return ""
+        committed = "".join(self._out)
+        self._out = []
+        self.clean_bytes += len(committed.encode("utf-8"))
+        return committed
+
+    def _process(self, text: str) -> None:
+        pos = 0
+        length = len(text)
+        while pos < length:
+            match = _CONTROL.search(text, pos)
+            end = match.start() if match else length
+            if end > pos:
+                self._put_text(text[pos:end])
+            if match is None:
+                return
+            char = text[end]
+            pos = end + 1
+            if char == "\n":
+                self._commit()
+            elif char == "\r":
+                self._col = 0
+            elif char == "\b":
+                self._col = max(0, self._col - 1)
+            elif char == "\t":
+                self._put_text(" " * (8 - self._col % 8))
+            elif char == "\x1b":
+                seq = ESCAPE_SEQUENCE.match(text, end)
+                if seq is None:
+                    if PARTIAL_ESCAPE.match(text, end) and length - end <= MAX_PENDING_CHARS:
+                        self._pending = text[end:]
+                        return
+                    continue
+                pos = seq.end()
+                final = seq.group("csi_final")
+                if final and not seq.group("csi_inter") and not seq.group("csi_params").startswith("?"):
+                    self._csi(seq.group("csi_params"), final)
+
+    def _csi(self, raw_params: str, final: str) -> None:
+        params = [int(part) if part.isdigit() else 0 for part in raw_params.split(";")] if raw_params else []
+        first = params[0] if params else 0
+        if final == "K":
+            if first == 0:
+                del self._line[self._col :]
+            elif first == 1:
+                self._line[: self._col] = [" "] * min(self._col, len(self._line))
+            else:
+                self._line.clear()
+        elif final == "J" and first == 2:
+            self._line.clear()
+        elif final == "G":
+            self._col = max(0, (first or 1) - 1)
+        elif final == "C":
+            self._col += first or 1
+        elif final == "D":
+            self._col = max(0, self._col - (first or 1))
+        elif final == "X":
+            self._put_text(" " * (first or 1), advance=False)
+        elif final in ROW_MOVES:
+            # Full-screen redraws position rows explicitly; treat a row change as a line break.
+            if "".join(self._line).strip():
+                self._commit()
+            self._line.clear()
+            self._col = max(0, (params[1] if len(params) > 1 else 1) - 1) if final in "Hf" else 0
+
+    def _put_text(self, text: str, advance: bool = True) -> None:
+        line = self._line
+        col = self._col
+        if col > len(line):
+            line.extend(" " * (col - len(line)))
+        if col == len(line):
+            line.extend(text)
+        else:
+            line[col : col + len(text)] = text
+        if len(line) > self.max_line_chars:
+            del line[self.max_line_chars :]
+        if advance:
+            self._col = min(col + len(text), self.max_line_chars)
+
+    def _commit(self) -> None:
+        text = "".join(self._line).rstrip()
+        self._line.clear()
+        self._col = 0
+        if not text:
+            if self._last_text or self._held is not None:
+                self._flush_held()
+                self._emit("")
+            return
+        key = _VOLATILE.sub("#", _SPINNER_PREFIX.sub("", text))
+        if key == self._last_key:
+            self._held = text if text != self._last_text else None
+            return
+        self._flush_held()
+        self._last_key = key
+        self._emit(text)
+
+    def _flush_held(self) -> None:
+        if self._held is not None:
+            held, self._held = self._held, None
+            self._emit(held)
+
+    def _emit(self, text: str) -> None:
+        self._last_text = text
+        if not text:
+            self._last_key = None
+        self._out.append(text + "\n")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Benchmark the clean output channel on recorded transcripts.
+
+Feeds each transcript through AnsiNormalizer in read-sized chunks (as
+the server's clean-channel thread does) and reports the compression ratio against the raw
+stream and the processing cost per MB.
+
+    python3 mcp/bench_ansi_clean.py                       # bundled fixture
+    python3 mcp/bench_ansi_clean.py instances/*/output.log
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from ansi_clean import AnsiNormalizer
+
+DEFAULT_FIXTURE = Path(__file__).with_name("fixtures") / "codex_transcript.log"
+CHUNK_BYTES = 4096
+
+
+def _measure(path: Path, repeat: int) -> Dict[str, float]:
+    data = path.read_bytes()
+    best = float("inf")
+    clean_bytes = 0
+    for _ in range(repeat):
+        normalizer = AnsiNormalizer()
+        started = time.perf_counter()
+        for offset in range(0, len(data), CHUNK_BYTES):
+            normalizer.feed(data[offset : offset + CHUNK_BYTES])
+        best = min(best, time.perf_counter() - started)
+        clean_bytes = normalizer.clean_bytes
+    raw_mb = len(data) / (1024 * 1024)
+    return {
+        "rawBytes": len(data),
+        "cleanBytes": clean_bytes,
+        "ratio": len(data) / clean_bytes if clean_bytes else float("inf"),
+        "msPerMB": best * 1000 / raw_mb if raw_mb else 0.0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure AnsiNormalizer compression and throughput")
+    parser.add_argument("paths", nargs="*", type=Path, default=[DEFAULT_FIXTURE], help="Transcript files to replay")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per file; the fastest is reported")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable results")
+    args = parser.parse_args()
+
+    results: List[Dict[str, object]] = []
+    for path in args.paths:
+        results.append({"path": str(path), **_measure(path, max(1, args.repeat))})
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{'raw':>10} {'clean':>10} {'ratio':>7} {'ms/MB':>8}  path")
+    for row in results:
+        print(f"{row['rawBytes']:>10} {row['cleanBytes']:>10} {row['ratio']:>6.1f}x {row['msPerMB']:>8.1f}  {row['path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""Load benchmark: drive a local codexctl-mcp.py with synthetic workers.
+
+Starts the server over stdio, launches ``--workers`` synthetic workers (this
+script in ``worker`` mode, started through ``shellCommand``) that emit output
+at a fixed rate in one of several patterns, and drives ``send_input``,
+``read_output`` and ``status_report`` at target rates.  Calls are issued
+open-loop (a slow reply never delays the next call), so latencies include
+queueing inside the server.  Prints one JSON document with per-tool client
+latency, throughput, dropped bytes and server CPU/RSS.  No Codex binary needed.
+
+    python3 mcp/bench_load.py --workers 8 --pattern bursty --rate 262144 --seconds 10
+    python3 mcp/bench_load.py --pattern cursor --pty --output bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import select
+import shlex
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from dev_smoke_client import DEFAULT_SERVER, SmokeClient
+
+PATTERNS = ("steady", "bursty", "ansi", "cursor")
+TICK_SECONDS = 0.01
+BURST_SECONDS = 0.5
+MAX_IN_FLIGHT = 256
+SETTLE_SECONDS = 0.5
+SPINNER = "|/-\\"
+
+
+# --- synthetic worker -------------------------------------------------------
+
+def _line(pattern: str, seq: int) -> bytes:
+    if pattern == "ansi":
+        # Colored log line plus a spinner redraw, like a TUI progress display.
+        return (
+            f"\x1b[32m[ok]\x1b[0m \x1b[1mstep {seq:08d}\x1b[22m working \x1b[36m{SPINNER[seq % 4]}\x1b[0m\r"
+            f"\x1b[2K\x1b[33mstep {seq:08d} done\x1b[0m\n"
+        ).encode("ascii")
+    if pattern == "cursor":
+        return f"\x1b[6nline {seq:08d} asks for the cursor position\n".encode("ascii")
+    return f"line {seq:08d} {'x' * 64}\n".encode("ascii")
+
+
+def _worker(pattern: str, rate: int, seconds: float) -> int:
+    """Emit ``rate`` bytes/s for ``seconds``, drain stdin, then idle until killed."""
+    out = sys.stdout.fileno()
+    stdin = sys.stdin.fileno()
+    interval = BURST_SECONDS if pattern == "bursty" else TICK_SECONDS
+    started = time.monotonic()
+    emitted = 0
+    seq = 0
+    while True:
+        elapsed = time.monotonic() - started
+        if elapsed >= seconds:
+            break
+        budget = int(rate * min(seconds, elapsed + interval)) - emitted
+        pieces: List[bytes] = []
+        while budget > 0:
+            piece = _line(pattern, seq)
+            seq += 1
+            pieces.append(piece)
+            budget -= len(piece)
+        if pieces:
+            payload = b"".join(pieces)
+            view = memoryview(payload)
+            while view:
+                view = view[os.write(out, view) :]
+            emitted += len(payload)
+        _drain_stdin(stdin, interval)
+    os.write(out, f"bench-done bytes={emitted}\n".encode("ascii"))
+    while _drain_stdin(stdin, 1.0):
+        pass
+    return 0
+
+
+def _drain_stdin(fd: int, timeout: float) -> bool:
+    """Discard pending input (echoes and cursor replies); False once stdin is closed."""
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return True
+        ready, _, _ = select.select([fd], [], [], remaining)
+        if ready and not os.read(fd, 65536):
+            return False
+
+
+# --- driver -----------------------------------------------------------------
+
+class _Recorder:
+    """Collects client-side latencies per tool from completion callbacks."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.in_flight = 0
+        self.skipped = 0
+        self.received_bytes: Dict[str, int] = {}
+
+    def fire(self, client: SmokeClient, tool: str, arguments: Dict[str, Any]) -> Optional[Future[Dict[str, Any]]]:
+        with self.lock:
+            if self.in_flight >= MAX_IN_FLIGHT:
+                self.skipped += 1
+                return None
+            self.in_flight += 1
+        started = time.perf_counter()
+        future = client.call_tool_async(tool, arguments)
+        future.add_done_callback(lambda done: self._finish(tool, arguments, started, done))
+        return future
+
+    def _finish(self, tool: str, arguments: Dict[str, Any], started: float, future: Future[Dict[str, Any]]) -> None:
+        elapsed = time.perf_counter() - started
+        try:
+            payload = _structured(future.result())
+        except Exception:
+            payload = None
+        with self.lock:
+            self.in_flight -= 1
+            self.latencies.setdefault(tool, []).append(elapsed)
+            if payload is None:
+                self.errors[tool] = self.errors.get(tool, 0) + 1
+            elif tool == "read_output":
+                instance_id = arguments["instanceId"]
+                self.received_bytes[instance_id] = self.received_bytes.get(instance_id, 0) + len(payload.get("output", ""))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self.lock:
+            tools = {name: sorted(values) for name, values in self.latencies.items()}
+            errors = dict(self.errors)
+        return {
+            name: {
+                "calls": len(values),
+                "errors": errors.get(name, 0),
+                "p50Ms": round(_percentile(values, 0.50) * 1000, 3),
+                "p99Ms": round(_percentile(values, 0.99) * 1000, 3),
+                "maxMs": round(values[-1] * 1000, 3),
+            }
+            for name, values in tools.items()
+        }
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(q * len(values) + 0.5) - 1))]
+
+
+def _structured(response: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    result = response.get("result")
+    if not isinstance(result, dict) or result.get("isError"):
+        return None
+    return result.get("structuredContent") or {}
+
+
+def _call(client: SmokeClient, tool: str, arguments: Dict[str, Any], timeout: float = 60.0) -> Dict[str, Any]:
+    response = client.call_tool(tool, arguments, timeout)
+    payload = _structured(response)
+    if payload is None:
+        raise RuntimeError(f"{tool} failed: {json.dumps(response)[:500]}")
+    return payload
+
+
+def _proc_usage(pid: int) -> Dict[str, float]:
+    """CPU seconds (user+sys) and current/peak RSS of ``pid`` from /proc."""
+    usage = {"cpuSeconds": 0.0, "rssBytes": 0.0, "peakRssBytes": 0.0}
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        usage["cpuSeconds"] = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                usage["rssBytes"] = float(int(line.split()[1]) * 1024)
+            elif line.startswith("VmHWM:"):
+                usage["peakRssBytes"] = float(int(line.split()[1]) * 1024)
+    except (OSError, IndexError, ValueError):
+        pass
+    return usage
+
+
+def _worker_spec(index: int, args: argparse.Namespace) -> Dict[str, Any]:
+    argv = [
+        sys.executable, str(Path(__file__).resolve()), "worker",
+        "--pattern", args.pattern, "--rate", str(args.rate), "--seconds", str(args.seconds),
+    ]
+    spec: Dict[str, Any] = {"name": f"bench-{index}", "usePty": args.pty}
+    if args.direct:
+        spec.update(command=argv[0], args=argv[1:])
+    else:
+        spec["shellCommand"] = "exec " + " ".join(shlex.quote(part) for part in argv)
+    return spec
+
+
+def _handshake(client: SmokeClient) -> None:
+    client.read(timeout=30.0)  # notifications/serverReady
+    client.request(
+        "initialize",
+        {"protocolVersion": "1.0", "capabilities": {}, "clientInfo": {"name": "codexhive-bench", "version": "dev"}},
+        timeout=30.0,
+    )
+    client.notify("notifications/initialized")
+
+
+def _drive(client: SmokeClient, recorder: _Recorder, ids: List[str], args: argparse.Namespace) -> float:
+    """Issue calls on a fixed schedule for ``args.seconds``; returns the measured wall time."""
+    schedule = [
+        ("send_input", args.input_rate * len(ids)),
+        ("read_output", args.read_rate * len(ids)),
+        ("status_report", args.status_rate),
+    ]
+    next_due = {tool: 0.0 for tool, rate in schedule if rate > 0}
+    turn = {tool: 0 for tool in next_due}
+    started = time.monotonic()
+    while True:
+        now = time.monotonic() - started
+        if now >= args.seconds:
+            return now
+        for tool, rate in schedule:
+            if rate <= 0:
+                continue
+            while next_due[tool] <= now:
+                target = ids[turn[tool] % len(ids)]
+                turn[tool] += 1
+                next_due[tool] += 1.0 / rate
+                if tool == "send_input":
+                    recorder.fire(client, tool, {"instanceId": target, "text": f"bench input {turn[tool]}"})
+                elif tool == "read_output":
+                    recorder.fire(client, tool, {"instanceId": target, "maxBytes": args.read_max_bytes})
+                else:
+                    recorder.fire(client, tool, {})
+        time.sleep(max(0.0, min(next_due.values(), default=args.seconds) - (time.monotonic() - started)))
+
+
+def _bench(args: argparse.Namespace) -> Dict[str, Any]:
+    client = SmokeClient(args.server_cmd, [args.server], timeout=30.0)
+    recorder = _Recorder()
+    try:
+        _handshake(client)
+        server_pid = client.proc.pid
+        launched = _call(
+            client,
+            "launch_many",
+            {
+                "specs": [_worker_spec(index, args) for index in range(args.workers)],
+                "maxParallel": args.workers,
+            },
+            timeout=120.0,
+        )
+        ids = [entry["id"] for entry in launched["instances"] if entry.get("id")]
+        if len(ids) != args.workers:
+            raise RuntimeError(f"launch_many started {len(ids)}/{args.workers} workers: {launched.get('errors')}")
+        before = _proc_usage(server_pid)
+        elapsed = _drive(client, recorder, ids, args)
+        after = _proc_usage(server_pid)
+        deadline = time.monotonic() + 30.0
+        while recorder.in_flight and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(SETTLE_SECONDS)
+        for instance_id in ids:
+            while True:
+                tail = _call(client, "read_output", {"instanceId": instance_id, "maxBytes": 1 << 30})
+                got = len(tail.get("output", ""))
+                recorder.received_bytes[instance_id] = recorder.received_bytes.get(instance_id, 0) + got
+                if not got:
+                    break
+        server_metrics = _call(client, "metrics", {})
+        for instance_id in ids:
+            _call(client, "terminate_instance", {"instanceId": instance_id, "force": True})
+    finally:
+        client.close()
+
+    server_read = {row["id"]: row for row in server_metrics.get("instances", []) if row["id"] in ids}
+    read_by_server = sum(row["bytesRead"] for row in server_read.values())
+    received = sum(recorder.received_bytes.get(instance_id, 0) for instance_id in ids)
+    latencies = recorder.summary()
+    calls = sum(entry["calls"] for tool, entry in latencies.items())
+    return {
+        "config": {
+            "workers": args.workers,
+            "pattern": args.pattern,
+            "ratePerWorker": args.rate,
+            "seconds": args.seconds,
+            "pty": args.pty,
+            "direct": args.direct,
+            "inputRate": args.input_rate,
+            "readRate": args.read_rate,
+            "statusRate": args.status_rate,
+            "readMaxBytes": args.read_max_bytes,
+        },
+        "elapsedSeconds": round(elapsed, 3),
+        "tools": latencies,
+        "throughput": {
+            "callsPerSecond": round(calls / elapsed, 1) if elapsed else 0.0,
+            "callsSkipped": recorder.skipped,
+            "bytesReadByServer": read_by_server,
+            "bytesReceived": received,
+            "receivedBytesPerSecond": round(received / elapsed, 1) if elapsed else 0.0,
+            "droppedBytes": max(0, read_by_server - received),
+        },
+        "server": {
+            "cpuSeconds": round(after["cpuSeconds"] - before["cpuSeconds"], 3),
+            "cpuPercent": round((after["cpuSeconds"] - before["cpuSeconds"]) / elapsed * 100, 1) if elapsed else 0.0,
+            "rssBytes": int(after["rssBytes"]),
+            "peakRssBytes": int(after["peakRssBytes"]),
+            "lockWaitSeconds": round(sum(row["lockWaitSeconds"] for row in server_read.values()), 6),
+            "cursorReplies": sum(row["cursorReplies"] for row in server_read.values()),
+            "handlerP99Seconds": {
+                name: entry["handler"]["p99Seconds"]
+                for name, entry in server_metrics.get("tools", {}).items()
+                if entry.get("handler") and entry["handler"]["count"]
+            },
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["worker"]:
+        parser = argparse.ArgumentParser(description="Synthetic worker for bench_load.py")
+        parser.add_argument("--pattern", choices=PATTERNS, default="steady")
+        parser.add_argument("--rate", type=int, default=65_536, help="Bytes per second")
+        parser.add_argument("--seconds", type=float, default=10.0)
+        worker = parser.parse_args(argv[1:])
+        return _worker(worker.pattern, worker.rate, worker.seconds)
+
+    parser = argparse.ArgumentParser(description="Load benchmark for the codexhive MCP server")
+    parser.add_argument("--server-cmd", default=sys.executable, help="Interpreter used to start the server")
+    parser.add_argument("--server", default=DEFAULT_SERVER, help="Path to codexctl-mcp.py")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--pattern", choices=PATTERNS, default="steady")
+    parser.add_argument("--rate", type=int, default=65_536, help="Output bytes per second per worker")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Measured duration")
+    parser.add_argument("--pty", action="store_true", help="Run workers under a PTY instead of pipes")
+    parser.add_argument("--direct", action="store_true", help="Exec workers directly instead of via shellCommand (bash -lc)")
+    parser.add_argument("--input-rate", type=float, default=2.0, help="send_input calls per second per worker")
+    parser.add_argument("--read-rate", type=float, default=10.0, help="read_output calls per second per worker")
+    parser.add_argument("--status-rate", type=float, default=1.0, help="status_report calls per second")
+    parser.add_argument("--read-max-bytes", type=int, default=65_536, help="maxBytes passed to read_output")
+    parser.add_argument("--output", type=Path, help="Also write the JSON report here")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    report = _bench(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Microbenchmark: OutputRing versus the old bytearray slicing buffer.
+
+Simulates a worker producing output at 1/10/100 MB/s in READ_CHUNK-sized reads
+while an orchestrator polls ``read_output`` ten times per second, and reports
+how much of one core each buffer strategy needs to keep up.
+
+    python3 mcp/bench_output_ring.py [--seconds 2] [--capacity 131072]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Callable, Dict, List
+
+from output_ring import OutputRing
+
+READ_CHUNK = 4096
+READS_PER_SECOND = 10
+READ_MAX_BYTES = 4096
+RATES_MB = (1, 10, 100)
+
+
+class SliceBuffer:
+    """The pre-ring strategy from _collect_output_locked/read_output."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.buffer = bytearray()
+        self.read_cursor = 0
+
+    def append(self, chunk: bytes) -> None:
+        self.buffer.extend(chunk)
+        if len(self.buffer) > self.capacity:
+            drop = len(self.buffer) - self.capacity
+            self.buffer = self.buffer[drop:]
+            self.read_cursor = max(0, self.read_cursor - drop)
+
+    def read(self, max_bytes: int) -> bytes:
+        new_bytes = self.buffer[self.read_cursor :]
+        self.read_cursor = len(self.buffer)
+        if max_bytes and len(new_bytes) > max_bytes:
+            new_bytes = new_bytes[-max_bytes:]
+        return bytes(new_bytes)
+
+
+class RingAdapter:
+    def __init__(self, capacity: int) -> None:
+        self.ring = OutputRing(capacity)
+        self.read_cursor = 0
+
+    def append(self, chunk: bytes) -> None:
+        self.ring.append(chunk)
+
+    def read(self, max_bytes: int) -> bytes:
+        data, _ = self.ring.read(self.read_cursor, max_bytes)
+        self.read_cursor = self.ring.end_offset
+        return data
+
+
+def _run(factory: Callable[[int], object], capacity: int, rate_mb: int, seconds: float) -> Dict[str, float]:
+    target = factory(capacity)
+    chunk = bytes(range(256)) * (READ_CHUNK // 256)
+    chunks_per_second = rate_mb * 1024 * 1024 // READ_CHUNK
+    total_chunks = int(chunks_per_second * seconds)
+    read_every = max(1, chunks_per_second // READS_PER_SECOND)
+    append = target.append  # type: ignore[attr-defined]
+    read = target.read  # type: ignore[attr-defined]
+    started = time.perf_counter()
+    for index in range(total_chunks):
+        append(chunk)
+        if index % read_every == 0:
+            read(READ_MAX_BYTES)
+    elapsed = time.perf_counter() - started
+    return {
+        "cpuSecondsPerSecond": elapsed / seconds,
+        "nsPerChunk": elapsed / max(1, total_chunks) * 1e9,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0, help="Simulated seconds of output per rate")
+    parser.add_argument("--capacity", type=int, default=131_072, help="Buffer capacity in bytes")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable results")
+    args = parser.parse_args()
+
+    results: List[Dict[str, object]] = []
+    for rate in RATES_MB:
+        legacy = _run(SliceBuffer, args.capacity, rate, args.seconds)
+        ring = _run(RingAdapter, args.capacity, rate, args.seconds)
+        results.append(
+            {
+                "rateMBps": rate,
+                "slice": legacy,
+                "ring": ring,
+                "speedup": legacy["nsPerChunk"] / ring["nsPerChunk"],
+            }
+        )
+    if args.json:
+        print(json.dumps({"capacity": args.capacity, "results": results}, indent=2))
+        return 0
+    print(f"capacity={args.capacity} bytes, chunk={READ_CHUNK} bytes, {READS_PER_SECOND} reads/s")
+    print(f"{'rate':>8} {'slice ns/chunk':>15} {'ring ns/chunk':>14} {'slice core%':>12} {'ring core%':>11} {'speedup':>8}")
+    for row in results:
+        legacy = row["slice"]  # type: ignore[assignment]
+        ring = row["ring"]  # type: ignore[assignment]
+        print(
+            f"{row['rateMBps']:>5}MB/s {legacy['nsPerChunk']:>15.0f} {ring['nsPerChunk']:>14.0f} "
+            f"{legacy['cpuSecondsPerSecond'] * 100:>11.2f}% {ring['cpuSecondsPerSecond'] * 100:>10.2f}% "
+            f"{row['speedup']:>7.1f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,23 +2,48 @@
 """CodexHive MCP server with Codex orchestration helpers."""
 from __future__ import annotations
 
+import asyncio
+import atexit
+import fcntl
+import hashlib
 import json
 import logging
 import os
-import select
+import re
+import selectors
 import signal
+import socket
+import sqlite3
+import stat
 import subprocess
 import sys
 import textwrap
 import time
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
 from itertools import count
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
 import threading
-import termios
 
-from fastmcp import FastMCP
+from fastmcp import Context, FastMCP
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from mcp.types import Notification
+
+import log_index
+from ansi_clean import AnsiNormalizer
+from input_queue import InputQueue, InputQueueFull
+from instance_registry import InstanceRegistry, open_registry
+from metrics import TimedLock, ToolMetrics, render_family, render_histograms, write_atomic
+from output_budget import OutputBudget
+from output_push import OutputSubscription, PushHub
+from output_ring import OutputRing
+from pattern_watch import LOOKBEHIND_BYTES, PatternWatch
+from pty_holder import configure_slave_pty
+from transcript_store import Segment, SegmentCompactor, SegmentedTranscript, enforce_total_retention
+from vterm import VirtualScreen
 
 os.environ.setdefault("FASTMCP_SHOW_CLI_BANNER", "false")
 os.environ.setdefault("FASTMCP_LOG_LEVEL", "info")
@@ -32,7 +57,107 @@ CMD_PATH = Path("/mnt/c/Windows/System32/cmd.exe")
 
 INSTANCE_COUNTER = count(1)
 INSTANCES: Dict[str, "CodexInstance"] = {}
+TOMBSTONES: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
 MAX_BUFFER_BYTES = 131_072
+READ_CHUNK_BYTES = 4096
+CURSOR_QUERY = b"\x1b[6n"
+REACTOR_CHUNKS_PER_WAKEUP = 64
+REACTOR_EXIT_POLL_SECONDS = 1.0
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.environ.get(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(_env_float(name, float(default)))
+
+
+# Transcript writer policy: flush queued chunks after LOG_FLUSH_INTERVAL seconds
+# or once LOG_FLUSH_BYTES are queued; LOG_FSYNC is one of none|flush|exit.
+LOG_FLUSH_INTERVAL = _env_float("CODEXHIVE_LOG_FLUSH_INTERVAL", 0.25)
+LOG_FLUSH_BYTES = _env_int("CODEXHIVE_LOG_FLUSH_BYTES", 262_144)
+LOG_FSYNC = os.environ.get("CODEXHIVE_LOG_FSYNC", "exit").strip().lower()
+# output.log rolls into segments/ once it reaches LOG_SEGMENT_BYTES (0 disables);
+# closed segments are gzip-framed at LOG_COMPRESS_LEVEL (0 keeps them raw) and
+# dropped by age or size per instance (LOG_RETAIN_BYTES) or hive-wide (LOG_RETAIN_TOTAL_BYTES).
+LOG_SEGMENT_BYTES = _env_int("CODEXHIVE_LOG_SEGMENT_BYTES", 64 * 1024 * 1024)
+LOG_COMPRESS_LEVEL = max(0, min(9, _env_int("CODEXHIVE_LOG_COMPRESS_LEVEL", 6)))
+LOG_RETAIN_SECONDS = _env_float("CODEXHIVE_LOG_RETAIN_SECONDS", 0.0)
+LOG_RETAIN_BYTES = _env_int("CODEXHIVE_LOG_RETAIN_BYTES", 0)
+LOG_RETAIN_TOTAL_BYTES = _env_int("CODEXHIVE_LOG_RETAIN_TOTAL_BYTES", 0)
+# PTY window size advertised to workers and used for the server-side screen model.
+SCREEN_ROWS = _env_int("CODEXHIVE_SCREEN_ROWS", 40)
+SCREEN_COLS = _env_int("CODEXHIVE_SCREEN_COLS", 120)
+SCREEN_SCROLLBACK = _env_int("CODEXHIVE_SCREEN_SCROLLBACK", 1000)
+# Normalized (ANSI-stripped, redraw-collapsed) channel served by read_output(mode="clean").
+CLEAN_CHANNEL = os.environ.get("CODEXHIVE_CLEAN_CHANNEL", "1").strip().lower() not in {"0", "false", "no"}
+# Warm pool: idle pre-spawned workers handed out by launch_codex. WARM_POOL_SIZE
+# pre-warms the default `codex` profile at startup; WARM_POOL_MAX caps idle+starting workers.
+WARM_POOL_SIZE = _env_int("CODEXHIVE_WARM_POOL_SIZE", 0)
+WARM_POOL_MAX = _env_int("CODEXHIVE_WARM_POOL_MAX", 8)
+WARM_READY_TIMEOUT = _env_float("CODEXHIVE_WARM_READY_TIMEOUT", 60.0)
+# Role/pointer files are served from memory and re-validated by mtime at most once per CATALOG_TTL seconds.
+CATALOG_TTL = _env_float("CODEXHIVE_CATALOG_TTL", 2.0)
+# Outbound input: send_input queues up to INPUT_MAX_PENDING bytes per worker (waiting up to
+# INPUT_BLOCK_SECONDS for room) and the reactor writes them in INPUT_CHUNK_BYTES pieces.
+INPUT_MAX_PENDING = _env_int("CODEXHIVE_INPUT_MAX_PENDING", 8 * 1024 * 1024)
+INPUT_BLOCK_SECONDS = _env_float("CODEXHIVE_INPUT_BLOCK_SECONDS", 5.0)
+INPUT_CHUNK_BYTES = _env_int("CODEXHIVE_INPUT_CHUNK_BYTES", 4096)
+INPUT_BYTES_PER_WAKEUP = 65_536
+# Detached workers: each worker runs under mcp/pty_holder.py in its own session so it survives
+# server restarts; instances are recorded in a SQLite registry and reattached on startup.
+# A holder hangs its worker up once no server has owned it for HOLDER_ORPHAN_SECONDS (0 = never).
+DETACHED_WORKERS = os.environ.get("CODEXHIVE_DETACHED_WORKERS", "1").strip().lower() not in {"0", "false", "no"}
+HOLDER_ORPHAN_SECONDS = max(0.0, _env_float("CODEXHIVE_HOLDER_ORPHAN_SECONDS", 300.0))
+HOLDER_SCRIPT = Path(__file__).resolve().with_name("pty_holder.py")
+HOLDER_DIR = Path(os.environ.get("CODEXHIVE_HOLDER_DIR") or f"/tmp/codexhive-{os.getuid()}")
+HOLDER_ATTACH_TIMEOUT = 0.5
+OWNER_LOCK_NAME = "server.lock"
+REGISTRY_CURSOR_INTERVAL = 1.0
+# Metrics: the `metrics` tool is always available; METRICS_PATH additionally gets a
+# Prometheus text-format snapshot rewritten every METRICS_INTERVAL seconds.
+METRICS_PATH = os.environ.get("CODEXHIVE_METRICS_PATH", "").strip()
+METRICS_INTERVAL = max(1.0, _env_float("CODEXHIVE_METRICS_INTERVAL", 15.0))
+# Push streaming: subscribe_output sends PUSH_METHOD notifications once the oldest unsent
+# byte is PUSH_INTERVAL seconds old or PUSH_MAX_BYTES are waiting (the most one frame carries).
+PUSH_INTERVAL = _env_float("CODEXHIVE_PUSH_INTERVAL", 0.05)
+PUSH_MAX_BYTES = max(1024, _env_int("CODEXHIVE_PUSH_MAX_BYTES", 65_536))
+PUSH_METHOD = "notifications/codexhive/output"
+PUSH_SEND_TIMEOUT = 10.0
+# Transcript range reads (read_transcript / codexhive:// resources) return at most this much per call;
+# up to TRANSCRIPT_CACHE_MAX transcripts of finished instances (and their search indexes) stay open.
+TRANSCRIPT_PAGE_BYTES = 65_536
+TRANSCRIPT_READ_MAX = 1_048_576
+TRANSCRIPT_LINE_MAX = 10_000
+TRANSCRIPT_CACHE_MAX = max(1, _env_int("CODEXHIVE_TRANSCRIPT_CACHE", 256))
+# Named read cursors (read_output/read_many `consumer`): idle ones are forgotten after
+# CONSUMER_IDLE_SECONDS (0 keeps them); CONSUMER_MAX caps how many one instance tracks.
+CONSUMER_IDLE_SECONDS = _env_float("CODEXHIVE_CONSUMER_IDLE_SECONDS", 900.0)
+CONSUMER_MAX = max(1, _env_int("CODEXHIVE_CONSUMER_MAX", 32))
+# Exited instances keep their buffers and status for EXITED_RETENTION_SECONDS (0 keeps them);
+# then they are pruned and only a tombstone (at most TOMBSTONE_MAX) is listed.
+EXITED_RETENTION_SECONDS = max(0.0, _env_float("CODEXHIVE_EXITED_RETENTION_SECONDS", 3600.0))
+TOMBSTONE_MAX = 1000
+# Output memory governor: raw+clean ring buffers of all instances share OUTPUT_MEMORY_BYTES
+# (0 = unlimited); the least recently used are released and read back from the transcript.
+OUTPUT_MEMORY_BYTES = max(0, _env_int("CODEXHIVE_OUTPUT_MEMORY_BYTES", 67_108_864))
+
+
+@dataclass
+class ReadCursor:
+    """A named consumer's position in an instance's raw and clean streams (absolute offsets)."""
+
+    raw: int
+    clean: int
+    last_used: float = field(default_factory=time.monotonic)
+    reads: int = 0
 
 
 @dataclass
@@ -50,16 +175,41 @@ class CodexInstance:
     process: subprocess.Popen[bytes]
     master_fd: Optional[int]
     log_path: Path
+    transcript: Optional[SegmentedTranscript] = field(default=None, repr=False)
     read_cursor: int = 0
-    buffer: bytearray = field(default_factory=bytearray)
+    output: OutputRing = field(default_factory=lambda: OutputRing(MAX_BUFFER_BYTES), repr=False)
+    screen: VirtualScreen = field(
+        default_factory=lambda: VirtualScreen(SCREEN_ROWS, SCREEN_COLS, SCREEN_SCROLLBACK), repr=False
+    )
+    clean: Optional[AnsiNormalizer] = field(default_factory=lambda: AnsiNormalizer() if CLEAN_CHANNEL else None, repr=False)
+    clean_output: OutputRing = field(default_factory=lambda: OutputRing(MAX_BUFFER_BYTES), repr=False)
+    clean_read_cursor: int = 0
+    clean_offset: int = 0
+    clean_partial: str = ""
+    clean_finished: bool = False
+    clean_align: Optional[tuple[int, int]] = None
+    clean_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    consumers: Dict[str, ReadCursor] = field(default_factory=dict, repr=False)
     created_at: float = field(default_factory=time.time)
     last_output_at: float = field(default_factory=time.time)
+    exited_at: float = 0.0
     status: str = "running"
     mirror_window_label: Optional[str] = None
     cursor_query_tail: bytes = field(default_factory=bytes)
-    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    screen_offset: int = 0
+    exit_fd: Optional[int] = field(default=None, repr=False)
+    watches: List[tuple[str, PatternWatch]] = field(default_factory=list, repr=False)
+    input: InputQueue = field(default_factory=lambda: InputQueue(INPUT_MAX_PENDING, INPUT_CHUNK_BYTES), repr=False)
+    bytes_read: int = 0
+    chunks_read: int = 0
+    cursor_replies: int = 0
+    lock: TimedLock = field(default_factory=TimedLock, repr=False)
     stop_event: threading.Event = field(default_factory=threading.Event, repr=False)
-    monitor_thread: Optional[threading.Thread] = field(default=None, repr=False)
+    output_ready: threading.Condition = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        # Shares ``lock`` so waiters release it while blocked and collectors notify under it.
+        self.output_ready = threading.Condition(self.lock)
 
 
 def configure_logging() -> None:
@@ -128,25 +278,106 @@ def _gen_instance_id() -> str:
     return f"cx-{next(INSTANCE_COUNTER):04d}"
 
 
+@dataclass
+class _CatalogEntry:
+    text: Optional[str]
+    title: str
+    mtime_ns: int
+    size: int
+    checked_at: float
+
+
+class _FileCatalog:
+    """In-memory cache of role and pointer files, re-validated by mtime and size once per ``ttl``."""
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = max(0.0, ttl)
+        self._entries: Dict[Path, _CatalogEntry] = {}
+        self._listings: Dict[tuple[Path, str], tuple[float, int, List[Path]]] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, path: Path) -> _CatalogEntry:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and now - entry.checked_at < self.ttl:
+            return entry
+        try:
+            info = path.stat()
+        except OSError:
+            info = None
+        if info is None or not stat.S_ISREG(info.st_mode):
+            entry = _CatalogEntry(None, "", 0, 0, now)
+        elif entry is not None and entry.text is not None and (entry.mtime_ns, entry.size) == (info.st_mtime_ns, info.st_size):
+            entry.checked_at = now
+        else:
+            try:
+                text: Optional[str] = path.read_text(encoding="utf-8")
+            except OSError:
+                text = None
+            lines = text.splitlines() if text else []
+            title = lines[0].lstrip("# ").strip() if lines else ""
+            entry = _CatalogEntry(text, title, info.st_mtime_ns, info.st_size, now)
+        with self._lock:
+            self._entries[path] = entry
+        return entry
+
+    def read(self, path: Path) -> Optional[str]:
+        """File contents, or None when ``path`` is not a readable regular file."""
+        return self._entry(path).text
+
+    def exists(self, path: Path) -> bool:
+        return self._entry(path).text is not None
+
+    def title(self, path: Path) -> str:
+        return self._entry(path).title
+
+    def listing(self, directory: Path, pattern: str) -> List[Path]:
+        now = time.monotonic()
+        key = (directory, pattern)
+        with self._lock:
+            cached = self._listings.get(key)
+        if cached is not None and now - cached[0] < self.ttl:
+            return cached[2]
+        try:
+            mtime_ns = directory.stat().st_mtime_ns
+        except OSError:
+            mtime_ns = -1
+        if cached is not None and cached[1] == mtime_ns:
+            paths = cached[2]
+        else:
+            paths = sorted(directory.glob(pattern)) if mtime_ns != -1 else []
+        with self._lock:
+            self._listings[key] = (now, mtime_ns, paths)
+        return paths
+
+
+_CATALOG = _FileCatalog(CATALOG_TTL)
+
+
 def _resolve_role(role_name: Optional[str], role_path: Optional[str]) -> tuple[Optional[str], Optional[Path], Optional[str]]:
     path: Optional[Path] = None
+    text: Optional[str] = None
     if role_path:
         candidate = Path(role_path)
-        if not candidate.is_file():
+        text = _CATALOG.read(candidate)
+        if text is None:
             candidate = (BASE_DIR / role_path).resolve()
-        if candidate.is_file():
+            text = _CATALOG.read(candidate)
+        if text is not None:
             path = candidate
         else:
             raise FileNotFoundError(f"rolePath {role_path} not found")
     elif role_name:
         candidate = ROLES_DIR / f"{role_name}.md"
-        if not candidate.is_file():
+        text = _CATALOG.read(candidate)
+        if text is None:
             candidate = ROLES_DIR / role_name
-        if candidate.is_file():
+            text = _CATALOG.read(candidate)
+        if text is not None:
             path = candidate
         else:
             raise FileNotFoundError(f"role {role_name} not found in agents/roles")
-    text = path.read_text(encoding="utf-8") if path else None
     return role_name, path, text
 
 
@@ -189,23 +420,115 @@ def _create_process(cmd: List[str], workdir: Path, env: Dict[str, str], use_pty:
     )
     if proc.stdout is not None:
         os.set_blocking(proc.stdout.fileno(), False)
+    if proc.stdin is not None:
+        os.set_blocking(proc.stdin.fileno(), False)
     return proc, None
 
 
-def _configure_slave_pty(fd: int) -> None:
+def _pid_alive(pid: int) -> bool:
     try:
-        attrs = termios.tcgetattr(fd)
-    except termios.error:
-        return
-    lflag = attrs[3]
-    if lflag & (termios.ECHO | termios.ICANON):
-        attrs[3] = lflag & ~(termios.ECHO | termios.ICANON)
-    attrs[6][termios.VMIN] = 1
-    attrs[6][termios.VTIME] = 0
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
     try:
-        termios.tcsetattr(fd, termios.TCSANOW, attrs)
-    except termios.error:
-        pass
+        with open(f"/proc/{pid}/stat", "rb") as handle:
+            return handle.read().rsplit(b")", 1)[-1].split()[0] != b"Z"
+    except (OSError, IndexError):
+        return True
+
+
+class _HeldProcess:
+    """``Popen``-like handle for a worker owned by a pty_holder process."""
+
+    def __init__(self, pid: int, holder_pid: int, exit_path: Path, stdin_fd: Optional[int] = None, stdout_fd: Optional[int] = None) -> None:
+        self.pid = pid
+        self.exit_pid = holder_pid
+        self.exit_path = exit_path
+        self.returncode: Optional[int] = None
+        self.stdin = os.fdopen(stdin_fd, "wb", buffering=0) if stdin_fd is not None else None
+        self.stdout = os.fdopen(stdout_fd, "rb", buffering=0) if stdout_fd is not None else None
+
+    def poll(self) -> Optional[int]:
+        if self.returncode is None and not _pid_alive(self.exit_pid):
+            try:
+                self.returncode = int(json.loads(self.exit_path.read_text(encoding="utf-8"))["returncode"])
+            except (OSError, ValueError, KeyError, TypeError):
+                self.returncode = -1 if not _pid_alive(self.pid) else None
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.poll() is None:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise subprocess.TimeoutExpired(str(self.pid), timeout or 0.0)
+            time.sleep(0.05)
+        return self.returncode  # type: ignore[return-value]
+
+    def send_signal(self, sig: int) -> None:
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self) -> None:
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        self.send_signal(signal.SIGKILL)
+
+
+def _holder_socket(instance_id: str) -> Path:
+    # Unix socket paths are short-lived and length-limited, so they live outside the (9p) instance root.
+    scope = hashlib.sha1(str(INSTANCE_ROOT).encode("utf-8")).hexdigest()[:8]
+    return HOLDER_DIR / f"{scope}-{instance_id}.sock"
+
+
+def _attach_holder(sock_path: Path, exit_path: Path, timeout: float) -> tuple[_HeldProcess, Optional[int]]:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(str(sock_path))
+        header, fds, _, _ = socket.recv_fds(conn, 4096, 2)
+    meta = json.loads(header.decode("utf-8"))
+    if "error" in meta:
+        raise PermissionError(f"{sock_path}: {meta['error']}")
+    for fd in fds:
+        os.set_blocking(fd, False)
+    if meta.get("pty"):
+        return _HeldProcess(int(meta["pid"]), int(meta["holderPid"]), exit_path), fds[0]
+    return _HeldProcess(int(meta["pid"]), int(meta["holderPid"]), exit_path, stdin_fd=fds[0], stdout_fd=fds[1]), None
+
+
+def _create_held_process(
+    instance_id: str, cmd: List[str], workdir: Path, env: Dict[str, str], use_pty: bool
+) -> tuple[_HeldProcess, Optional[int]]:
+    HOLDER_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+    sock_path = _holder_socket(instance_id)
+    exit_path = _instance_dir(instance_id) / "exit.json"
+    exit_path.unlink(missing_ok=True)
+    holder_cmd = [sys.executable, str(HOLDER_SCRIPT), "--socket", str(sock_path), "--exit-file", str(exit_path)]
+    holder_cmd += ["--owner-lock", str(INSTANCE_ROOT / OWNER_LOCK_NAME), "--orphan-seconds", str(HOLDER_ORPHAN_SECONDS)]
+    holder_cmd += ["--rows", str(SCREEN_ROWS), "--cols", str(SCREEN_COLS)]
+    if use_pty:
+        holder_cmd.append("--pty")
+    result = subprocess.run(
+        [*holder_cmd, "--", *cmd],
+        cwd=str(workdir),
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        timeout=30,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"failed to start {cmd[0]}: {result.stderr.decode('utf-8', errors='replace').strip()}")
+    return _attach_holder(sock_path, exit_path, timeout=5.0)
+
+
+def _configure_slave_pty(fd: int) -> None:
+    configure_slave_pty(fd, SCREEN_ROWS, SCREEN_COLS)
 
 
 def _instance_dir(instance_id: str) -> Path:
@@ -214,99 +537,802 @@ def _instance_dir(instance_id: str) -> Path:
     return path
 
 
-def _write_log(log_path: Path, data: bytes) -> None:
-    with log_path.open("ab") as handle:
-        handle.write(data)
+@dataclass
+class _LogStream:
+    store: SegmentedTranscript
+    handle: Optional[BinaryIO] = None
+    chunks: List[bytes] = field(default_factory=list)
+    queued_bytes: int = 0
+    first_queued_at: float = 0.0
+    closing: bool = False
+
+
+class _TranscriptWriter:
+    """Background writer that batches transcript chunks per instance and rolls full segments."""
+
+    def __init__(
+        self,
+        interval: float,
+        max_bytes: int,
+        fsync_mode: str,
+        segment_bytes: int = 0,
+        on_write: Optional[Callable[[str, int, bytes], None]] = None,
+        on_roll: Optional[Callable[[SegmentedTranscript, Segment], None]] = None,
+    ) -> None:
+        self.interval = max(0.0, interval)
+        self.max_bytes = max(1, max_bytes)
+        self.fsync_mode = fsync_mode if fsync_mode in {"none", "flush", "exit"} else "exit"
+        self.segment_bytes = max(0, segment_bytes)
+        self.on_write = on_write
+        self.on_roll = on_roll
+        self._streams: Dict[str, _LogStream] = {}
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.writes = 0
+        self.write_seconds = 0.0
+
+    def append(self, instance_id: str, store: SegmentedTranscript, data: bytes) -> None:
+        with self._cond:
+            stream = self._streams.get(instance_id)
+            if stream is None:
+                stream = self._streams[instance_id] = _LogStream(store=store)
+            first = not stream.chunks
+            if first:
+                stream.first_queued_at = time.monotonic()
+            stream.chunks.append(data)
+            stream.queued_bytes += len(data)
+            self._ensure_started()
+            # An idle writer sleeps without a deadline; the first queued chunk gives it one.
+            if first or stream.queued_bytes >= self.max_bytes or self.interval == 0:
+                self._cond.notify()
+
+    def close(self, instance_id: str) -> None:
+        with self._cond:
+            stream = self._streams.get(instance_id)
+            if stream is None:
+                return
+            stream.closing = True
+            self._ensure_started()
+            self._cond.notify()
+
+    def queued_bytes(self, instance_id: str) -> int:
+        with self._cond:
+            stream = self._streams.get(instance_id)
+            return stream.queued_bytes if stream else 0
+
+    def flush_all(self) -> None:
+        with self._cond:
+            due = list(self._streams.items())
+            for _, stream in due:
+                stream.closing = True
+        self._flush(due)
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="codexhive-log-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                due = self._due_locked()
+                while not due:
+                    self._cond.wait(self._next_deadline_locked())
+                    due = self._due_locked()
+            self._flush(due)
+
+    def _due_locked(self) -> List[tuple[str, _LogStream]]:
+        now = time.monotonic()
+        return [
+            (instance_id, stream)
+            for instance_id, stream in self._streams.items()
+            if stream.closing
+            or stream.queued_bytes >= self.max_bytes
+            or (stream.chunks and now - stream.first_queued_at >= self.interval)
+        ]
+
+    def _next_deadline_locked(self) -> Optional[float]:
+        pending = [stream.first_queued_at for stream in self._streams.values() if stream.chunks]
+        if not pending:
+            return None
+        return max(0.0, min(pending) + self.interval - time.monotonic())
+
+    def _flush(self, due: List[tuple[str, _LogStream]]) -> None:
+        with self._io_lock:
+            for instance_id, stream in due:
+                self._flush_stream(instance_id, stream)
+
+    def _flush_stream(self, instance_id: str, stream: _LogStream) -> None:
+        with self._cond:
+            chunks, stream.chunks = stream.chunks, []
+            closing = stream.closing
+        written = sum(len(chunk) for chunk in chunks)
+        store = stream.store
+        try:
+            if chunks:
+                if stream.handle is None:
+                    stream.handle = store.active_path.open("ab")
+                payload = b"".join(chunks)
+                offset = store.base_offset + stream.handle.tell()
+                started = time.perf_counter()
+                stream.handle.write(payload)
+                stream.handle.flush()
+                store.note_active_size(stream.handle.tell())
+                if self.fsync_mode == "flush":
+                    os.fsync(stream.handle.fileno())
+                self.writes += 1
+                self.write_seconds += time.perf_counter() - started
+                if self.on_write is not None:
+                    self.on_write(instance_id, offset, payload)
+                if self.segment_bytes and stream.handle.tell() >= self.segment_bytes:
+                    if self.fsync_mode != "none":
+                        os.fsync(stream.handle.fileno())
+                    stream.handle.close()
+                    stream.handle = None
+                    segment = store.roll()
+                    if segment is not None and self.on_roll is not None:
+                        self.on_roll(store, segment)
+            if closing and stream.handle is not None:
+                if self.fsync_mode != "none":
+                    os.fsync(stream.handle.fileno())
+                stream.handle.close()
+                stream.handle = None
+        except OSError as exc:
+            logging.warning("transcript write to %s failed: %s", store.active_path, exc)
+        with self._cond:
+            stream.queued_bytes -= written
+            if closing and not stream.chunks and self._streams.get(instance_id) is stream:
+                del self._streams[instance_id]
+
+
+# Stores and search indexes are cached least recently used first, at most TRANSCRIPT_CACHE_MAX
+# each; live instances stay cached. Evicted objects still referenced elsewhere (an instance,
+# a queued compaction, a search in progress) are found again through the weak maps, so a
+# directory never has two stores or indexes at once.
+_TRANSCRIPTS: "OrderedDict[str, SegmentedTranscript]" = OrderedDict()
+_TRANSCRIPT_INDEXES: "OrderedDict[str, log_index.TranscriptIndex]" = OrderedDict()
+_TRANSCRIPT_REFS: "weakref.WeakValueDictionary[str, SegmentedTranscript]" = weakref.WeakValueDictionary()
+_INDEX_REFS: "weakref.WeakValueDictionary[str, log_index.TranscriptIndex]" = weakref.WeakValueDictionary()
+_TRANSCRIPTS_LOCK = threading.Lock()
+
+
+def _transcript_store(instance_id: str) -> SegmentedTranscript:
+    with _TRANSCRIPTS_LOCK:
+        store = _TRANSCRIPTS.get(instance_id) or _TRANSCRIPT_REFS.get(instance_id)
+        if store is None:
+            store = _TRANSCRIPT_REFS[instance_id] = SegmentedTranscript(INSTANCE_ROOT / instance_id)
+        _TRANSCRIPTS[instance_id] = store
+        _TRANSCRIPTS.move_to_end(instance_id)
+        _evict_transcripts_locked(_TRANSCRIPTS)
+        return store
+
+
+def _transcript_index(instance_id: str) -> log_index.TranscriptIndex:
+    store = _transcript_store(instance_id)
+    with _TRANSCRIPTS_LOCK:
+        index = _TRANSCRIPT_INDEXES.get(instance_id) or _INDEX_REFS.get(instance_id)
+        if index is None or index.source is not store:
+            index = log_index.TranscriptIndex(store, store.segment_dir / log_index.JOURNAL_NAME)
+            _INDEX_REFS[instance_id] = index
+        _TRANSCRIPT_INDEXES[instance_id] = index
+        _TRANSCRIPT_INDEXES.move_to_end(instance_id)
+        _evict_transcripts_locked(_TRANSCRIPT_INDEXES)
+        return index
+
+
+def _evict_transcripts_locked(cache: "OrderedDict[str, Any]") -> None:
+    excess = len(cache) - TRANSCRIPT_CACHE_MAX
+    for instance_id in list(cache):
+        if excess <= 0:
+            return
+        if instance_id in INSTANCES:
+            continue
+        evicted = cache.pop(instance_id)
+        if isinstance(evicted, SegmentedTranscript):
+            evicted.release()
+        excess -= 1
+
+
+def _known_transcripts() -> List[str]:
+    """Instance ids with a transcript on disk, including ones from earlier runs."""
+    if not INSTANCE_ROOT.is_dir():
+        return []
+    return sorted(
+        path.name
+        for path in INSTANCE_ROOT.iterdir()
+        if (path / "output.log").exists() or (path / "segments").is_dir()
+    )
 
 
-def _collect_output(instance: CodexInstance) -> None:
-    with instance.lock:
-        _collect_output_locked(instance)
+def _index_transcript(instance_id: str, offset: int, data: bytes) -> None:
+    _transcript_index(instance_id).append(offset, data)
 
 
-def _collect_output_locked(instance: CodexInstance) -> None:
-    if instance.use_pty and instance.master_fd is None:
+def _apply_log_retention() -> None:
+    if LOG_RETAIN_SECONDS <= 0 and LOG_RETAIN_BYTES <= 0 and LOG_RETAIN_TOTAL_BYTES <= 0:
         return
-    fd = instance.master_fd if instance.use_pty else instance.process.stdout.fileno() if instance.process.stdout else None
-    if fd is None:
+    stores = [_transcript_store(instance_id) for instance_id in _known_transcripts()]
+    for store in stores:
+        store.enforce_retention(LOG_RETAIN_SECONDS, LOG_RETAIN_BYTES)
+    enforce_total_retention(stores, LOG_RETAIN_TOTAL_BYTES)
+
+
+_LOG_COMPACTOR = SegmentCompactor(LOG_COMPRESS_LEVEL, _apply_log_retention)
+_LOG_WRITER = _TranscriptWriter(
+    LOG_FLUSH_INTERVAL,
+    LOG_FLUSH_BYTES,
+    LOG_FSYNC,
+    segment_bytes=LOG_SEGMENT_BYTES,
+    on_write=_index_transcript,
+    on_roll=_LOG_COMPACTOR.submit,
+)
+atexit.register(_LOG_WRITER.flush_all)
+
+
+class _ActivityBoard:
+    """Hive-wide change counter so one waiter can block on many instances."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self.seq = 0
+
+    def bump(self) -> None:
+        with self._cond:
+            self.seq += 1
+            self._cond.notify_all()
+
+    def wait_past(self, seq: int, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.seq == seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                self._cond.wait(remaining)
+
+
+_ACTIVITY = _ActivityBoard()
+
+_OutputNotification = Notification[Dict[str, Any], str]
+_SUBSCRIPTION_COUNTER = count(1)
+
+
+def _utf8_boundary(data: bytes) -> int:
+    """Length of ``data`` without a trailing incomplete UTF-8 sequence."""
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte < 0x80:
+            return len(data)
+        if byte >= 0xC0:
+            width = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            return len(data) if back >= width else len(data) - back
+    return len(data)
+
+
+def _push_collect(sub: OutputSubscription, max_batch: int) -> Optional[Dict[str, Any]]:
+    """Next batch for ``sub`` in stream order, or None when there is nothing to report."""
+    inst = INSTANCES.get(sub.instance_id)
+    if inst is None:
+        sub.finished = True
+        return None
+    with inst.lock:
+        ring = inst.clean_output if sub.mode == "clean" else inst.output
+        begin = max(sub.cursor, ring.start_offset)
+        end = min(ring.end_offset, begin + max_batch)
+        data = b"".join(ring.views(begin, end))
+        if end < ring.end_offset:
+            end = begin + _utf8_boundary(data)
+            data = data[: end - begin]
+        skipped = begin - sub.cursor
+        sub.cursor = end
+        if sub.advance_cursor:
+            if sub.mode == "clean":
+                inst.clean_read_cursor = max(inst.clean_read_cursor, end)
+            else:
+                inst.read_cursor = max(inst.read_cursor, end)
+        status = inst.status
+        sub.finished = status != "running" and end >= ring.end_offset and (sub.mode != "clean" or inst.clean_finished)
+    if not data and not skipped and not sub.finished:
+        return None
+    return {
+        "subscriptionId": sub.id,
+        "instanceId": sub.instance_id,
+        "mode": sub.mode,
+        "offset": begin,
+        "endOffset": end,
+        "skippedBytes": skipped,
+        "status": status,
+        "data": data.decode("utf-8", errors="replace"),
+    }
+
+
+def _push_deliver(sub: OutputSubscription, params: Dict[str, Any], done: Callable[[bool], None]) -> None:
+    """Start sending one frame as a task on the subscriber's event loop; ``done`` reports the outcome."""
+    session, loop = sub.target
+    notification = _OutputNotification(method=PUSH_METHOD, params=params)
+
+    def finished(future: "Future[None]") -> None:
+        failure = "cancelled" if future.cancelled() else future.exception()
+        if failure is not None:
+            logging.info("push to %s failed: %s", sub.id, failure)
+        done(failure is None)
+
+    try:
+        future = asyncio.run_coroutine_threadsafe(
+            asyncio.wait_for(session.send_notification(notification), PUSH_SEND_TIMEOUT), loop
+        )
+    except RuntimeError as exc:  # loop closed: the client is gone
+        logging.info("push to %s failed: %s", sub.id, exc)
+        done(False)
         return
-    while True:
-        rlist, _, _ = select.select([fd], [], [], 0)
-        if not rlist:
-            break
+    future.add_done_callback(finished)
+
+
+_PUSH = PushHub(PUSH_INTERVAL, PUSH_MAX_BYTES, _push_collect, _push_deliver)
+
+
+def _resident_output(instance: CodexInstance) -> int:
+    return len(instance.output) + len(instance.clean_output)
+
+
+def _spill_output(instance_id: str) -> Optional[int]:
+    """Release an instance's ring buffers once its transcript holds everything they do."""
+    inst = INSTANCES.get(instance_id)
+    if inst is None:
+        _OUTPUT_BUDGET.forget(instance_id)
+        return 0
+    if _LOG_WRITER.queued_bytes(instance_id):
+        return None
+    _sync_clean(inst)
+    with inst.lock:
+        store = inst.transcript
+        if store is None or store.end_offset < inst.output.end_offset:
+            return None
+        if inst.clean is not None and inst.clean_offset < inst.output.end_offset:
+            return None
+        _sync_screen_locked(inst)
+        freed = inst.output.release() + inst.clean_output.release()
+        _OUTPUT_BUDGET.forget(instance_id)
+    logging.info("spilled %d output bytes of %s (%s) to its transcript", freed, instance_id, inst.status)
+    return freed
+
+
+_OUTPUT_BUDGET = OutputBudget(OUTPUT_MEMORY_BYTES, _spill_output)
+
+
+def _sync_clean(inst: CodexInstance) -> None:
+    """Normalize raw output the clean channel has not seen yet; the caller must not hold ``inst.lock``."""
+    normalizer = inst.clean
+    if normalizer is None:
+        return
+    with inst.clean_lock:
+        with inst.lock:
+            ring = inst.output
+            end = ring.end_offset
+            start = max(inst.clean_offset, ring.start_offset)
+            data = b"".join(ring.views(start, end))
+            finishing = inst.status != "running" and not inst.clean_finished
+            align, inst.clean_align = inst.clean_align, None
+        if start > inst.clean_offset:
+            logging.info("clean channel of %s skipped %d bytes that left the buffer", inst.id, start - inst.clean_offset)
+        history = b""
+        if align is not None:
+            split = max(0, align[0] - start)
+            history = normalizer.feed(data[:split]).encode("utf-8")
+            history = history[max(0, len(history) - align[1]) :]
+            data = data[split:]
+        text = normalizer.feed(data) if data else ""
+        if finishing:
+            text += normalizer.finish()
+        committed = text.encode("utf-8")
+        partial = normalizer.partial
+        with inst.lock:
+            if align is not None:
+                # Rebuilt history after a restart: line it up so the clean stream reaches the
+                # saved clean offset exactly where it had reached the saved raw offset.
+                inst.clean_output.restart_at(align[1] - len(history))
+                inst.clean_output.append(history)
+            inst.clean_offset = end
+            inst.clean_partial = partial
+            if committed:
+                inst.clean_output.append(committed)
+                _OUTPUT_BUDGET.touch(inst.id, _resident_output(inst))
+            for mode, watch in inst.watches:
+                if mode == "clean":
+                    watch.feed(inst.id, committed, inst.clean_output.end_offset)
+                    if finishing:
+                        watch.stream_closed(inst.id)
+            if finishing:
+                inst.clean_finished = True
+            if (committed or finishing) and _PUSH.watching(inst.id):
+                _PUSH.poke(inst.id, inst.output.end_offset, inst.clean_output.end_offset)
+
+
+class _CleanChannel:
+    """Background thread that keeps every instance's clean channel current."""
+
+    def __init__(self) -> None:
+        self._dirty: Dict[str, CodexInstance] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def mark(self, inst: CodexInstance) -> None:
+        with self._cond:
+            if inst.id in self._dirty:
+                return
+            self._dirty[inst.id] = inst
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="codexhive-clean", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._dirty:
+                    self._cond.wait()
+                batch, self._dirty = list(self._dirty.values()), {}
+            for inst in batch:
+                try:
+                    _sync_clean(inst)
+                except Exception as exc:  # pragma: no cover
+                    logging.warning("clean channel of %s failed: %s", inst.id, exc)
+
+
+_CLEAN = _CleanChannel()
+
+
+def _spilled_span_locked(inst: CodexInstance, start: int, ring_begin: int, room: int) -> Optional[tuple[int, int]]:
+    """The transcript range that continues ``[start, ring_begin)`` back from the ring."""
+    store = inst.transcript
+    if store is None or start >= ring_begin or ring_begin != inst.output.start_offset:
+        return None
+    if store.end_offset < ring_begin:
+        return None
+    room = min(room, TRANSCRIPT_READ_MAX) if room > 0 else TRANSCRIPT_READ_MAX
+    begin = max(start, store.start_offset, inst.output.end_offset - room)
+    return (begin, ring_begin) if begin < ring_begin else None
+
+
+def _read_spilled(inst: CodexInstance, span: Optional[tuple[int, int]]) -> bytes:
+    if span is None or inst.transcript is None:
+        return b""
+    try:
+        return inst.transcript.read(*span)
+    except OSError as exc:
+        logging.warning("reading spilled output of %s failed: %s", inst.id, exc)
+        return b""
+
+
+def _oldest_offset_locked(inst: CodexInstance) -> int:
+    """Oldest raw offset still readable, from memory or the transcript behind it."""
+    ring = inst.output
+    store = inst.transcript
+    if store is not None and store.end_offset >= ring.start_offset:
+        return min(store.start_offset, ring.start_offset)
+    return ring.start_offset
+
+
+def _output_fd(instance: CodexInstance) -> Optional[int]:
+    if instance.use_pty:
+        return instance.master_fd
+    return instance.process.stdout.fileno() if instance.process.stdout else None
+
+
+def _collect_output(instance: CodexInstance) -> bool:
+    with instance.lock:
+        return _collect_output_locked(instance)
+
+
+def _collect_output_locked(instance: CodexInstance, max_chunks: Optional[int] = None) -> bool:
+    """Drain readable output into the buffer; returns True once the stream hit EOF/EIO."""
+    fd = _output_fd(instance)
+    if fd is None:
+        return True
+    at_eof = False
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
         try:
-            chunk = os.read(fd, 4096)
+            chunk = os.read(fd, READ_CHUNK_BYTES)
+        except BlockingIOError:
+            break
         except OSError as exc:
-            if exc.errno in {5, 11}:  # EIO/EAGAIN
+            if exc.errno == 5:  # EIO: PTY slave side closed
+                at_eof = True
                 break
             raise
         if not chunk:
+            at_eof = True
             break
-        data_for_detection = instance.cursor_query_tail + chunk
-        cursor_seq = b"\x1b[6n"
-        search_idx = 0
-        while True:
-            found = data_for_detection.find(cursor_seq, search_idx)
-            if found == -1:
-                break
-            try:
-                _send_text(instance, "\x1b[1;1R", False)
-                logging.debug("responded to cursor query on %s", instance.id)
-            except Exception as exc:  # pragma: no cover
-                logging.warning("failed to respond to cursor query on %s: %s", instance.id, exc)
-                break
-            search_idx = found + len(cursor_seq)
-        tail_len = len(cursor_seq) - 1
-        instance.cursor_query_tail = data_for_detection[-tail_len:] if tail_len > 0 and len(data_for_detection) >= tail_len else data_for_detection
-        instance.buffer.extend(chunk)
-        if len(instance.buffer) > MAX_BUFFER_BYTES:
-            drop = len(instance.buffer) - MAX_BUFFER_BYTES
-            instance.buffer = instance.buffer[drop:]
-            instance.read_cursor = max(0, instance.read_cursor - drop)
+        chunks += 1
+        instance.bytes_read += len(chunk)
+        instance.output.append(chunk)
+        if instance.use_pty:
+            _answer_cursor_queries_locked(instance, chunk)
+        if instance.watches:
+            _feed_watches_locked(instance, chunk)
         instance.last_output_at = time.time()
-        _write_log(instance.log_path, chunk)
+        _LOG_WRITER.append(instance.id, instance.transcript or _transcript_store(instance.id), chunk)
+    if chunks:
+        instance.chunks_read += chunks
+        _OUTPUT_BUDGET.touch(instance.id, _resident_output(instance))
+        if instance.clean is not None:
+            _CLEAN.mark(instance)
+        instance.output_ready.notify_all()
+        _ACTIVITY.bump()
+        if _PUSH.watching(instance.id):
+            _PUSH.poke(instance.id, instance.output.end_offset, instance.clean_output.end_offset)
     if instance.process.poll() is not None and instance.status == "running":
-        instance.status = f"exited({instance.process.returncode})"
-        instance.stop_event.set()
+        _mark_exited(instance)
+    return at_eof
+
+
+def _sync_screen_locked(instance: CodexInstance, end: Optional[int] = None) -> None:
+    """Bring the lazily advanced screen model up to raw offset ``end`` (default: everything buffered)."""
+    ring = instance.output
+    end = ring.end_offset if end is None else min(end, ring.end_offset)
+    for part in ring.views(max(instance.screen_offset, ring.start_offset), end):
+        instance.screen.feed(part.tobytes())
+    instance.screen_offset = max(instance.screen_offset, end)
 
 
-def _send_text(instance: CodexInstance, text: str, append_newline: bool) -> None:
+def _answer_cursor_queries_locked(instance: CodexInstance, chunk: bytes) -> None:
+    """Answer ``ESC[6n`` cursor queries in a chunk just appended to the ring, even across chunk boundaries."""
+    tail = instance.cursor_query_tail
+    data_for_detection = tail + chunk
+    chunk_start = instance.output.end_offset - len(chunk)
+    search_idx = 0
+    while True:
+        found = data_for_detection.find(CURSOR_QUERY, search_idx)
+        if found == -1:
+            break
+        search_idx = found + len(CURSOR_QUERY)
+        _sync_screen_locked(instance, chunk_start + search_idx - len(tail))
+        row, col = instance.screen.cursor
+        try:
+            _send_control(instance, f"\x1b[{row + 1};{col + 1}R".encode("ascii"))
+            instance.cursor_replies += 1
+            logging.debug("responded to cursor query on %s", instance.id)
+        except Exception as exc:  # pragma: no cover
+            logging.warning("failed to respond to cursor query on %s: %s", instance.id, exc)
+            break
+    tail_len = len(CURSOR_QUERY) - 1
+    instance.cursor_query_tail = data_for_detection[-tail_len:]
+
+
+def _feed_watches_locked(instance: CodexInstance, chunk: bytes) -> None:
+    # Clean-mode watches are fed by _sync_clean as the normalizer commits lines.
+    for mode, watch in instance.watches:
+        if mode != "clean":
+            watch.feed(instance.id, chunk, instance.output.end_offset)
+
+
+def _mark_exited(instance: CodexInstance) -> None:
+    """Caller holds ``instance.lock``."""
+    instance.status = f"exited({instance.process.returncode})"
+    instance.exited_at = time.time()
+    instance.stop_event.set()
+    for mode, watch in instance.watches:
+        if mode != "clean":
+            watch.stream_closed(instance.id)
+    if instance.clean is not None:
+        # The clean channel closes its watches once it has normalized the last output.
+        _CLEAN.mark(instance)
+    instance.input.close(instance.status)
+    instance.env = {}
+    _OUTPUT_BUDGET.retire(instance.id)
+    _registry_call("set_status", instance.id, instance.status)
+    instance.output_ready.notify_all()
+    _ACTIVITY.bump()
+    if _PUSH.watching(instance.id):
+        _PUSH.poke(instance.id, instance.output.end_offset, instance.clean_output.end_offset)
+    _LOG_WRITER.close(instance.id)
+
+
+def _input_fd(instance: CodexInstance) -> Optional[int]:
+    if instance.use_pty:
+        return instance.master_fd
+    return instance.process.stdin.fileno() if instance.process.stdin else None
+
+
+def _close_worker_fds(instance: CodexInstance) -> None:
+    """Close an exited worker's PTY master or pipes; the reactor has already unregistered them."""
+    with instance.lock:
+        if instance.master_fd is not None:
+            os.close(instance.master_fd)
+            instance.master_fd = None
+        for name in ("stdin", "stdout"):
+            stream = getattr(instance.process, name, None)
+            if stream is not None:
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+                setattr(instance.process, name, None)
+
+
+def _send_text(instance: CodexInstance, text: str, append_newline: bool, block_seconds: float = 0.0) -> int:
+    """Queue input for the worker, write what the fd accepts now and return its sequence number."""
     payload = text if not append_newline else text + "\n"
-    data = payload.encode("utf-8")
-    target_fd = instance.master_fd if instance.use_pty else instance.process.stdin.fileno() if instance.process.stdin else None
+    target_fd = _input_fd(instance)
     if target_fd is None:
         raise RuntimeError("instance stdin not available")
-    view = memoryview(data)
-    while view:
-        written = os.write(target_fd, view)
-        view = view[written:]
+    seq = instance.input.put(payload.encode("utf-8"), block_seconds)
+    if not instance.input.write_to(target_fd, INPUT_BYTES_PER_WAKEUP):
+        _REACTOR.want_write(instance)
+    return seq
 
 
-def _monitor_instance_output(instance: CodexInstance) -> None:
-    while True:
-        if instance.stop_event.is_set():
+def _send_control(instance: CodexInstance, data: bytes) -> None:
+    """Write a terminal reply (cursor report) ahead of any queued input."""
+    target_fd = _input_fd(instance)
+    if target_fd is None:
+        return
+    instance.input.put_control(data)
+    if not instance.input.write_to(target_fd, INPUT_BYTES_PER_WAKEUP):
+        _REACTOR.want_write(instance)
+
+
+class _OutputReactor:
+    """One selector thread that drains every worker's output fd and reaps exits."""
+
+    def __init__(self) -> None:
+        self._selector = selectors.DefaultSelector()
+        self._pending: List[tuple[str, CodexInstance]] = []
+        self._pending_lock = threading.Lock()
+        self._polled: Dict[str, CodexInstance] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+
+    def register(self, instance: CodexInstance) -> None:
+        self._submit("register", instance)
+
+    def unregister(self, instance: CodexInstance) -> None:
+        self._submit("unregister", instance)
+
+    def want_write(self, instance: CodexInstance) -> None:
+        """Drain ``instance.input`` as soon as its fd is writable."""
+        self._submit("write", instance)
+
+    def _submit(self, op: str, instance: CodexInstance) -> None:
+        with self._pending_lock:
+            self._pending.append((op, instance))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="codexhive-reactor", daemon=True)
+                self._thread.start()
+        try:
+            os.write(self._wake_w, b"\0")
+        except BlockingIOError:
+            pass  # pipe already full; the reactor is awake anyway
+
+    def _apply_pending(self) -> None:
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        for op, instance in pending:
+            try:
+                if op == "register":
+                    self._add(instance)
+                elif op == "write":
+                    self._watch_input(instance)
+                else:
+                    self._remove(instance)
+                    if instance.status != "running":
+                        _close_worker_fds(instance)
+            except (KeyError, ValueError, OSError) as exc:
+                logging.warning("reactor %s of %s failed: %s", op, instance.id, exc)
+
+    def _add(self, instance: CodexInstance) -> None:
+        fd = _output_fd(instance)
+        if fd is not None:
+            self._selector.register(fd, selectors.EVENT_READ, (instance, "stream"))
+        try:
+            instance.exit_fd = os.pidfd_open(getattr(instance.process, "exit_pid", instance.process.pid))
+        except (AttributeError, OSError):
+            instance.exit_fd = None
+        if instance.exit_fd is not None:
+            self._selector.register(instance.exit_fd, selectors.EVENT_READ, (instance, "exit"))
+        else:
+            self._polled[instance.id] = instance
+
+    def _watch_input(self, instance: CodexInstance) -> None:
+        fd = _input_fd(instance)
+        if fd is None or instance.status != "running":
             return
-        _collect_output(instance)
-        with instance.lock:
-            is_running = instance.status == "running"
-        if not is_running:
+        key = self._selector.get_map().get(fd)
+        if key is None:
+            self._selector.register(fd, selectors.EVENT_WRITE, (instance, "input"))
+        elif key.data is not None and key.data[0] is instance and not key.events & selectors.EVENT_WRITE:
+            self._selector.modify(fd, key.events | selectors.EVENT_WRITE, key.data)
+
+    def _drop_input(self, instance: CodexInstance) -> None:
+        fd = _input_fd(instance)
+        key = self._selector.get_map().get(fd) if fd is not None else None
+        if key is None or key.data is None or key.data[0] is not instance or not key.events & selectors.EVENT_WRITE:
             return
-        time.sleep(0.05)
+        if key.events == selectors.EVENT_WRITE:
+            self._selector.unregister(fd)
+        else:
+            self._selector.modify(fd, key.events & ~selectors.EVENT_WRITE, key.data)
 
+    def _remove(self, instance: CodexInstance) -> None:
+        self._drop_input(instance)
+        self._drop_stream(instance)
+        self._drop_exit(instance)
 
-def _start_monitoring(instance: CodexInstance) -> None:
-    if instance.monitor_thread and instance.monitor_thread.is_alive():
-        return
-    thread = threading.Thread(target=_monitor_instance_output, args=(instance,), daemon=True)
-    instance.monitor_thread = thread
-    thread.start()
+    def _drop_stream(self, instance: CodexInstance) -> None:
+        fd = _output_fd(instance)
+        if fd is None:
+            return
+        key = self._selector.get_map().get(fd)
+        if key is not None and key.data is not None and key.data[0] is instance:
+            self._selector.unregister(fd)
 
+    def _drop_exit(self, instance: CodexInstance) -> None:
+        self._polled.pop(instance.id, None)
+        if instance.exit_fd is None:
+            return
+        self._selector.unregister(instance.exit_fd)
+        os.close(instance.exit_fd)
+        instance.exit_fd = None
 
-def _stop_monitoring(instance: CodexInstance) -> None:
-    instance.stop_event.set()
-    thread = instance.monitor_thread
-    if thread and thread.is_alive():
-        thread.join(timeout=1.0)
+    def _run(self) -> None:
+        while True:
+            timeout = REACTOR_EXIT_POLL_SECONDS if self._polled else None
+            try:
+                events = self._selector.select(timeout)
+            except Exception as exc:  # pragma: no cover
+                logging.warning("reactor select failed: %s", exc)
+                time.sleep(REACTOR_EXIT_POLL_SECONDS)
+                continue
+            for key, mask in events:
+                if key.data is None:
+                    try:
+                        while os.read(self._wake_r, 512):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                instance, kind = key.data
+                try:
+                    if mask & selectors.EVENT_WRITE and instance.input.write_to(key.fd, INPUT_BYTES_PER_WAKEUP):
+                        self._drop_input(instance)
+                    if mask & selectors.EVENT_READ:
+                        self._dispatch(instance, kind)
+                except Exception as exc:  # pragma: no cover
+                    logging.warning("reactor dropped %s after %s error: %s", instance.id, kind, exc)
+                    self._remove(instance)
+            self._apply_pending()
+            for instance in list(self._polled.values()):
+                if instance.process.poll() is not None:
+                    self._dispatch(instance, "exit")
+
+    def _dispatch(self, instance: CodexInstance, kind: str) -> None:
+        if kind == "stream":
+            with instance.lock:
+                at_eof = _collect_output_locked(instance, REACTOR_CHUNKS_PER_WAKEUP)
+            if at_eof and instance.status != "running":
+                self._retire(instance)
+            elif at_eof:
+                self._drop_stream(instance)
+            return
+        with instance.lock:
+            at_eof = _collect_output_locked(instance)
+        self._drop_exit(instance)
+        if at_eof:
+            self._retire(instance)
+        logging.info("reactor observed exit of %s (%s)", instance.id, instance.status)
+
+    def _retire(self, instance: CodexInstance) -> None:
+        # Exited and drained to EOF: nothing more can arrive, so the fds can go.
+        self._remove(instance)
+        _close_worker_fds(instance)
+
+
+_REACTOR = _OutputReactor()
 
 
 def _to_windows_path(path: Path) -> Optional[str]:
@@ -355,9 +1381,12 @@ def _mirror_in_cmd(instance: CodexInstance, label: Optional[str]) -> Optional[st
 
 
 def _require_instance(instance_id: str) -> CodexInstance:
-    if instance_id not in INSTANCES:
+    inst = INSTANCES.get(instance_id)
+    if inst is None:
+        tombstone = TOMBSTONES.get(instance_id)
+        if tombstone is not None:
+            raise ValueError(f"instance {instance_id} {tombstone['status']} and was pruned; use read_transcript")
         raise ValueError(f"instance {instance_id} not found")
-    inst = INSTANCES[instance_id]
     with inst.lock:
         _collect_output_locked(inst)
     return inst
@@ -366,33 +1395,526 @@ def _require_instance(instance_id: str) -> CodexInstance:
 def _resume_hint(instance: CodexInstance) -> str:
     if instance.role_name:
         pointer = POINTERS_DIR / f"{instance.role_name}.md"
-        if pointer.exists():
+        if _CATALOG.exists(pointer):
             return f"Review {pointer} and {instance.log_path}"
     return f"Review log {instance.log_path} and agents/pointers/README.md"
 
 
+def _spawn_instance(cmd: List[str], workdir: Path, overrides: Dict[str, str], use_pty: bool) -> CodexInstance:
+    """Fork a worker and start collecting its output; naming and role are filled in by the caller."""
+    instance_id = _gen_instance_id()
+    env_vars = os.environ.copy()
+    env_vars.update(overrides)
+    if DETACHED_WORKERS:
+        proc, master_fd = _create_held_process(instance_id, cmd, workdir, env_vars, use_pty)
+    else:
+        proc, master_fd = _create_process(cmd, workdir, env_vars, use_pty)
+    log_path = _instance_dir(instance_id) / "output.log"
+    instance = CodexInstance(
+        id=instance_id,
+        name="codex",
+        label=f"codex ({instance_id})",
+        role_name=None,
+        role_path=None,
+        prompt=None,
+        use_pty=use_pty,
+        workdir=workdir,
+        env=env_vars,
+        command=cmd,
+        process=proc,
+        master_fd=master_fd,
+        log_path=log_path,
+        transcript=_transcript_store(instance_id),
+    )
+    # A reused instance directory already has a transcript: continue at its end so ring
+    # offsets and transcript offsets agree (read_output falls back to the transcript).
+    start = instance.transcript.end_offset if instance.transcript is not None else 0
+    if start:
+        instance.output.restart_at(start)
+        instance.read_cursor = start
+    _REACTOR.register(instance)
+    _registry_record(instance, "starting")
+    return instance
+
+
+def _stop_instance(inst: CodexInstance, force: bool) -> None:
+    if force:
+        inst.process.kill()
+    else:
+        inst.process.terminate()
+    try:
+        inst.process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        inst.process.kill()
+    with inst.lock:
+        _collect_output_locked(inst)
+        if inst.status == "running":
+            _mark_exited(inst)
+    _REACTOR.unregister(inst)
+
+
+def _prune_exited() -> None:
+    """Drop instances that exited over EXITED_RETENTION_SECONDS ago, keeping a tombstone for status."""
+    if not EXITED_RETENTION_SECONDS:
+        return
+    cutoff = time.time() - EXITED_RETENTION_SECONDS
+    for inst in list(INSTANCES.values()):
+        if inst.status == "running" or not inst.exited_at or inst.exited_at > cutoff or _PUSH.watching(inst.id):
+            continue
+        with inst.lock:
+            INSTANCES.pop(inst.id, None)
+            inst.output.release()
+            inst.clean_output.release()
+        _OUTPUT_BUDGET.forget(inst.id)
+        _SAVED_CURSORS.pop(inst.id, None)
+        TOMBSTONES[inst.id] = {
+            "id": inst.id,
+            "name": inst.name,
+            "label": inst.label,
+            "role": inst.role_name or "",
+            "status": inst.status,
+            "pid": str(inst.process.pid),
+            "logPath": str(inst.log_path),
+            "lastOutputTs": str(inst.last_output_at),
+            "exitedTs": str(inst.exited_at),
+            "pruned": "true",
+        }
+        while len(TOMBSTONES) > TOMBSTONE_MAX:
+            TOMBSTONES.popitem(last=False)
+        logging.info("pruned %s (%s) from the instance table", inst.id, inst.status)
+
+
+@dataclass
+class _WarmProfile:
+    command: List[str]
+    workdir: Path
+    env: Dict[str, str]
+    use_pty: bool
+    size: int
+    ready_pattern: Optional[str]
+    ready_idle: float
+    idle: List[CodexInstance] = field(default_factory=list)
+    starting: int = 0
+    hits: int = 0
+    misses: int = 0
+    spawned: int = 0
+    discarded: int = 0
+    ready_seconds: deque = field(default_factory=lambda: deque(maxlen=100))
+
+
+class _WarmPool:
+    """Idle pre-spawned workers per (command, workdir, env, usePty) profile."""
+
+    def __init__(self, max_workers: int, ready_timeout: float) -> None:
+        self.max_workers = max(0, max_workers)
+        self.ready_timeout = ready_timeout
+        self.profiles: Dict[str, _WarmProfile] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _key(cmd: List[str], workdir: Path, overrides: Dict[str, str], use_pty: bool) -> str:
+        return json.dumps([cmd, str(workdir), sorted(overrides.items()), use_pty])
+
+    def configure(
+        self,
+        cmd: List[str],
+        workdir: Path,
+        overrides: Dict[str, str],
+        use_pty: bool,
+        size: int,
+        ready_pattern: Optional[str],
+        ready_idle_millis: int,
+    ) -> str:
+        key = self._key(cmd, workdir, overrides, use_pty)
+        retired: List[CodexInstance] = []
+        with self._cond:
+            profile = self.profiles.get(key)
+            if size <= 0:
+                if profile is not None:
+                    retired = profile.idle
+                    del self.profiles[key]
+            else:
+                if profile is None:
+                    profile = self.profiles[key] = _WarmProfile(cmd, workdir, overrides, use_pty, size, None, 0.0)
+                profile.size = size
+                profile.ready_pattern = ready_pattern
+                profile.ready_idle = max(0, ready_idle_millis) / 1000.0
+                retired, profile.idle = profile.idle[size:], profile.idle[:size]
+                self._ensure_started()
+                self._cond.notify()
+        for inst in retired:
+            self._retire(inst)
+        return key
+
+    def acquire(self, cmd: List[str], workdir: Path, overrides: Dict[str, str], use_pty: bool) -> Optional[CodexInstance]:
+        with self._cond:
+            profile = self.profiles.get(self._key(cmd, workdir, overrides, use_pty))
+            if profile is None:
+                return None
+            while profile.idle:
+                inst = profile.idle.pop(0)
+                if inst.process.poll() is None:
+                    profile.hits += 1
+                    self._cond.notify()
+                    return inst
+                profile.discarded += 1
+            profile.misses += 1
+            self._cond.notify()
+            return None
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            profiles = []
+            for key, profile in self.profiles.items():
+                ready = sorted(profile.ready_seconds)
+                profiles.append(
+                    {
+                        "profile": key,
+                        "command": profile.command,
+                        "workdir": str(profile.workdir),
+                        "size": profile.size,
+                        "idle": [inst.id for inst in profile.idle],
+                        "starting": profile.starting,
+                        "hits": profile.hits,
+                        "misses": profile.misses,
+                        "spawned": profile.spawned,
+                        "discarded": profile.discarded,
+                        "timeToReady": {
+                            "samples": len(ready),
+                            "avgSeconds": round(sum(ready) / len(ready), 3) if ready else None,
+                            "p50Seconds": round(ready[len(ready) // 2], 3) if ready else None,
+                            "maxSeconds": round(ready[-1], 3) if ready else None,
+                        },
+                    }
+                )
+            return {"maxWorkers": self.max_workers, "profiles": profiles}
+
+    def shutdown(self) -> None:
+        with self._cond:
+            idle = [inst for profile in self.profiles.values() for inst in profile.idle]
+            self.profiles.clear()
+        for inst in idle:
+            try:
+                inst.process.kill()
+            except OSError:
+                pass
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="codexhive-warm-pool", daemon=True)
+            self._thread.start()
+
+    def _total_locked(self) -> int:
+        return sum(len(profile.idle) + profile.starting for profile in self.profiles.values())
+
+    def _next_deficit_locked(self) -> Optional[_WarmProfile]:
+        if self._total_locked() >= self.max_workers:
+            return None
+        for profile in self.profiles.values():
+            if len(profile.idle) + profile.starting < profile.size:
+                return profile
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                profile = self._next_deficit_locked()
+                while profile is None:
+                    self._cond.wait()
+                    profile = self._next_deficit_locked()
+                profile.starting += 1
+                profile.spawned += 1
+            try:
+                inst = _spawn_instance(profile.command, profile.workdir, profile.env, profile.use_pty)
+            except Exception as exc:
+                logging.warning("warm pool spawn of %s failed: %s", profile.command, exc)
+                with self._cond:
+                    profile.starting -= 1
+                    profile.discarded += 1
+                time.sleep(1.0)  # avoid a hot loop when the command cannot start
+                continue
+            threading.Thread(target=self._warm, args=(profile, inst), name=f"codexhive-warm-{inst.id}", daemon=True).start()
+
+    def _warm(self, profile: _WarmProfile, inst: CodexInstance) -> None:
+        started = time.monotonic()
+        ready = self._wait_ready(profile, inst)
+        elapsed = time.monotonic() - started
+        keep = False
+        with self._cond:
+            profile.starting -= 1
+            if ready and self.profiles.get(self._key(profile.command, profile.workdir, profile.env, profile.use_pty)) is profile:
+                if len(profile.idle) < profile.size:
+                    profile.idle.append(inst)
+                    profile.ready_seconds.append(elapsed)
+                    keep = True
+            if not keep:
+                profile.discarded += 1
+            self._cond.notify()
+        if keep:
+            logging.info("warm pool worker %s ready in %.2fs", inst.id, elapsed)
+        else:
+            self._retire(inst)
+
+    def _wait_ready(self, profile: _WarmProfile, inst: CodexInstance) -> bool:
+        if profile.ready_pattern:
+            watch = PatternWatch([re.compile(profile.ready_pattern.encode("utf-8"), re.MULTILINE)], [inst.id])
+            with inst.lock:
+                history, _ = inst.output.read(0)
+                watch.feed(inst.id, history, inst.output.end_offset)
+                if inst.status != "running":
+                    watch.stream_closed(inst.id)
+                inst.watches.append(("raw", watch))
+            watch.done.wait(self.ready_timeout)
+            with inst.lock:
+                inst.watches = [entry for entry in inst.watches if entry[1] is not watch]
+                return watch.result is not None and inst.status == "running"
+        with inst.lock:
+            _wait_for_output_locked(inst, self.ready_timeout, 1, int(profile.ready_idle * 1000))
+            return inst.status == "running" and inst.output.end_offset > 0
+
+    @staticmethod
+    def _retire(inst: CodexInstance) -> None:
+        if inst.process.poll() is None:
+            _stop_instance(inst, force=False)
+        else:
+            _REACTOR.unregister(inst)
+
+
+_WARM_POOL = _WarmPool(WARM_POOL_MAX, WARM_READY_TIMEOUT)
+atexit.register(_WARM_POOL.shutdown)
+
+_REGISTRY: Optional[InstanceRegistry] = None
+_OWNER_LOCK_FD: Optional[int] = None
+_SAVED_CURSORS: Dict[str, tuple[int, str]] = {}
+
+
+def _registry_call(method: str, *args: Any) -> None:
+    if _REGISTRY is None:
+        return
+    try:
+        getattr(_REGISTRY, method)(*args)
+    except sqlite3.Error as exc:
+        logging.warning("instance registry %s failed: %s", method, exc)
+
+
+def _registry_record(instance: CodexInstance, status: str) -> None:
+    """Record a detached worker; direct children die with the server and are not worth tracking."""
+    process = instance.process
+    if not isinstance(process, _HeldProcess):
+        return
+    meta = {
+        "name": instance.name,
+        "label": instance.label,
+        "role": instance.role_name,
+        "rolePath": instance.role_path,
+        "usePty": instance.use_pty,
+        "workdir": str(instance.workdir),
+        "command": instance.command,
+        "socket": str(_holder_socket(instance.id)),
+        "exitPath": str(process.exit_path),
+        "holderPid": process.exit_pid,
+    }
+    _registry_call("record", instance.id, status, process.pid, meta, instance.created_at)
+
+
+def _cursor_state(inst: CodexInstance) -> tuple[int, str]:
+    """The raw read cursor plus, as JSON, the clean cursor, named consumers and the clean channel's position."""
+    with inst.lock:
+        # ``cleanMark`` pairs a raw offset with the clean offset the channel had reached there.
+        mark = inst.clean_align or (inst.clean_offset, inst.clean_output.end_offset)
+        state = {
+            "clean": inst.clean_read_cursor,
+            "cleanMark": list(mark),
+            "consumers": {name: [cursor.raw, cursor.clean] for name, cursor in inst.consumers.items()},
+        }
+        return inst.read_cursor, json.dumps(state, sort_keys=True)
+
+
+def _save_cursors() -> None:
+    if _REGISTRY is None:
+        return
+    states = [(inst.id, _cursor_state(inst)) for inst in list(INSTANCES.values()) if isinstance(inst.process, _HeldProcess)]
+    changed = [(instance_id, state) for instance_id, state in states if _SAVED_CURSORS.get(instance_id) != state]
+    if not changed:
+        return
+    try:
+        _REGISTRY.save_cursors((instance_id, cursor, state) for instance_id, (cursor, state) in changed)
+    except sqlite3.Error as exc:
+        logging.warning("saving read cursors failed: %s", exc)
+        return
+    _SAVED_CURSORS.update(changed)
+
+
+def _cursor_saver() -> None:
+    while True:
+        time.sleep(REGISTRY_CURSOR_INTERVAL)
+        _save_cursors()
+
+
+def _claim_instance_root() -> None:
+    """Take the exclusive owner lock on INSTANCE_ROOT and record our pid in it for the holders."""
+    global _OWNER_LOCK_FD
+    path = INSTANCE_ROOT / OWNER_LOCK_NAME
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        owner = os.read(fd, 64).decode("utf-8", errors="replace").strip() or "?"
+        os.close(fd)
+        raise RuntimeError(f"{INSTANCE_ROOT} is already served by codexctl-mcp pid {owner}") from None
+    except OSError as exc:
+        # Some 9p/drvfs mounts refuse flock; the pid file alone still tells holders who owns them.
+        logging.warning("cannot lock %s (%s); not guarding against a second server", path, exc)
+    os.ftruncate(fd, 0)
+    os.pwrite(fd, f"{os.getpid()}\n".encode("utf-8"), 0)
+    _OWNER_LOCK_FD = fd
+
+
+def _reattach(row: Dict[str, Any]) -> Optional[CodexInstance]:
+    meta = row["meta"]
+    exit_path = Path(meta["exitPath"])
+    try:
+        process, master_fd = _attach_holder(Path(meta["socket"]), exit_path, HOLDER_ATTACH_TIMEOUT)
+    except PermissionError as exc:
+        logging.warning("holder of %s refused to reattach: %s", row["id"], exc)
+        return None
+    except (OSError, ValueError, KeyError) as exc:
+        try:
+            status = f"exited({json.loads(exit_path.read_text(encoding='utf-8'))['returncode']})"
+        except (OSError, ValueError, KeyError):
+            status = "exited(lost)"
+        logging.info("cannot reattach %s (%s); marking %s", row["id"], exc, status)
+        _registry_call("set_status", row["id"], status)
+        return None
+    store = _transcript_store(row["id"])
+    instance = CodexInstance(
+        id=row["id"],
+        name=meta["name"],
+        label=meta["label"],
+        role_name=meta.get("role"),
+        role_path=meta.get("rolePath"),
+        prompt=None,
+        use_pty=bool(meta["usePty"]),
+        workdir=Path(meta["workdir"]),
+        env={},
+        command=list(meta["command"]),
+        process=process,
+        master_fd=master_fd,
+        log_path=store.active_path,
+        transcript=store,
+        created_at=row["createdAt"],
+    )
+    # Rebuild the in-memory views from the transcript tail; offsets continue where the log ends.
+    end = store.end_offset
+    tail = store.read(max(store.start_offset, end - MAX_BUFFER_BYTES), end)
+    instance.output.restart_at(end - len(tail))
+    instance.output.append(tail)
+    instance.read_cursor = min(int(row["readCursor"]), end)
+    cursors = row.get("cursors") or {}
+    raw_mark, clean_end = cursors.get("cleanMark") or (instance.read_cursor, 0)
+    instance.clean_output.restart_at(clean_end)
+    # The clean channel thread re-normalizes the tail once the instance is registered: all of it,
+    # lined up with the saved mark, or (when the mark is not in the tail) the unread part.
+    if instance.output.start_offset <= raw_mark <= end:
+        instance.clean_offset = instance.output.start_offset
+        instance.clean_align = (raw_mark, clean_end)
+    else:
+        instance.clean_offset = max(instance.read_cursor, instance.output.start_offset)
+    instance.clean_read_cursor = min(int(cursors.get("clean", clean_end)), clean_end)
+    for name, (raw, clean) in (cursors.get("consumers") or {}).items():
+        instance.consumers[name] = ReadCursor(min(int(raw), end), min(int(clean), clean_end), reads=1)
+    _OUTPUT_BUDGET.touch(instance.id, _resident_output(instance))
+    return instance
+
+
+def _restore_instances() -> None:
+    """Open the registry, continue its id sequence and reattach workers that are still alive."""
+    global _REGISTRY, INSTANCE_COUNTER
+    started = time.monotonic()
+    try:
+        _claim_instance_root()
+    except RuntimeError as exc:
+        # A second server would read the same PTYs and reuse the same instance ids.
+        logging.error("%s; refusing to start", exc)
+        raise SystemExit(f"codexctl-mcp: {exc}") from None
+    _REGISTRY = open_registry(INSTANCE_ROOT / "registry.sqlite3")
+    if _REGISTRY is None:
+        return
+    try:
+        INSTANCE_COUNTER = count(_REGISTRY.highest_number("cx-") + 1)
+        rows = _REGISTRY.rows(["running", "starting"])
+    except sqlite3.Error as exc:
+        logging.warning("reading instance registry failed: %s", exc)
+        return
+    restored = 0
+    for row in rows:
+        instance = _reattach(row)
+        if instance is None:
+            continue
+        if row["status"] != "running":
+            # A warm-pool worker or a launch interrupted by the restart: nobody owns it.
+            _stop_instance(instance, force=True)
+            continue
+        INSTANCES[instance.id] = instance
+        _SAVED_CURSORS[instance.id] = _cursor_state(instance)
+        _REACTOR.register(instance)
+        if instance.clean is not None:
+            _CLEAN.mark(instance)
+        restored += 1
+    threading.Thread(target=_cursor_saver, name="codexhive-cursor-saver", daemon=True).start()
+    atexit.register(_save_cursors)
+    logging.info("reattached %d instance(s) in %.0f ms", restored, (time.monotonic() - started) * 1000)
+
+
 configure_logging()
 ensure_directories()
 mcp = FastMCP("codexhive")
+_TOOL_METRICS = ToolMetrics()
+
+
+class _RequestTimer(Middleware):
+    """Times each ``tools/call`` end to end, including FastMCP validation and serialization."""
+
+    async def on_call_tool(self, context: MiddlewareContext[Any], call_next: Any) -> Any:
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = await call_next(context)
+            failed = False
+            return result
+        finally:
+            _TOOL_METRICS.observe_request(context.message.name, time.perf_counter() - started, failed)
+
+
+mcp.add_middleware(_RequestTimer())
+
+
+def _tool() -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """``mcp.tool()`` with handler timing; returns the plain function so tools can still call each other untimed."""
+
+    def register(fn: Callable[..., Any]) -> Callable[..., Any]:
+        mcp.tool()(_TOOL_METRICS.instrument(fn))
+        return fn
 
+    return register
 
-@mcp.tool()
+
+@_tool()
 def ping() -> str:
     return "pong"
 
 
-@mcp.tool()
+@_tool()
 def list_roles() -> Dict[str, Dict[str, str]]:
     roles: Dict[str, Dict[str, str]] = {}
-    if ROLES_DIR.is_dir():
-        for path in sorted(ROLES_DIR.glob("*.md")):
-            name = path.stem
-            first_line = path.read_text(encoding="utf-8").splitlines()[0] if path.exists() else ""
-            roles[name] = {"path": str(path), "title": first_line.lstrip("# ").strip()}
+    for path in _CATALOG.listing(ROLES_DIR, "*.md"):
+        if _CATALOG.exists(path):
+            roles[path.stem] = {"path": str(path), "title": _CATALOG.title(path)}
     return roles
 
 
-@mcp.tool()
+@_tool()
 def launch_codex(
     name: Optional[str] = None,
     roleName: Optional[str] = None,
@@ -409,36 +1931,29 @@ def launch_codex(
     initialInput: Optional[str] = None,
 ) -> Dict[str, str]:
     role_name, resolved_path, role_text = _resolve_role(roleName, rolePath)
-    instance_id = _gen_instance_id()
     resolved_workdir = Path(workdir) if workdir else BASE_DIR
     resolved_workdir.mkdir(parents=True, exist_ok=True)
-    env_vars = os.environ.copy()
-    if env:
-        env_vars.update({k: str(v) for k, v in env.items()})
+    overrides = {k: str(v) for k, v in (env or {}).items()}
     cmd = _build_command(command, shellCommand, args)
-    proc, master_fd = _create_process(cmd, resolved_workdir, env_vars, usePty)
-    log_dir = _instance_dir(instance_id)
-    log_path = log_dir / "output.log"
+    _prune_exited()
+    instance = _WARM_POOL.acquire(cmd, resolved_workdir, overrides, usePty)
+    warm = instance is not None
+    if instance is None:
+        instance = _spawn_instance(cmd, resolved_workdir, overrides, usePty)
+    instance_id = instance.id
+    proc = instance.process
+    log_path = instance.log_path
     inst_name = name or (role_name or "codex")
     label = f"{inst_name} ({instance_id})" if role_name is None else f"{inst_name}/{role_name} ({instance_id})"
-    instance = CodexInstance(
-        id=instance_id,
-        name=inst_name,
-        label=label,
-        role_name=role_name,
-        role_path=str(resolved_path) if resolved_path else None,
-        prompt=prompt,
-        use_pty=usePty,
-        workdir=resolved_workdir,
-        env=env_vars,
-        command=cmd,
-        process=proc,
-        master_fd=master_fd,
-        log_path=log_path,
-    )
+    with instance.lock:
+        instance.name = inst_name
+        instance.label = label
+        instance.role_name = role_name
+        instance.role_path = str(resolved_path) if resolved_path else None
+        instance.prompt = prompt
     INSTANCES[instance_id] = instance
-    _start_monitoring(instance)
-    logging.info("launch_codex id=%s cmd=%s", instance_id, cmd)
+    _registry_record(instance, "running")
+    logging.info("launch_codex id=%s cmd=%s warm=%s", instance_id, cmd, warm)
 
     initial_chunks: List[str] = []
     if role_text:
@@ -456,7 +1971,7 @@ def launch_codex(
     if initialInput:
         initial_chunks.append(initialInput)
     for chunk in initial_chunks:
-        _send_text(instance, chunk + "\n", False)
+        _send_text(instance, chunk + "\n", False, INPUT_BLOCK_SECONDS)
         _collect_output(instance)
 
     mirror_label = None
@@ -471,13 +1986,65 @@ def launch_codex(
         "logPath": str(log_path),
         "pid": str(proc.pid),
         "mirrorWindowLabel": mirror_label or instance.mirror_window_label or "",
+        "warm": str(warm).lower(),
     }
 
 
-@mcp.tool()
+@_tool()
+def launch_many(specs: List[Dict[str, Any]], maxParallel: int = 8) -> Dict[str, Any]:
+    """Launch a roster of ``launch_codex`` specs concurrently; failures are reported per spec."""
+    started = time.monotonic()
+    instances: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    if specs:
+        with ThreadPoolExecutor(max_workers=max(1, min(maxParallel, len(specs))), thread_name_prefix="codexhive-launch") as pool:
+            futures = [pool.submit(launch_codex, **spec) for spec in specs]
+            for index, future in enumerate(futures):
+                try:
+                    instances.append({"index": index, **future.result()})
+                except Exception as exc:
+                    logging.warning("launch_many spec %d failed: %s", index, exc)
+                    errors.append({"index": index, "name": str(specs[index].get("name") or ""), "error": f"{type(exc).__name__}: {exc}"})
+    return {"instances": instances, "errors": errors, "elapsedMs": round((time.monotonic() - started) * 1000, 1)}
+
+
+@_tool()
+def configure_warm_pool(
+    size: int,
+    command: Optional[str] = None,
+    shellCommand: Optional[str] = None,
+    args: Optional[List[str]] = None,
+    workdir: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None,
+    usePty: bool = True,
+    readyPattern: Optional[str] = None,
+    readyIdleMillis: int = 1500,
+) -> Dict[str, Any]:
+    """Keep ``size`` idle pre-spawned workers for one command/workdir/env profile (0 removes it)."""
+    if readyPattern:
+        try:
+            re.compile(readyPattern)
+        except re.error as exc:
+            raise ValueError(f"invalid readyPattern: {exc}") from exc
+    resolved_workdir = Path(workdir) if workdir else BASE_DIR
+    resolved_workdir.mkdir(parents=True, exist_ok=True)
+    overrides = {k: str(v) for k, v in (env or {}).items()}
+    cmd = _build_command(command, shellCommand, args)
+    key = _WARM_POOL.configure(cmd, resolved_workdir, overrides, usePty, size, readyPattern, readyIdleMillis)
+    return {"profile": key, **_WARM_POOL.status()}
+
+
+@_tool()
+def warm_pool_status() -> Dict[str, Any]:
+    """Warm pool profiles with idle/starting counts, hit/miss counters and time-to-ready stats."""
+    return _WARM_POOL.status()
+
+
+@_tool()
 def list_instances() -> List[Dict[str, str]]:
+    _prune_exited()
     output: List[Dict[str, str]] = []
-    for inst in INSTANCES.values():
+    for inst in list(INSTANCES.values()):
         with inst.lock:
             _collect_output_locked(inst)
             output.append(
@@ -491,65 +2058,404 @@ def list_instances() -> List[Dict[str, str]]:
                     "logPath": str(inst.log_path),
                     "lastOutputTs": str(inst.last_output_at),
                     "mirrorWindowLabel": inst.mirror_window_label or "",
+                    "logQueuedBytes": str(_LOG_WRITER.queued_bytes(inst.id)),
+                    "inputQueueDepth": str(inst.input.depth),
+                    "inputPendingBytes": str(inst.input.pending_bytes),
+                    "inputDrainedSeq": str(inst.input.drained_seq),
+                    "consumers": str(len(inst.consumers)),
                 }
             )
+    output.extend(dict(tombstone) for tombstone in TOMBSTONES.values())
     return output
 
 
-@mcp.tool()
-def send_input(instanceId: str, text: str, appendNewline: bool = True) -> Dict[str, str]:
+@_tool()
+def send_input(
+    instanceId: str,
+    text: str,
+    appendNewline: bool = True,
+    waitForDrain: bool = False,
+    drainTimeoutSeconds: float = 30.0,
+) -> Dict[str, str]:
+    """Queue text for the worker and return immediately with its sequence number."""
     inst = _require_instance(instanceId)
-    _send_text(inst, text, appendNewline)
-    logging.info("send_input id=%s bytes=%d", instanceId, len(text))
-    return {"id": instanceId, "status": "ok"}
+    try:
+        seq = _send_text(inst, text, appendNewline, INPUT_BLOCK_SECONDS)
+    except InputQueueFull as exc:
+        raise RuntimeError(f"{instanceId}: {exc}") from exc
+    drained = inst.input.drained_seq >= seq
+    if waitForDrain and not drained:
+        drained = inst.input.wait_drained(seq, drainTimeoutSeconds)
+    logging.info("send_input id=%s bytes=%d seq=%d", instanceId, len(text), seq)
+    return {
+        "id": instanceId,
+        "status": "ok",
+        "seq": str(seq),
+        "drained": str(drained).lower(),
+        "inputPendingBytes": str(inst.input.pending_bytes),
+    }
 
 
-@mcp.tool()
-def read_output(instanceId: str, maxBytes: int = 4096, waitSeconds: float = 0.0) -> Dict[str, str]:
+@_tool()
+def read_output(
+    instanceId: str,
+    maxBytes: int = 4096,
+    waitSeconds: float = 0.0,
+    minBytes: int = 1,
+    idleMillis: int = 0,
+    mode: str = "raw",
+    consumer: Optional[str] = None,
+) -> Dict[str, str]:
+    """Return unread output, optionally waiting for it, through the shared or a named consumer cursor."""
+    if mode not in {"raw", "clean"}:
+        raise ValueError("mode must be 'raw' or 'clean'")
     inst = _require_instance(instanceId)
-    if waitSeconds > 0:
-        deadline = time.time() + waitSeconds
-        while time.time() < deadline:
+    replay: Optional[bytes] = None
+    if mode == "clean" and inst.clean is not None:
+        if waitSeconds > 0:
             with inst.lock:
-                prev_size = len(inst.buffer)
-            _collect_output(inst)
+                cursor = _consumer_locked(inst, consumer) if consumer else None
+                _wait_for_output_locked(inst, waitSeconds, minBytes, idleMillis, cursor)
+            waitSeconds = 0
+        _sync_clean(inst)
+    with inst.lock:
+        cursor = _consumer_locked(inst, consumer) if consumer else None
+        if waitSeconds > 0:
+            _wait_for_output_locked(inst, waitSeconds, minBytes, idleMillis, cursor)
+        result = {"id": instanceId, "status": inst.status, "logPath": str(inst.log_path)}
+        raw_start = cursor.raw if cursor else inst.read_cursor
+        if mode == "clean":
+            if inst.clean is None:
+                raise RuntimeError("clean output channel disabled (CODEXHIVE_CLEAN_CHANNEL=0)")
+            ring = inst.clean_output
+            start = cursor.clean if cursor else inst.clean_read_cursor
+            new_bytes, begin = ring.read(start, maxBytes)
+            span = None
+            lost = begin - start
+            if start < ring.start_offset:
+                # The clean ring was released or overrun: normalize the raw stream again instead.
+                replay, raw_begin = inst.output.read(raw_start)
+                span = _spilled_span_locked(inst, raw_start, raw_begin, 0)
+                lost = (span[0] if span else raw_begin) - raw_start
+            if cursor:
+                cursor.clean, cursor.raw = ring.end_offset, inst.output.end_offset
+            else:
+                inst.clean_read_cursor = ring.end_offset
+                inst.read_cursor = inst.output.end_offset
+            result["partialLine"] = inst.clean_partial
+        else:
+            ring = inst.output
+            start = raw_start
+            new_bytes, begin = ring.read(start, maxBytes)
+            span = _spilled_span_locked(inst, start, begin, maxBytes)
+            lost = (span[0] if span else begin) - start
+            if cursor:
+                cursor.raw = ring.end_offset
+            else:
+                inst.read_cursor = ring.end_offset
+        if cursor:
+            result["consumer"] = consumer
+            result["behind"] = "true" if raw_start < _oldest_offset_locked(inst) else ""
+            result["newConsumer"] = "" if cursor.reads else "true"
+            cursor.reads += 1
+    if replay is not None:
+        spilled = _read_spilled(inst, span)
+        if span is not None:
+            lost += span[1] - span[0] - len(spilled)
+        replayed = AnsiNormalizer().feed(spilled + replay).encode("utf-8")
+        new_bytes = replayed[-maxBytes:] if maxBytes else replayed
+        lost += len(replayed) - len(new_bytes)
+    elif span is not None:
+        spilled = _read_spilled(inst, span)
+        lost += span[1] - span[0] - len(spilled)
+        new_bytes = spilled + new_bytes
+    if cursor:
+        # Bytes that could not be returned: gone from memory and disk, or over ``maxBytes``
+        # (raw bytes for what could not be replayed, clean bytes for what was cut).
+        result["droppedBytes"] = str(max(0, lost))
+    result["output"] = new_bytes.decode("utf-8", errors="replace")
+    return result
+
+
+def _consumer_locked(inst: CodexInstance, name: str) -> ReadCursor:
+    """Return (creating if needed) the named cursor, forgetting consumers that went idle."""
+    now = time.monotonic()
+    if CONSUMER_IDLE_SECONDS > 0:
+        idle = [key for key, cur in inst.consumers.items() if now - cur.last_used > CONSUMER_IDLE_SECONDS]
+        for key in idle:
+            del inst.consumers[key]
+            logging.info("read consumer %s on %s expired", key, inst.id)
+    cursor = inst.consumers.get(name)
+    if cursor is None:
+        if len(inst.consumers) >= CONSUMER_MAX:
+            raise RuntimeError(f"{inst.id}: too many read consumers (CODEXHIVE_CONSUMER_MAX={CONSUMER_MAX})")
+        # A released clean ring holds nothing to start from: begin below it so the first
+        # clean read replays the raw stream from the transcript.
+        clean = inst.clean_output.start_offset if inst.clean_output.resident_bytes else -1
+        cursor = inst.consumers[name] = ReadCursor(_oldest_offset_locked(inst), clean)
+    cursor.last_used = now
+    return cursor
+
+
+def _wait_for_output_locked(
+    inst: CodexInstance, wait_seconds: float, min_bytes: int, idle_millis: int, cursor: Optional[ReadCursor] = None
+) -> None:
+    deadline = time.monotonic() + wait_seconds
+    idle = max(0, idle_millis) / 1000.0
+    while inst.status == "running":
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        position = cursor.raw if cursor else inst.read_cursor
+        if inst.output.end_offset - position < max(1, min_bytes):
+            inst.output_ready.wait(remaining)
+            continue
+        quiet_for = time.time() - inst.last_output_at
+        if quiet_for >= idle:
+            return
+        inst.output_ready.wait(min(remaining, idle - quiet_for))
+
+
+@_tool()
+def wait_for_pattern(
+    instanceIds: List[str],
+    patterns: List[str],
+    timeoutSeconds: float = 30.0,
+    mode: str = "raw",
+    ignoreCase: bool = False,
+    includeUnread: bool = True,
+    advanceCursor: bool = False,
+) -> Dict[str, Any]:
+    """Block until any of ``patterns`` (regexes) appears in the output of any listed instance."""
+    if mode not in {"raw", "clean"}:
+        raise ValueError("mode must be 'raw' or 'clean'")
+    if not patterns:
+        raise ValueError("at least one pattern is required")
+    if not instanceIds:
+        raise ValueError("at least one instanceId is required")
+    flags = re.MULTILINE | (re.IGNORECASE if ignoreCase else 0)
+    try:
+        compiled = [re.compile(pattern.encode("utf-8"), flags) for pattern in patterns]
+    except re.error as exc:
+        raise ValueError(f"invalid regex: {exc}") from exc
+    instances = [_require_instance(instance_id) for instance_id in dict.fromkeys(instanceIds)]
+    if mode == "clean" and any(inst.clean is None for inst in instances):
+        raise RuntimeError("clean output channel disabled (CODEXHIVE_CLEAN_CHANNEL=0)")
+    started = time.monotonic()
+    watch = PatternWatch(compiled, [inst.id for inst in instances])
+    for inst in instances:
+        if mode == "clean":
+            _sync_clean(inst)
+        with inst.lock:
+            _collect_output_locked(inst)
+            ring = inst.clean_output if mode == "clean" else inst.output
+            cursor = inst.clean_read_cursor if mode == "clean" else inst.read_cursor
+            if includeUnread and cursor < ring.start_offset:
+                # Unread output was spilled: scan it from the transcript (under the lock, so
+                # nothing arriving meanwhile is missed), then what is still in the ring.
+                _feed_spilled_unread_locked(inst, watch, mode)
+            else:
+                start = max(cursor, ring.start_offset) if includeUnread else ring.end_offset
+                history, _ = ring.read(max(ring.start_offset, start - LOOKBEHIND_BYTES))
+                watch.prime(inst.id, history[: len(history) - (ring.end_offset - start)])
+                unread, _ = ring.read(start)
+                watch.feed(inst.id, unread, ring.end_offset)
+            if inst.status != "running" and (mode != "clean" or inst.clean_finished):
+                watch.stream_closed(inst.id)
+            inst.watches.append((mode, watch))
+        if watch.done.is_set():
+            break
+    try:
+        watch.done.wait(max(0.0, timeoutSeconds))
+    finally:
+        for inst in instances:
+            with inst.lock:
+                inst.watches = [entry for entry in inst.watches if entry[1] is not watch]
+    result: Dict[str, Any] = {
+        "matched": watch.result is not None,
+        "timedOut": not watch.done.is_set(),
+        "exited": list(watch.exited),
+        "elapsedMs": round((time.monotonic() - started) * 1000, 1),
+    }
+    if watch.result is not None:
+        result.update(watch.result)
+        if advanceCursor:
+            inst = next(inst for inst in instances if inst.id == watch.result["instanceId"])
             with inst.lock:
-                if len(inst.buffer) > prev_size:
-                    break
-            time.sleep(0.1)
+                if mode == "clean":
+                    inst.clean_read_cursor = max(inst.clean_read_cursor, watch.result["endOffset"])
+                else:
+                    inst.read_cursor = max(inst.read_cursor, watch.result["endOffset"])
+    return result
+
+
+def _feed_spilled_unread_locked(inst: CodexInstance, watch: PatternWatch, mode: str) -> None:
+    """Feed ``watch`` the unread output of an instance whose ring no longer holds all of it."""
+    ring_raw, raw_begin = inst.output.read(inst.read_cursor)
+    span = _spilled_span_locked(inst, inst.read_cursor, raw_begin, 0)
+    spilled = _read_spilled(inst, span)
+    if mode == "clean":
+        replayed = AnsiNormalizer().feed(spilled + ring_raw).encode("utf-8")
+        watch.feed(inst.id, replayed, inst.clean_output.end_offset)
+        return
+    if span is not None:
+        watch.feed(inst.id, spilled, span[1])
+    watch.feed(inst.id, ring_raw, inst.output.end_offset)
+
+
+@_tool()
+async def subscribe_output(
+    ctx: Context,
+    instanceId: str,
+    mode: str = "raw",
+    includeUnread: bool = True,
+    advanceCursor: bool = False,
+) -> Dict[str, Any]:
+    """Push this instance's output to the calling client instead of polling ``read_output``."""
+    if mode not in {"raw", "clean"}:
+        raise ValueError("mode must be 'raw' or 'clean'")
+    inst = _require_instance(instanceId)
+    if mode == "clean" and inst.clean is None:
+        raise RuntimeError("clean output channel disabled (CODEXHIVE_CLEAN_CHANNEL=0)")
+    target = (ctx.session, asyncio.get_running_loop())
+    with inst.lock:
+        if mode == "clean":
+            start = inst.clean_read_cursor if includeUnread else inst.clean_output.end_offset
+        else:
+            start = inst.read_cursor if includeUnread else inst.output.end_offset
+        sub = OutputSubscription(
+            id=f"sub-{next(_SUBSCRIPTION_COUNTER):04d}",
+            instance_id=inst.id,
+            mode=mode,
+            cursor=start,
+            advance_cursor=advanceCursor,
+            target=target,
+        )
+        _PUSH.add(sub)
+        _PUSH.poke(inst.id, inst.output.end_offset, inst.clean_output.end_offset)
+    logging.info("subscribe_output id=%s sub=%s mode=%s offset=%d", inst.id, sub.id, mode, start)
+    return {"subscriptionId": sub.id, "instanceId": inst.id, "method": PUSH_METHOD, "offset": start}
+
+
+@_tool()
+def unsubscribe_output(subscriptionId: str) -> Dict[str, Any]:
+    """Stop a ``subscribe_output`` stream; returns the offset it had reached."""
+    sub = _PUSH.remove(subscriptionId)
+    if sub is None:
+        raise ValueError(f"Unknown subscription {subscriptionId}")
+    return {"subscriptionId": sub.id, "instanceId": sub.instance_id, "offset": sub.cursor}
+
+
+@_tool()
+def read_screen(instanceId: str, sinceRevision: int = -1, includeScrollback: bool = False) -> Dict[str, Any]:
+    """Return the worker's rendered terminal screen, or only the rows changed since ``sinceRevision``."""
+    inst = _require_instance(instanceId)
+    with inst.lock:
+        _sync_screen_locked(inst)
+        screen = inst.screen
+        if sinceRevision < 0:
+            rows = list(enumerate(screen.lines()))
+        else:
+            rows = screen.changed_since(sinceRevision)
+        scrollback = screen.scrollback_since(max(sinceRevision, 0)) if includeScrollback else []
+        cursor_row, cursor_col = screen.cursor
+        result: Dict[str, Any] = {
+            "id": inst.id,
+            "status": inst.status,
+            "revision": screen.revision,
+            "full": sinceRevision < 0,
+            "size": {"rows": screen.rows, "cols": screen.cols},
+            "cursor": {"row": cursor_row, "col": cursor_col},
+            "lines": [{"row": index, "text": text} for index, text in rows],
+        }
+    if includeScrollback:
+        result["scrollback"] = scrollback
+    return result
+
+
+@_tool()
+def read_many(
+    instanceIds: Optional[List[str]] = None,
+    waitSeconds: float = 0.0,
+    waitFor: str = "any",
+    maxBytes: int = 4096,
+    maxTotalBytes: int = 65_536,
+    consumer: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Read unread output from several instances in one call."""
+    if waitFor not in {"any", "all"}:
+        raise ValueError("waitFor must be 'any' or 'all'")
+    if instanceIds is None:
+        targets = [inst for inst in list(INSTANCES.values()) if inst.status == "running"]
     else:
-        _collect_output(inst)
+        targets = [_require_instance(instance_id) for instance_id in instanceIds]
+    timed_out = False
+    if waitSeconds > 0 and targets:
+        deadline = time.monotonic() + waitSeconds
+        while True:
+            seq = _ACTIVITY.seq
+            ready = [_has_news(inst, consumer) for inst in targets]
+            if any(ready) if waitFor == "any" else all(ready):
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            _ACTIVITY.wait_past(seq, remaining)
+    budget = max(0, maxTotalBytes)
+    entries: List[Dict[str, str]] = []
+    for inst in sorted(targets, key=lambda item: not _has_news(item, consumer)):
+        span = None
+        with inst.lock:
+            entry = {"id": inst.id, "status": inst.status, "logPath": str(inst.log_path), "output": "", "deferred": ""}
+            cursor = _consumer_locked(inst, consumer) if consumer else None
+            start = cursor.raw if cursor else inst.read_cursor
+            pending = inst.output.end_offset - start
+            if pending and not budget:
+                entry["deferred"] = "true"
+            elif pending:
+                room = min(maxBytes, budget) if maxBytes else budget
+                new_bytes, begin = inst.output.read(start, room)
+                span = _spilled_span_locked(inst, start, begin, room)
+                if cursor:
+                    cursor.raw = inst.output.end_offset
+                    entry["behind"] = "true" if start < _oldest_offset_locked(inst) else ""
+                    entry["newConsumer"] = "" if cursor.reads else "true"
+                    cursor.reads += 1
+                else:
+                    inst.read_cursor = inst.output.end_offset
+        if pending and budget:
+            new_bytes = _read_spilled(inst, span) + new_bytes
+            if cursor:
+                entry["droppedBytes"] = str(max(0, pending - len(new_bytes)))
+            budget -= len(new_bytes)
+            entry["output"] = new_bytes.decode("utf-8", errors="replace")
+        entries.append(entry)
+    return {"instances": entries, "timedOut": timed_out}
+
+
+def _has_news(inst: CodexInstance, consumer: Optional[str] = None) -> bool:
     with inst.lock:
-        new_bytes = inst.buffer[inst.read_cursor :]
-        inst.read_cursor = len(inst.buffer)
-        status = inst.status
-        log_path = str(inst.log_path)
-    if maxBytes and len(new_bytes) > maxBytes:
-        new_bytes = new_bytes[-maxBytes:]
-    text = new_bytes.decode("utf-8", errors="replace")
-    return {"id": instanceId, "output": text, "status": status, "logPath": log_path}
+        if consumer:
+            cursor = inst.consumers.get(consumer)
+            # An unknown consumer would start at the oldest retained byte.
+            position = cursor.raw if cursor else _oldest_offset_locked(inst)
+        else:
+            position = inst.read_cursor
+        return inst.output.end_offset > position or inst.status != "running"
 
 
-@mcp.tool()
+@_tool()
 def terminate_instance(instanceId: str, force: bool = False) -> Dict[str, str]:
     inst = _require_instance(instanceId)
     if inst.status.startswith("exited"):
         return {"id": instanceId, "status": inst.status}
-    if force:
-        inst.process.kill()
-    else:
-        inst.process.terminate()
-    try:
-        inst.process.wait(timeout=10)
-    except subprocess.TimeoutExpired:
-        inst.process.kill()
-    inst.status = f"exited({inst.process.returncode})"
-    _stop_monitoring(inst)
+    _stop_instance(inst, force)
     logging.info("terminate_instance id=%s status=%s", instanceId, inst.status)
     return {"id": instanceId, "status": inst.status}
 
 
-@mcp.tool()
+@_tool()
 def signal_instance(instanceId: str, signalName: str = "SIGINT") -> Dict[str, str]:
     inst = _require_instance(instanceId)
     signal_upper = signalName.upper()
@@ -563,7 +2469,7 @@ def signal_instance(instanceId: str, signalName: str = "SIGINT") -> Dict[str, st
     return {"id": instanceId, "status": inst.status}
 
 
-@mcp.tool()
+@_tool()
 def assign_role(
     instanceId: str,
     roleName: Optional[str] = None,
@@ -574,6 +2480,8 @@ def assign_role(
     role_name, resolved_path, role_text = _resolve_role(roleName, rolePath)
     inst.role_name = role_name
     inst.role_path = str(resolved_path) if resolved_path else inst.role_path
+    if inst.status == "running":
+        _registry_record(inst, "running")
     if autoInject and role_text:
         _send_text(
             inst,
@@ -584,11 +2492,12 @@ def assign_role(
                 """
             ).strip(),
             True,
+            INPUT_BLOCK_SECONDS,
         )
     return {"id": instanceId, "role": role_name or "", "path": str(resolved_path) if resolved_path else ""}
 
 
-@mcp.tool()
+@_tool()
 def mirror_output_window(instanceId: str, label: Optional[str] = None) -> Dict[str, str]:
     inst = _require_instance(instanceId)
     win_label = _mirror_in_cmd(inst, label)
@@ -597,11 +2506,14 @@ def mirror_output_window(instanceId: str, label: Optional[str] = None) -> Dict[s
     return {"id": instanceId, "mirrorWindowLabel": win_label}
 
 
-@mcp.tool()
-def status_report() -> Dict[str, List[Dict[str, str]]]:
+@_tool()
+def status_report() -> Dict[str, Any]:
+    _prune_exited()
     entries: List[Dict[str, str]] = []
     now = time.time()
-    for inst in INSTANCES.values():
+    for inst in list(INSTANCES.values()):
+        store = inst.transcript or _transcript_store(inst.id)
+        disk_bytes = store.disk_bytes()
         with inst.lock:
             _collect_output_locked(inst)
             entries.append(
@@ -613,13 +2525,274 @@ def status_report() -> Dict[str, List[Dict[str, str]]]:
                     "uptimeSeconds": f"{now - inst.created_at:.1f}",
                     "secondsSinceOutput": f"{now - inst.last_output_at:.1f}",
                     "logPath": str(inst.log_path),
+                    "logQueuedBytes": str(_LOG_WRITER.queued_bytes(inst.id)),
+                    "logBytes": str(store.end_offset),
+                    "logDiskBytes": str(disk_bytes),
+                    "logSegments": str(len(store.segments)),
+                    "outputResidentBytes": str(_resident_output(inst)),
+                    "outputSpilledBytes": str(max(0, inst.output.start_offset - _oldest_offset_locked(inst))),
                     "resumeHint": _resume_hint(inst),
                 }
             )
-    return {"instances": entries}
+    return {"instances": entries, "pruned": list(TOMBSTONES.values()), "outputMemory": _output_memory()}
+
+
+def _output_memory() -> Dict[str, int]:
+    return {
+        "budgetBytes": _OUTPUT_BUDGET.limit,
+        "residentBytes": _OUTPUT_BUDGET.resident,
+        "spills": _OUTPUT_BUDGET.spills,
+        "spilledBytes": _OUTPUT_BUDGET.spilled_bytes,
+    }
 
 
-@mcp.tool()
+def _instance_metrics(inst: CodexInstance) -> Dict[str, Any]:
+    # Plain attribute reads: counters may be a chunk behind, but no instance lock is taken.
+    return {
+        "id": inst.id,
+        "status": inst.status,
+        "bytesRead": inst.bytes_read,
+        "chunksRead": inst.chunks_read,
+        "bytesWritten": inst.input.written_bytes,
+        "cursorReplies": inst.cursor_replies,
+        "lockWaitSeconds": round(inst.lock.wait_seconds, 6),
+        "lockContended": inst.lock.contended,
+        "inputPendingBytes": inst.input.pending_bytes,
+        "logQueuedBytes": _LOG_WRITER.queued_bytes(inst.id),
+    }
+
+
+def _metrics_snapshot() -> Dict[str, Any]:
+    return {
+        "uptimeSeconds": round(time.time() - _TOOL_METRICS.started_at, 1),
+        "tools": _TOOL_METRICS.snapshot(),
+        "instances": [_instance_metrics(inst) for inst in list(INSTANCES.values())],
+        "logWriter": {"writes": _LOG_WRITER.writes, "writeSeconds": round(_LOG_WRITER.write_seconds, 6)},
+        "push": {
+            "subscriptions": len(_PUSH.subscriptions()),
+            "notifications": _PUSH.notifications,
+            "pushedBytes": _PUSH.pushed_bytes,
+        },
+        "outputMemory": _output_memory(),
+    }
+
+
+def _prometheus_text() -> str:
+    snapshot = _metrics_snapshot()
+    tools = snapshot["tools"]
+    lines = render_histograms(
+        "codexhive_tool_handler_seconds",
+        "Time spent inside each tool handler.",
+        {name: entry["handler"] for name, entry in tools.items() if entry.get("handler")},
+        "tool",
+    )
+    lines += render_histograms(
+        "codexhive_tool_request_seconds",
+        "End-to-end tools/call time including FastMCP dispatch.",
+        {name: entry["request"] for name, entry in tools.items() if entry.get("request")},
+        "tool",
+    )
+    lines += render_family(
+        "codexhive_tool_errors_total",
+        "counter",
+        "Tool handler calls that raised.",
+        [({"tool": name}, entry["handler"]["errors"]) for name, entry in tools.items() if entry.get("handler")],
+    )
+    counters = [
+        ("codexhive_instance_read_bytes_total", "bytesRead", "Output bytes read from the worker."),
+        ("codexhive_instance_read_chunks_total", "chunksRead", "Output chunks read from the worker."),
+        ("codexhive_instance_written_bytes_total", "bytesWritten", "Input bytes written to the worker."),
+        ("codexhive_instance_cursor_replies_total", "cursorReplies", "ESC[6n cursor queries answered."),
+        ("codexhive_instance_lock_wait_seconds_total", "lockWaitSeconds", "Time spent waiting for the instance lock."),
+        ("codexhive_instance_lock_contended_total", "lockContended", "Instance lock acquisitions that had to wait."),
+    ]
+    for name, key, help_text in counters:
+        lines += render_family(name, "counter", help_text, [({"instance": row["id"]}, row[key]) for row in snapshot["instances"]])
+    lines += render_family(
+        "codexhive_log_write_seconds_total", "counter", "Time spent writing transcripts.", [({}, snapshot["logWriter"]["writeSeconds"])]
+    )
+    lines += render_family("codexhive_log_writes_total", "counter", "Transcript write batches.", [({}, snapshot["logWriter"]["writes"])])
+    memory = snapshot["outputMemory"]
+    lines += render_family(
+        "codexhive_output_resident_bytes", "gauge", "Output ring memory held across instances.", [({}, memory["residentBytes"])]
+    )
+    lines += render_family(
+        "codexhive_output_spilled_bytes_total", "counter", "Output ring memory released to transcripts.", [({}, memory["spilledBytes"])]
+    )
+    return "\n".join(lines) + "\n"
+
+
+def _metrics_exporter() -> None:
+    while True:
+        time.sleep(METRICS_INTERVAL)
+        try:
+            write_atomic(METRICS_PATH, _prometheus_text())
+        except OSError as exc:
+            logging.warning("writing metrics to %s failed: %s", METRICS_PATH, exc)
+
+
+@_tool()
+def metrics() -> Dict[str, Any]:
+    """Tool latency histograms (handler vs. end-to-end request) and per-instance I/O and lock counters."""
+    return _metrics_snapshot()
+
+
+@_tool()
+def search_logs(
+    query: str,
+    regex: bool = False,
+    ignoreCase: bool = True,
+    instanceIds: Optional[List[str]] = None,
+    contextLines: int = 2,
+    maxResults: int = 50,
+) -> Dict[str, Any]:
+    """Search every instance transcript (output.log plus rolled segments) for a substring or regex."""
+    started = time.perf_counter()
+    flags = re.MULTILINE | (re.IGNORECASE if ignoreCase else 0)
+    pattern = query.encode("utf-8") if regex else re.escape(query.encode("utf-8"))
+    try:
+        compiled = re.compile(pattern, flags)
+    except re.error as exc:
+        raise ValueError(f"invalid regex: {exc}") from exc
+    runs = log_index.literal_runs(query, regex)
+    wanted = set(instanceIds) if instanceIds else None
+    matches: List[Dict[str, Any]] = []
+    scanned = 0
+    truncated = False
+    for instance_id in _known_transcripts():
+        if wanted is not None and instance_id not in wanted:
+            continue
+        index = _transcript_index(instance_id)
+        index.sync()
+        for hit in log_index.search(index, compiled, runs, index.source.read, max(0, contextLines)):
+            if len(matches) >= maxResults:
+                truncated = True
+                break
+            matches.append({"instanceId": instance_id, **hit})
+        scanned += index.indexed_end - index.source.start_offset
+        if truncated:
+            break
+    return {
+        "matches": matches,
+        "truncated": truncated,
+        "indexedBytes": scanned,
+        "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+_INSTANCE_ID = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def _require_transcript(instance_id: str) -> SegmentedTranscript:
+    if instance_id not in INSTANCES:
+        directory = INSTANCE_ROOT / instance_id
+        if not _INSTANCE_ID.fullmatch(instance_id) or not (
+            (directory / "output.log").exists() or (directory / "segments").is_dir()
+        ):
+            raise ValueError(f"no transcript for {instance_id}")
+    return _transcript_store(instance_id)
+
+
+def _transcript_range(instance_id: str, offset: Optional[int], length: int) -> Dict[str, Any]:
+    """Bytes of the transcript starting at ``offset`` (negative counts back from the end)."""
+    store = _require_transcript(instance_id)
+    first, last = store.start_offset, store.end_offset
+    if offset is None:
+        begin = first
+    else:
+        begin = last + offset if offset < 0 else offset
+    begin = max(first, min(begin, last))
+    end = min(last, begin + max(0, min(length, TRANSCRIPT_READ_MAX)))
+    data = store.read(begin, end)
+    if end < last:
+        data = data[: _utf8_boundary(data)]
+    return {
+        "instanceId": instance_id,
+        "offset": begin,
+        "endOffset": begin + len(data),
+        "startOffset": first,
+        "totalBytes": last,
+        "eof": begin + len(data) >= last,
+        "data": data.decode("utf-8", errors="replace"),
+    }
+
+
+def _transcript_lines(instance_id: str, start_line: int, line_count: int) -> Dict[str, Any]:
+    """Lines ``start_line`` .. ``start_line + line_count - 1`` (1-based, counted from the oldest retained byte)."""
+    store = _require_transcript(instance_id)
+    index = _transcript_index(instance_id)
+    index.sync()
+    wanted = max(1, min(line_count, TRANSCRIPT_LINE_MAX))
+    last = index.indexed_end
+    begin = index.line_offset(max(1, start_line), store.read)
+    parts: List[bytes] = []
+    lines = 0
+    pos = begin if begin is not None else last
+    while lines < wanted and pos < last and pos - (begin or 0) < TRANSCRIPT_READ_MAX:
+        chunk = store.read(pos, min(last, pos + TRANSCRIPT_PAGE_BYTES, (begin or 0) + TRANSCRIPT_READ_MAX))
+        if not chunk:
+            break
+        cut = -1
+        while lines < wanted:
+            found = chunk.find(b"\n", cut + 1)
+            if found == -1:
+                break
+            cut = found
+            lines += 1
+        if lines >= wanted:
+            chunk = chunk[: cut + 1]
+        parts.append(chunk)
+        pos += len(chunk)
+    data = b"".join(parts)
+    if data and not data.endswith(b"\n"):
+        lines += 1  # trailing partial line at the end of the transcript (or of the byte cap)
+    return {
+        "instanceId": instance_id,
+        "startLine": max(1, start_line),
+        "lineCount": lines,
+        "offset": begin if begin is not None else last,
+        "endOffset": pos,
+        "indexedLines": index.line_count,
+        "totalBytes": last,
+        "eof": pos >= last,
+        "data": data.decode("utf-8", errors="replace"),
+    }
+
+
+@mcp.resource(
+    "codexhive://instances/{instance_id}/transcript{?offset,length}",
+    mime_type="text/plain",
+    description="Byte range of an instance transcript (all segments). offset defaults to the oldest retained byte "
+    "and may be negative to count back from the end; length defaults to 64 KiB, at most 1 MiB.",
+)
+def transcript_resource(instance_id: str, offset: Optional[int] = None, length: int = TRANSCRIPT_PAGE_BYTES) -> str:
+    return _transcript_range(instance_id, offset, length)["data"]
+
+
+@mcp.resource(
+    "codexhive://instances/{instance_id}/lines{?start,count}",
+    mime_type="text/plain",
+    description="Lines start..start+count-1 (1-based) of an instance transcript, located via the sparse line index.",
+)
+def transcript_lines_resource(instance_id: str, start: int = 1, count: int = 200) -> str:
+    return _transcript_lines(instance_id, start, count)["data"]
+
+
+@_tool()
+def read_transcript(
+    instanceId: str,
+    offset: Optional[int] = None,
+    length: int = TRANSCRIPT_PAGE_BYTES,
+    startLine: Optional[int] = None,
+    lineCount: int = 200,
+) -> Dict[str, Any]:
+    """Page through an instance's full transcript by byte offset or line number."""
+    if startLine is not None:
+        return _transcript_lines(instanceId, startLine, lineCount)
+    return _transcript_range(instanceId, offset, length)
+
+
+@_tool()
 def checkpoint_instance(instanceId: str, summary: Optional[str] = None) -> Dict[str, str]:
     inst = _require_instance(instanceId)
     note = summary or "No summary supplied."
@@ -642,5 +2815,11 @@ def checkpoint_instance(instanceId: str, summary: Optional[str] = None) -> Dict[
 
 if __name__ == "__main__":
     logging.info("codexhive MCP starting")
+    _restore_instances()
+    _LOG_COMPACTOR.submit_pending(_transcript_store(instance_id) for instance_id in _known_transcripts())
+    if WARM_POOL_SIZE > 0:
+        _WARM_POOL.configure(_build_command(None, None, None), BASE_DIR, {}, True, WARM_POOL_SIZE, None, 1500)
+    if METRICS_PATH:
+        threading.Thread(target=_metrics_exporter, name="codexhive-metrics", daemon=True).start()
     maybe_send_server_ready()
     mcp.run(show_banner=False)
@@ -5,12 +5,17 @@ from __future__ import annotations
 import argparse
 import json
 import os
+import queue
 import select
 import subprocess
 import sys
+import threading
 import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from itertools import count
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 IS_WINDOWS = os.name == "nt"
 
@@ -26,9 +31,9 @@ DEFAULT_SERVER = str(Path(__file__).with_name("codexctl-mcp.py"))
 
 
 def _encode_frame(payload: Dict[str, Any]) -> bytes:
-    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
-    header = f"Content-Length: {len(body)}\r\n\r\n".encode("ascii")
-    return header + body
+    # FastMCP's stdio transport is newline-delimited JSON; _read_frame still
+    # accepts Content-Length framed replies.
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8") + b"\n"
 
 
 def _parse_content_length(header: str) -> Optional[int]:
@@ -101,7 +106,19 @@ def _wait_for_data(stdout_fd: int, remaining: float) -> None:
             raise TimeoutError("timed out waiting for MCP data")
 
 
+NotificationCallback = Callable[[Dict[str, Any]], None]
+MAX_UNCLAIMED_MESSAGES = 1000
+
+
 class SmokeClient:
+    """Stdio MCP client that allows many requests in flight at once.
+
+    A reader thread demultiplexes responses by id into futures and hands
+    notifications to subscribers registered via ``subscribe``.  Messages no
+    subscriber claimed (``notifications/serverReady``, server-initiated
+    requests, ...) are queued for ``read``.
+    """
+
     def __init__(self, command: str, args: list[str], timeout: float) -> None:
         self.proc = subprocess.Popen(
             [command, *args],
@@ -111,7 +128,15 @@ class SmokeClient:
         )
         self.timeout = timeout
         self.buffer = bytearray()
-        self.next_id = 1
+        self._ids = count(1)
+        self._write_lock = threading.Lock()
+        self._pending: Dict[Any, Future[Dict[str, Any]]] = {}
+        self._pending_lock = threading.Lock()
+        self._subscribers: Dict[str, List[NotificationCallback]] = {}
+        self._unclaimed: queue.Queue[Dict[str, Any]] = queue.Queue(maxsize=MAX_UNCLAIMED_MESSAGES)
+        self._closed: Optional[BaseException] = None
+        self._reader = threading.Thread(target=self._read_loop, name="smoke-client-reader", daemon=True)
+        self._reader.start()
 
     def close(self) -> None:
         if self.proc.poll() is None:
@@ -120,40 +145,132 @@ class SmokeClient:
                 self.proc.wait(timeout=2)
             except subprocess.TimeoutExpired:
                 self.proc.kill()
+        self._fail_pending(EOFError("client closed"))
 
     def send(self, payload: Dict[str, Any]) -> None:
         assert self.proc.stdin is not None
         frame = _encode_frame(payload)
         fd = self.proc.stdin.fileno()
-        view = memoryview(frame)
-        while view:
-            written = os.write(fd, view)
-            view = view[written:]
-
-    def read(self) -> Dict[str, Any]:
-        return _read_frame(self.proc, self.buffer, self.timeout)
-
-    def request(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
-        req_id = self.next_id
-        self.next_id += 1
-        self.send({"jsonrpc": "2.0", "id": req_id, "method": method, "params": params})
-        while True:
-            message = self.read()
-            if message.get("id") == req_id:
-                return message
-            # surface stray notifications
-            dumped = json.dumps(message)
-            print(f"[notification] {dumped}")
-
-    def call_tool(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        with self._write_lock:
+            view = memoryview(frame)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+
+    def read(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Return the next message that no pending request or subscriber claimed."""
+        try:
+            return self._unclaimed.get(timeout=self.timeout if timeout is None else timeout)
+        except queue.Empty:
+            if self._closed is not None:
+                raise EOFError("MCP server closed the STDOUT pipe") from self._closed
+            raise TimeoutError("timed out waiting for MCP data") from None
+
+    def subscribe(self, method: str, callback: NotificationCallback) -> Callable[[], None]:
+        """Route notifications for ``method`` ("*" for all) to ``callback``; returns an unsubscribe hook."""
+        with self._pending_lock:
+            self._subscribers.setdefault(method, []).append(callback)
+
+        def unsubscribe() -> None:
+            with self._pending_lock:
+                callbacks = self._subscribers.get(method, [])
+                if callback in callbacks:
+                    callbacks.remove(callback)
+
+        return unsubscribe
+
+    def notify(self, method: str, params: Optional[Dict[str, Any]] = None) -> None:
+        message: Dict[str, Any] = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        self.send(message)
+
+    def request_async(self, method: str, params: Dict[str, Any]) -> Future[Dict[str, Any]]:
+        return self._start_request(method, params)[1]
+
+    def _start_request(self, method: str, params: Dict[str, Any]) -> Tuple[int, Future[Dict[str, Any]]]:
+        req_id = next(self._ids)
+        future: Future[Dict[str, Any]] = Future()
+        with self._pending_lock:
+            if self._closed is not None:
+                raise EOFError("MCP server closed the STDOUT pipe") from self._closed
+            self._pending[req_id] = future
+        try:
+            self.send({"jsonrpc": "2.0", "id": req_id, "method": method, "params": params})
+        except OSError:
+            with self._pending_lock:
+                self._pending.pop(req_id, None)
+            raise
+        return req_id, future
+
+    def request(self, method: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        req_id, future = self._start_request(method, params)
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            # Forget the request so a late (or missing) response does not pin the future forever.
+            with self._pending_lock:
+                self._pending.pop(req_id, None)
+            future.cancel()
+            raise TimeoutError(f"timed out waiting for {method} response") from None
+
+    def call_tool_async(self, name: str, arguments: Dict[str, Any]) -> Future[Dict[str, Any]]:
+        return self.request_async("tools/call", {"name": name, "arguments": arguments})
+
+    def call_tool(self, name: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
         return self.request(
             "tools/call",
             {
                 "name": name,
                 "arguments": arguments,
             },
+            timeout,
         )
 
+    def _read_loop(self) -> None:
+        while True:
+            try:
+                message = _read_frame(self.proc, self.buffer, 3600.0)
+            except TimeoutError:
+                continue
+            except (EOFError, OSError, ValueError) as exc:
+                self._fail_pending(exc)
+                return
+            self._route(message)
+
+    def _route(self, message: Dict[str, Any]) -> None:
+        is_response = "id" in message and "method" not in message
+        if is_response:
+            with self._pending_lock:
+                future = self._pending.pop(message["id"], None)
+            if future is not None:
+                future.set_result(message)
+                return
+        method = message.get("method", "")
+        with self._pending_lock:
+            callbacks = [*self._subscribers.get(method, []), *self._subscribers.get("*", [])]
+        for callback in callbacks:
+            try:
+                callback(message)
+            except Exception as exc:  # pragma: no cover
+                print(f"[subscriber error] {method}: {exc}", file=sys.stderr)
+        if callbacks:
+            return
+        try:
+            self._unclaimed.put_nowait(message)
+        except queue.Full:
+            self._unclaimed.get_nowait()
+            self._unclaimed.put_nowait(message)
+
+    def _fail_pending(self, exc: BaseException) -> None:
+        with self._pending_lock:
+            if self._closed is None:
+                self._closed = exc
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(EOFError(f"MCP server connection lost: {exc}"))
+
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="Smoke test for codexhive MCP server")
@@ -192,6 +309,7 @@ def main() -> int:
             },
         )
         print(f"initialize response: {json.dumps(init)}")
+        client.notify("notifications/initialized")
         tools = client.request("tools/list", {})
         print(f"tools/list: {json.dumps(tools)}")
         try:
@@ -0,0 +1,132 @@
+"""Per-instance outbound input queue drained with non-blocking writes."""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+
+class InputQueueFull(RuntimeError):
+    """Raised when pending input stays above the backpressure limit for too long."""
+
+
+class InputQueue:
+    """FIFO of byte payloads waiting to be written to a worker's stdin/PTY.
+
+    ``put`` assigns each payload a sequence number; ``write_to`` pushes as much
+    as the (non-blocking) fd accepts in ``chunk_bytes`` pieces and stops on
+    ``EAGAIN``, so no caller ever blocks on a full PTY buffer.  Writers are
+    serialized by the queue's condition, which also wakes ``wait_drained`` and
+    producers waiting for room under ``max_pending``.  Terminal replies queued
+    with ``put_control`` jump ahead of pending input (sequence number 0).
+    """
+
+    def __init__(self, max_pending: int, chunk_bytes: int) -> None:
+        self.max_pending = max(1, max_pending)
+        self.chunk_bytes = max(1, chunk_bytes)
+        self.cond = threading.Condition()
+        self.pending_bytes = 0
+        self.written_bytes = 0
+        self.last_seq = 0
+        self.drained_seq = 0
+        self.closed: Optional[str] = None
+        self._chunks: Deque[Tuple[int, memoryview]] = deque()
+        self._head_started = False
+
+    @property
+    def depth(self) -> int:
+        with self.cond:
+            return len(self._chunks)
+
+    def put(self, data: bytes, timeout: float) -> int:
+        """Queue ``data`` and return its sequence number.
+
+        Waits up to ``timeout`` seconds for room when the queue already holds
+        ``max_pending`` bytes; a single payload larger than the limit is
+        accepted once the queue is empty.
+        """
+        deadline = time.monotonic() + max(0.0, timeout)
+        with self.cond:
+            while self.closed is None and self._chunks and self.pending_bytes + len(data) > self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise InputQueueFull(
+                        f"input queue full ({self.pending_bytes} bytes pending, limit {self.max_pending})"
+                    )
+                self.cond.wait(remaining)
+            if self.closed is not None:
+                raise RuntimeError(f"instance stdin closed: {self.closed}")
+            self.last_seq += 1
+            if data:
+                self._chunks.append((self.last_seq, memoryview(data)))
+                self.pending_bytes += len(data)
+            else:
+                self.drained_seq = self.last_seq
+            return self.last_seq
+
+    def put_control(self, data: bytes) -> None:
+        """Queue a terminal reply ahead of pending input; never waits or raises.
+
+        It goes behind a payload that is already partly written (so it cannot
+        split it) and behind earlier replies; it is dropped once the queue is closed.
+        """
+        with self.cond:
+            if self.closed is not None or not data:
+                return
+            slot = 1 if self._head_started else 0
+            while slot < len(self._chunks) and self._chunks[slot][0] == 0:
+                slot += 1
+            self._chunks.insert(slot, (0, memoryview(data)))
+            self.pending_bytes += len(data)
+
+    def write_to(self, fd: int, budget: int) -> bool:
+        """Write up to ``budget`` bytes; returns True once nothing is left to write."""
+        with self.cond:
+            while self._chunks and budget > 0:
+                seq, view = self._chunks[0]
+                piece = view[: min(self.chunk_bytes, budget, len(view))]
+                try:
+                    written = os.write(fd, piece)
+                except (BlockingIOError, InterruptedError):
+                    return False
+                except OSError as exc:
+                    self._close_locked(f"write failed: {exc}")
+                    return True
+                budget -= written
+                self.pending_bytes -= written
+                self.written_bytes += written
+                if written == len(view):
+                    self._chunks.popleft()
+                    self._head_started = False
+                    if seq:
+                        self.drained_seq = seq
+                    self.cond.notify_all()
+                else:
+                    self._chunks[0] = (seq, view[written:])
+                    self._head_started = True
+            return not self._chunks
+
+    def wait_drained(self, seq: int, timeout: float) -> bool:
+        """Block until payload ``seq`` was fully written (False on timeout or close)."""
+        deadline = time.monotonic() + max(0.0, timeout)
+        with self.cond:
+            while self.drained_seq < seq and self.closed is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.cond.wait(remaining)
+            return self.drained_seq >= seq
+
+    def close(self, reason: str) -> None:
+        with self.cond:
+            self._close_locked(reason)
+
+    def _close_locked(self, reason: str) -> None:
+        if self.closed is None:
+            self.closed = reason
+        self._chunks.clear()
+        self._head_started = False
+        self.pending_bytes = 0
+        self.cond.notify_all()
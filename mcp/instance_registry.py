@@ -0,0 +1,122 @@
+"""SQLite-backed registry of launched instances so a restarted server can reattach."""
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS instances (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    pid INTEGER,
+    read_cursor INTEGER NOT NULL DEFAULT 0,
+    cursors TEXT NOT NULL DEFAULT '{}',
+    meta TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class InstanceRegistry:
+    """One row per instance: status, worker pid, raw read cursor and JSON ``cursors``/``meta`` blobs.
+
+    ``cursors`` holds whatever else the server needs to resume reading (the
+    clean cursor, named consumers); it is opaque to the registry.
+
+    WAL mode keeps the frequent cursor updates cheap; filesystems that cannot
+    host the WAL shared-memory file (some 9p/drvfs mounts) fall back to the
+    default rollback journal.  All access goes through one connection guarded
+    by a lock, so it can be shared by the request threads and the reactor.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None, timeout=5.0)
+        try:
+            mode = self._db.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        except sqlite3.DatabaseError:
+            mode = "delete"
+        if str(mode).lower() != "wal":
+            logging.info("instance registry %s uses journal_mode=%s", path, mode)
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(instances)")}
+        if "cursors" not in columns:
+            self._db.execute("ALTER TABLE instances ADD COLUMN cursors TEXT NOT NULL DEFAULT '{}'")
+
+    def record(self, instance_id: str, status: str, pid: int, meta: Dict[str, Any], created_at: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO instances (id, status, pid, read_cursor, meta, created_at, updated_at)"
+                " VALUES (?, ?, ?, 0, ?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET status=excluded.status, pid=excluded.pid,"
+                " meta=excluded.meta, created_at=excluded.created_at, updated_at=excluded.updated_at",
+                (instance_id, status, pid, json.dumps(meta), created_at, now),
+            )
+
+    def set_status(self, instance_id: str, status: str) -> None:
+        with self._lock:
+            self._db.execute("UPDATE instances SET status = ?, updated_at = ? WHERE id = ?", (status, time.time(), instance_id))
+
+    def save_cursors(self, cursors: Iterable[Tuple[str, int, str]]) -> None:
+        """Store ``(instance_id, read_cursor, cursors_json)`` rows in one transaction."""
+        rows = [(cursor, state, instance_id) for instance_id, cursor, state in cursors]
+        if not rows:
+            return
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany("UPDATE instances SET read_cursor = ?, cursors = ? WHERE id = ?", rows)
+            except sqlite3.Error:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def rows(self, statuses: Iterable[str]) -> List[Dict[str, Any]]:
+        wanted = list(statuses)
+        marks = ", ".join("?" for _ in wanted)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id, status, pid, read_cursor, cursors, meta, created_at FROM instances WHERE status IN ({marks}) ORDER BY id",
+                wanted,
+            ).fetchall()
+        return [
+            {
+                "id": row[0],
+                "status": row[1],
+                "pid": row[2],
+                "readCursor": row[3],
+                "cursors": json.loads(row[4] or "{}"),
+                "meta": json.loads(row[5]),
+                "createdAt": row[6],
+            }
+            for row in rows
+        ]
+
+    def highest_number(self, prefix: str) -> int:
+        """Largest numeric suffix among ids starting with ``prefix`` (0 when none)."""
+        with self._lock:
+            rows = self._db.execute("SELECT id FROM instances WHERE id LIKE ?", (prefix + "%",)).fetchall()
+        numbers = [int(row[0][len(prefix) :]) for row in rows if row[0][len(prefix) :].isdigit()]
+        return max(numbers, default=0)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def open_registry(path: Path) -> Optional[InstanceRegistry]:
+    try:
+        return InstanceRegistry(path)
+    except (OSError, sqlite3.Error) as exc:
+        logging.warning("instance registry at %s unavailable (%s); workers will not survive restarts", path, exc)
+        return None
@@ -0,0 +1,377 @@
+"""Incremental search index over append-only transcript streams."""
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import re
+import threading
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Protocol, Set, Tuple
+
+try:  # Python 3.11+
+    from re import _parser as _sre_parse  # type: ignore[attr-defined]
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_parse as _sre_parse  # type: ignore[no-redef]
+
+BLOCK_BYTES = 131_072
+MAX_BLOCK_BYTES = 4 * BLOCK_BYTES
+LINE_STRIDE = 1024
+MIN_TOKEN = 3
+JOURNAL_NAME = "index.jsonl"
+_TOKEN = re.compile(rb"[a-z0-9_]{3,}")
+_WORD_RUN = re.compile(r"[a-z0-9_]+")
+
+Reader = Callable[[int, int], bytes]
+
+
+class Source(Protocol):
+    """Logical byte stream being indexed (see ``transcript_store.SegmentedTranscript``)."""
+
+    start_offset: int
+    end_offset: int
+
+    def read(self, start: int, end: int) -> bytes: ...
+
+
+class TranscriptIndex:
+    """Block-level token postings plus a sparse line-offset table for one stream.
+
+    The stream is cut into ~``BLOCK_BYTES`` blocks on line boundaries.  Each
+    closed block contributes its lower-cased word tokens to an inverted index
+    (token -> block ids), so a search only has to scan blocks that can contain
+    every mandatory literal of the query.  Every ``LINE_STRIDE``-th line start
+    is recorded so line numbers can be resolved without keeping all offsets.
+    Offsets are byte positions in the logical (segmented) transcript.
+
+    With a ``journal`` path every closed block is appended there as one JSON
+    line (bounds, line count, line marks, tokens), and a new index replays it
+    first, so only the tail written since the last closed block has to be
+    read back from the stream after a restart.
+    """
+
+    def __init__(self, source: "Source", journal: Optional[Path] = None) -> None:
+        self.source = source
+        self.journal = journal
+        self.lock = threading.Lock()
+        self.indexed_end = 0
+        self.block_starts = array("Q")
+        self.postings: Dict[bytes, array] = {}
+        self.line_marks = array("Q", [0])
+        self.line_count = 0
+        self._open_start = 0
+        self._open = bytearray()
+        self._vocab_blob: Optional[bytes] = None
+        self._vocab_size = -1
+        if journal is not None:
+            self._replay(journal)
+
+    # -- journal -------------------------------------------------------------
+    def _replay(self, journal: Path) -> None:
+        try:
+            raw = journal.read_bytes()
+        except OSError:
+            return
+        end = self.source.end_offset
+        live = self.source.start_offset
+        kept = 0
+        for line in raw.splitlines(keepends=True):
+            try:
+                record = json.loads(line)
+                start, stop, lines = int(record["s"]), int(record["e"]), int(record["l"])
+                marks = [int(mark) for mark in record["m"]]
+                tokens = str(record["t"]).encode("ascii").split()
+            except (ValueError, KeyError, TypeError):
+                break  # torn or foreign line: everything after it is rebuilt from the stream
+            if not line.endswith(b"\n") or stop > end or (self.block_starts and start != self._open_start):
+                break
+            if not self.block_starts:
+                self.line_marks = array("Q", [start])
+            block_id = len(self.block_starts)
+            self.block_starts.append(start)
+            self.line_marks.extend(marks)
+            if stop > live:  # blocks already dropped by retention only keep their offsets
+                for token in tokens:
+                    posting = self.postings.get(token)
+                    if posting is None:
+                        self.postings[token] = array("I", [block_id])
+                    else:
+                        posting.append(block_id)
+            self.indexed_end = self._open_start = stop
+            self.line_count = lines
+            kept += len(line)
+        if kept < len(raw):
+            try:
+                with journal.open("r+b") as handle:
+                    handle.truncate(kept)
+            except OSError as exc:
+                logging.warning("cannot trim search index journal %s: %s", journal, exc)
+                self.journal = None
+
+    def _journal_block(self, start: int, stop: int, lines: int, tokens: List[bytes]) -> None:
+        if self.journal is None:
+            return
+        slot = bisect.bisect_right(self.line_marks, start)
+        record = {
+            "s": start,
+            "e": stop,
+            "l": lines,
+            "m": list(self.line_marks[slot : bisect.bisect_right(self.line_marks, stop)]),
+            "t": b" ".join(tokens).decode("ascii"),
+        }
+        try:
+            self.journal.parent.mkdir(parents=True, exist_ok=True)
+            with self.journal.open("ab") as handle:
+                handle.write(json.dumps(record, separators=(",", ":")).encode("ascii") + b"\n")
+        except OSError as exc:
+            logging.warning("search index journal %s disabled: %s", self.journal, exc)
+            self.journal = None
+
+    # -- ingestion ----------------------------------------------------------
+    def append(self, offset: int, data: bytes) -> None:
+        """Index ``data`` that was written to the stream at ``offset``."""
+        with self.lock:
+            if offset > self.indexed_end:
+                self._catch_up_locked(offset)
+            skip = self.indexed_end - offset
+            if skip >= len(data):
+                return
+            self._ingest(data[skip:] if skip > 0 else data)
+
+    def sync(self) -> None:
+        """Index whatever the stream gained since the last append/sync."""
+        with self.lock:
+            self._catch_up_locked(self.source.end_offset)
+
+    def _catch_up_locked(self, until: int) -> None:
+        start = self.source.start_offset
+        if self.indexed_end == 0 and start > 0:
+            # The oldest segments were dropped by retention before this index
+            # existed; count lines from the first retained byte.
+            self.indexed_end = self._open_start = start
+            self.line_marks = array("Q", [start])
+        while self.indexed_end < until:
+            chunk = self.source.read(self.indexed_end, min(until, self.indexed_end + MAX_BLOCK_BYTES))
+            if not chunk:
+                break
+            self._ingest(chunk)
+
+    def _ingest(self, data: bytes) -> None:
+        self._mark_lines(data)
+        self.indexed_end += len(data)
+        self._open.extend(data)
+        while len(self._open) >= BLOCK_BYTES:
+            cut = self._open.rfind(b"\n", 0, MAX_BLOCK_BYTES) + 1
+            if cut <= 0:
+                if len(self._open) < MAX_BLOCK_BYTES:
+                    return
+                cut = MAX_BLOCK_BYTES
+            self._close_block(cut)
+
+    def _close_block(self, cut: int) -> None:
+        block_id = len(self.block_starts)
+        self.block_starts.append(self._open_start)
+        tokens: List[bytes] = []
+        for token in set(_TOKEN.findall(bytes(self._open[:cut]).lower())):
+            if token.isdigit():
+                continue  # counters/timestamps bloat the vocabulary without narrowing searches
+            tokens.append(token)
+            posting = self.postings.get(token)
+            if posting is None:
+                self.postings[token] = array("I", [block_id])
+            else:
+                posting.append(block_id)
+        lines = self.line_count - self._open.count(b"\n", cut)
+        self._journal_block(self._open_start, self._open_start + cut, lines, tokens)
+        del self._open[:cut]
+        self._open_start += cut
+
+    def _mark_lines(self, data: bytes) -> None:
+        newlines = data.count(b"\n")
+        base = self.indexed_end
+        until_mark = LINE_STRIDE - self.line_count % LINE_STRIDE
+        if newlines < until_mark:
+            self.line_count += newlines
+            return
+        pos = 0
+        while True:
+            for _ in range(until_mark):
+                pos = data.find(b"\n", pos) + 1
+                if pos == 0:
+                    self.line_count += newlines
+                    return
+                newlines -= 1
+                self.line_count += 1
+            self.line_marks.append(base + pos)
+            until_mark = LINE_STRIDE
+
+    # -- queries -------------------------------------------------------------
+    def line_number(self, offset: int, reader: Reader) -> int:
+        """1-based line number of the byte at ``offset``."""
+        with self.lock:
+            slot = max(0, bisect.bisect_right(self.line_marks, offset) - 1)
+            mark = self.line_marks[slot]
+        return slot * LINE_STRIDE + reader(mark, offset).count(b"\n") + 1
+
+    def line_offset(self, line: int, reader: Reader) -> Optional[int]:
+        """Byte offset where 1-based ``line`` starts, or None if it is not indexed yet.
+
+        Jumps to the nearest recorded line mark and scans at most
+        ``LINE_STRIDE`` lines from there in bounded chunks.
+        """
+        if line < 1:
+            return None
+        with self.lock:
+            slot = min((line - 1) // LINE_STRIDE, len(self.line_marks) - 1)
+            pos = self.line_marks[slot]
+            end = self.indexed_end
+        skip = line - 1 - slot * LINE_STRIDE
+        while skip > 0 and pos < end:
+            chunk = reader(pos, min(end, pos + BLOCK_BYTES))
+            if not chunk:
+                return None
+            found = -1
+            while skip > 0:
+                found = chunk.find(b"\n", found + 1)
+                if found == -1:
+                    break
+                skip -= 1
+            pos += len(chunk) if found == -1 else found + 1
+        return pos if skip == 0 and pos <= end else None
+
+    def candidate_ranges(self, runs: List[Tuple[str, bool, bool]]) -> List[Tuple[int, int]]:
+        """Byte ranges that may contain every literal run; see ``literal_runs``."""
+        with self.lock:
+            blocks: Optional[Set[int]] = None
+            for word, open_left, open_right in runs:
+                found = self._blocks_for(word, open_left, open_right)
+                blocks = found if blocks is None else blocks & found
+                if not blocks:
+                    break
+            total = len(self.block_starts)
+            chosen = range(total) if blocks is None else sorted(blocks)
+            ranges: List[Tuple[int, int]] = []
+            for block_id in chosen:
+                start = self.block_starts[block_id]
+                end = self.block_starts[block_id + 1] if block_id + 1 < total else self._open_start
+                if ranges and ranges[-1][1] == start:
+                    ranges[-1] = (ranges[-1][0], end)
+                else:
+                    ranges.append((start, end))
+            if self.indexed_end > self._open_start:
+                ranges.append((self._open_start, self.indexed_end))
+        return ranges
+
+    def _blocks_for(self, word: str, open_left: bool, open_right: bool) -> Set[int]:
+        needle = word.encode("ascii")
+        if not open_left and not open_right:
+            return set(self.postings.get(needle, ()))
+        if self._vocab_size != len(self.postings):
+            self._vocab_blob = b"\n" + b"\n".join(self.postings) + b"\n"
+            self._vocab_size = len(self.postings)
+        left = rb"[^\n]*" if open_left else b""
+        right = rb"[^\n]*" if open_right else b""
+        pattern = re.compile(rb"(?<=\n)" + left + re.escape(needle) + right + rb"(?=\n)")
+        found: Set[int] = set()
+        for match in pattern.finditer(self._vocab_blob or b""):
+            found.update(self.postings[match.group(0)])
+        return found
+
+
+def literal_runs(query: str, is_regex: bool) -> List[Tuple[str, bool, bool]]:
+    """Word runs every match must contain, as ``(word, open_left, open_right)``.
+
+    A run is "open" on a side when the literal it came from ends there, i.e. the
+    indexed token around it may extend further (prefix/suffix/infix lookups).
+    """
+    literals = _regex_literals(query) if is_regex else [query]
+    runs: List[Tuple[str, bool, bool]] = []
+    for literal in literals:
+        lowered = literal.lower()
+        for match in _WORD_RUN.finditer(lowered):
+            if match.end() - match.start() < MIN_TOKEN or match.group(0).isdigit():
+                continue
+            runs.append((match.group(0), match.start() == 0, match.end() == len(lowered)))
+    return runs
+
+
+def _regex_literals(pattern: str) -> List[str]:
+    try:
+        parsed = _sre_parse.parse(pattern)
+    except Exception:
+        return []
+    literals: List[str] = []
+    current: List[str] = []
+
+    def flush() -> None:
+        if current:
+            literals.append("".join(current))
+            current.clear()
+
+    def walk(items) -> None:  # type: ignore[no-untyped-def]
+        for op, arg in items:
+            name = str(op)
+            if name == "LITERAL":
+                current.append(chr(arg))
+            elif name == "SUBPATTERN":
+                walk(arg[-1])
+            elif name in {"MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"} and arg[0] >= 1:
+                flush()
+                walk(arg[2])
+                flush()
+            else:
+                flush()
+
+    walk(parsed)
+    flush()
+    return literals
+
+
+def search(
+    index: TranscriptIndex,
+    compiled: "re.Pattern[bytes]",
+    runs: List[Tuple[str, bool, bool]],
+    reader: Reader,
+    context_lines: int,
+) -> Iterator[Dict[str, object]]:
+    """Yield one hit per matching line, in file order, with surrounding lines."""
+    for start, end in index.candidate_ranges(runs):
+        block = reader(start, end)
+        last_line = -1
+        for match in compiled.finditer(block):
+            line_start = block.rfind(b"\n", 0, match.start()) + 1
+            if line_start == last_line:
+                continue
+            last_line = line_start
+            line_end = block.find(b"\n", match.end())
+            if line_end == -1:
+                line_end = len(block)
+            offset = start + match.start()
+            yield {
+                "offset": offset,
+                "line": index.line_number(start + line_start, reader),
+                "text": block[line_start:line_end].decode("utf-8", errors="replace"),
+                "before": _context_before(reader, start + line_start, context_lines),
+                "after": _context_after(reader, start + line_end + 1, context_lines),
+            }
+
+
+def _context_before(reader: Reader, line_start: int, count: int) -> List[str]:
+    if count <= 0 or line_start <= 0:
+        return []
+    window = reader(max(0, line_start - 512 * count), line_start - 1)
+    lines = window.split(b"\n")
+    if line_start - 512 * count > 0:
+        lines = lines[1:]
+    return [line.decode("utf-8", errors="replace") for line in lines[-count:]]
+
+
+def _context_after(reader: Reader, next_start: int, count: int) -> List[str]:
+    if count <= 0:
+        return []
+    window = reader(next_start, next_start + 512 * count)
+    lines = window.split(b"\n")[:count]
+    if lines and not lines[-1]:
+        lines.pop()
+    return [line.decode("utf-8", errors="replace") for line in lines]
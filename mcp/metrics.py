@@ -0,0 +1,223 @@
+"""Low-overhead counters, latency histograms and Prometheus text rendering for the MCP server."""
+from __future__ import annotations
+
+import functools
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+# Upper bounds in seconds; the implicit last bucket is +Inf.
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram; ``observe`` is one bisect plus a few adds under a lock."""
+
+    __slots__ = ("bounds", "counts", "count", "total", "max", "errors", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, error: bool = False) -> None:
+        slot = bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[slot] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+            if error:
+                self.errors += 1
+
+    def quantile(self, q: float, counts: List[int], count: int) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (``max`` for the +Inf bucket)."""
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for slot, hits in enumerate(counts):
+            seen += hits
+            if seen >= rank:
+                return self.bounds[slot] if slot < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self.counts)
+            count, total, peak, errors = self.count, self.total, self.max, self.errors
+        return {
+            "count": count,
+            "errors": errors,
+            "sumSeconds": round(total, 6),
+            "maxSeconds": round(peak, 6),
+            "p50Seconds": self.quantile(0.50, counts, count),
+            "p95Seconds": self.quantile(0.95, counts, count),
+            "p99Seconds": self.quantile(0.99, counts, count),
+            "buckets": counts,
+        }
+
+
+class TimedLock:
+    """``threading.Lock`` stand-in that adds up how long callers waited for it.
+
+    The uncontended path is a single non-blocking acquire; only callers that
+    actually have to wait pay for two ``perf_counter`` calls.  The totals are
+    updated while the lock is held, so they need no extra synchronisation.
+    Works as the lock of a ``threading.Condition``.
+    """
+
+    __slots__ = ("_lock", "wait_seconds", "contended")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.wait_seconds = 0.0
+        self.contended = 0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if self._lock.acquire(False):
+            return True
+        if not blocking:
+            return False
+        started = time.perf_counter()
+        acquired = self._lock.acquire(True, timeout)
+        if acquired:
+            self.wait_seconds += time.perf_counter() - started
+            self.contended += 1
+        return acquired
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *exc: Any) -> None:
+        self._lock.release()
+
+
+class ToolMetrics:
+    """Per-tool call histograms: handler time and end-to-end request time.
+
+    ``instrument`` wraps a tool function (the wrapper keeps its signature for
+    schema generation); ``observe_request`` is fed by the request middleware,
+    so the difference between the two is time spent in FastMCP itself.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self._handlers: Dict[str, LatencyHistogram] = {}
+        self._requests: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, table: Dict[str, LatencyHistogram], name: str) -> LatencyHistogram:
+        histogram = table.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = table.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def instrument(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        histogram = self._histogram(self._handlers, fn.__name__)
+
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def timed_async(*args: Any, **kwargs: Any) -> Any:
+                started = time.perf_counter()
+                failed = True
+                try:
+                    result = await fn(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    histogram.observe(time.perf_counter() - started, failed)
+
+            return timed_async
+
+        @functools.wraps(fn)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                histogram.observe(time.perf_counter() - started, failed)
+
+        return timed
+
+    def observe_request(self, name: str, seconds: float, error: bool) -> None:
+        self._histogram(self._requests, name).observe(seconds, error)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            names = sorted(set(self._handlers) | set(self._requests))
+        tools: Dict[str, Dict[str, Any]] = {}
+        for name in names:
+            handler = self._handlers.get(name)
+            request = self._requests.get(name)
+            entry: Dict[str, Any] = {"handler": handler.snapshot() if handler else None}
+            if request is not None:
+                entry["request"] = request.snapshot()
+                if handler is not None:
+                    overhead = entry["request"]["sumSeconds"] - entry["handler"]["sumSeconds"]
+                    entry["dispatchOverheadSeconds"] = round(max(0.0, overhead), 6)
+            tools[name] = entry
+        return tools
+
+
+Sample = Tuple[Dict[str, str], float]
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels.items()
+    )
+    return "{" + body + "}"
+
+
+def render_family(name: str, kind: str, help_text: str, samples: Iterable[Sample]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_labels(labels)} {value:g}" for labels, value in samples)
+    return lines
+
+
+def render_histograms(name: str, help_text: str, histograms: Dict[str, Dict[str, Any]], label: str) -> List[str]:
+    """Prometheus histogram lines for snapshots keyed by the value of ``label``."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, snap in histograms.items():
+        cumulative = 0
+        for bound, hits in zip((*LATENCY_BUCKETS, float("inf")), snap["buckets"]):
+            cumulative += hits
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f"{name}_bucket{_labels({label: key, 'le': le})} {cumulative}")
+        lines.append(f"{name}_sum{_labels({label: key})} {snap['sumSeconds']:g}")
+        lines.append(f"{name}_count{_labels({label: key})} {snap['count']}")
+    return lines
+
+
+def write_atomic(path: str, text: str) -> None:
+    """Replace ``path`` in one rename so scrapers never read a half-written file."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as handle:
+        handle.write(text)
+    os.replace(tmp, path)
+
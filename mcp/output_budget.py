@@ -0,0 +1,83 @@
+"""Global memory budget for instance output buffers, enforced by spilling the coldest ones."""
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+class OutputBudget:
+    """LRU accounting of resident output bytes across all instances.
+
+    ``touch(key, resident)`` records how much memory an instance's buffers hold
+    and marks it most recently used; ``retire`` moves an exited instance to the
+    cold end so it is spilled first.  Whenever the total exceeds ``limit`` a
+    background thread calls ``spill(key)`` on the least recently used entries
+    (never the most recent one, so a single busy instance cannot thrash) until
+    it fits again.  ``spill`` frees the buffers, calls ``forget`` and returns
+    the bytes freed, or returns None when the instance cannot be spilled yet
+    (it is retried after ``retry_seconds``).
+    """
+
+    def __init__(self, limit: int, spill: Callable[[str], Optional[int]], retry_seconds: float = 1.0) -> None:
+        self.limit = max(0, limit)
+        self.retry_seconds = retry_seconds
+        self._spill = spill
+        self._lru: "OrderedDict[str, int]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.resident = 0
+        self.spills = 0
+        self.spilled_bytes = 0
+
+    def touch(self, key: str, resident: int) -> None:
+        with self._cond:
+            self.resident += resident - self._lru.pop(key, 0)
+            if resident:
+                self._lru[key] = resident
+            self._wake_locked()
+
+    def retire(self, key: str) -> None:
+        with self._cond:
+            if key in self._lru:
+                self._lru.move_to_end(key, last=False)
+                self._wake_locked()
+
+    def forget(self, key: str) -> None:
+        with self._cond:
+            self.resident -= self._lru.pop(key, 0)
+
+    def _over_locked(self) -> bool:
+        return bool(self.limit) and self.resident > self.limit and len(self._lru) > 1
+
+    def _wake_locked(self) -> None:
+        if not self._over_locked():
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="codexhive-output-budget", daemon=True)
+            self._thread.start()
+        self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._over_locked():
+                    self._cond.wait()
+                victims = list(self._lru)[:-1]
+            for key in victims:
+                with self._cond:
+                    if not self._over_locked():
+                        break
+                try:
+                    freed = self._spill(key)
+                except Exception as exc:  # pragma: no cover
+                    logging.warning("spilling output of %s failed: %s", key, exc)
+                    freed = None
+                if freed:
+                    self.spills += 1
+                    self.spilled_bytes += freed
+            with self._cond:
+                if self._over_locked():
+                    # Whatever is left could not be spilled yet (unflushed transcript, busy lock).
+                    self._cond.wait(self.retry_seconds)
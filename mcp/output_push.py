@@ -0,0 +1,176 @@
+"""Batched push delivery of instance output to subscribed MCP clients."""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class OutputSubscription:
+    """One client's subscription to one instance's ``raw`` or ``clean`` output.
+
+    ``cursor`` is the absolute offset of the next byte to push; ``available``
+    is the end offset last reported by the collector, so the hub knows how much
+    is waiting without touching the instance.  ``target`` is opaque to the hub
+    (the server keeps the client session and event loop there).  ``in_flight``
+    is set while a frame is being sent, so frames of one subscription never
+    overlap or reorder.
+    """
+
+    id: str
+    instance_id: str
+    mode: str
+    cursor: int
+    advance_cursor: bool = False
+    target: Any = field(default=None, repr=False)
+    available: int = 0
+    dirty_at: Optional[float] = None
+    finished: bool = False
+    in_flight: bool = False
+
+
+class PushHub:
+    """Coalesces output into notifications and hands them to ``deliver`` from one thread.
+
+    Collectors call ``poke`` with the new end offsets; that only marks the
+    subscription dirty.  The hub thread flushes a subscription once its oldest
+    unsent byte is ``interval`` seconds old or ``max_batch`` bytes are waiting.
+    ``collect(sub, max_batch)`` reads the batch (and advances ``sub.cursor``);
+    it returns None when there is nothing to send.  ``deliver(sub, params,
+    done)`` must not block: it starts the send and calls ``done(ok)`` when it
+    completes, so a slow client only holds back its own subscription (which
+    keeps batching until the frame in flight is acknowledged).  A
+    subscription whose delivery fails (client gone) is dropped; one marked
+    ``finished`` by ``collect`` (instance exited, everything sent) is removed
+    after delivery.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        max_batch: int,
+        collect: Callable[[OutputSubscription, int], Optional[Dict[str, Any]]],
+        deliver: Callable[[OutputSubscription, Dict[str, Any], Callable[[bool], None]], None],
+    ) -> None:
+        self.interval = max(0.0, interval)
+        self.max_batch = max(1, max_batch)
+        self._collect = collect
+        self._deliver = deliver
+        self._subs: Dict[str, OutputSubscription] = {}
+        self._by_instance: Dict[str, List[OutputSubscription]] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.notifications = 0
+        self.pushed_bytes = 0
+
+    def add(self, sub: OutputSubscription) -> None:
+        with self._cond:
+            self._subs[sub.id] = sub
+            self._by_instance.setdefault(sub.instance_id, []).append(sub)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="codexhive-push", daemon=True)
+                self._thread.start()
+
+    def remove(self, sub_id: str) -> Optional[OutputSubscription]:
+        with self._cond:
+            return self._remove_locked(sub_id)
+
+    def _remove_locked(self, sub_id: str) -> Optional[OutputSubscription]:
+        sub = self._subs.pop(sub_id, None)
+        if sub is not None:
+            subs = self._by_instance.get(sub.instance_id, [])
+            if sub in subs:
+                subs.remove(sub)
+            if not subs:
+                self._by_instance.pop(sub.instance_id, None)
+        return sub
+
+    def watching(self, instance_id: str) -> bool:
+        # Unlocked dict lookup: a stale answer only delays a push until the next poke.
+        return instance_id in self._by_instance
+
+    def subscriptions(self) -> List[OutputSubscription]:
+        with self._cond:
+            return list(self._subs.values())
+
+    def poke(self, instance_id: str, raw_end: int, clean_end: int) -> None:
+        """Record new output (or an exit) for ``instance_id``; cheap enough to call under the instance lock."""
+        with self._cond:
+            wake = False
+            for sub in self._by_instance.get(instance_id, ()):
+                sub.available = clean_end if sub.mode == "clean" else raw_end
+                if sub.dirty_at is None:
+                    sub.dirty_at = time.monotonic()
+                    wake = True
+                elif sub.available - sub.cursor >= self.max_batch:
+                    wake = True
+            if wake:
+                self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                due = self._due_locked()
+                while not due:
+                    self._cond.wait(self._next_deadline_locked())
+                    due = self._due_locked()
+                for sub in due:
+                    sub.dirty_at = None
+            for sub in due:
+                self._flush(sub)
+
+    def _due_locked(self) -> List[OutputSubscription]:
+        now = time.monotonic()
+        return [
+            sub
+            for sub in self._subs.values()
+            if sub.dirty_at is not None
+            and not sub.in_flight
+            and (now - sub.dirty_at >= self.interval or sub.available - sub.cursor >= self.max_batch)
+        ]
+
+    def _next_deadline_locked(self) -> Optional[float]:
+        pending = [sub.dirty_at for sub in self._subs.values() if sub.dirty_at is not None and not sub.in_flight]
+        if not pending:
+            return None
+        return max(0.0, min(pending) + self.interval - time.monotonic())
+
+    def _flush(self, sub: OutputSubscription) -> None:
+        try:
+            params = self._collect(sub, self.max_batch)
+        except Exception as exc:  # pragma: no cover
+            logging.warning("push collect for %s failed: %s", sub.id, exc)
+            params = None
+        if params is None:
+            with self._cond:
+                self._settle_locked(sub)
+            return
+        with self._cond:
+            sub.in_flight = True
+        try:
+            self._deliver(sub, params, lambda ok: self._delivered(sub, params, ok))
+        except Exception as exc:  # pragma: no cover
+            logging.warning("push deliver for %s failed: %s", sub.id, exc)
+            self._delivered(sub, params, False)
+
+    def _delivered(self, sub: OutputSubscription, params: Dict[str, Any], ok: bool) -> None:
+        with self._cond:
+            sub.in_flight = False
+            if not ok:
+                logging.info("dropping output subscription %s on %s: delivery failed", sub.id, sub.instance_id)
+                self._remove_locked(sub.id)
+                return
+            self.notifications += 1
+            self.pushed_bytes += params.get("endOffset", 0) - params.get("offset", 0)
+            self._settle_locked(sub)
+            self._cond.notify()
+
+    def _settle_locked(self, sub: OutputSubscription) -> None:
+        if sub.finished:
+            self._remove_locked(sub.id)
+        elif sub.available > sub.cursor and sub.dirty_at is None:
+            # More than one batch was waiting: send the rest without another interval.
+            sub.dirty_at = time.monotonic() - self.interval
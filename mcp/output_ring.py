@@ -0,0 +1,110 @@
+"""Fixed-capacity output ring addressed by absolute stream offsets."""
+from __future__ import annotations
+
+from typing import List
+
+
+class OutputRing:
+    """Keeps the newest ``capacity`` bytes of a stream in a bytearray of at most that size.
+
+    Offsets are absolute byte positions since the stream started, so callers can
+    hold cursors across wrap-arounds and tell exactly how much they missed.
+    Appends cost O(len(chunk)); readers get at most two memoryview slices and
+    must consume them before the owning lock is released.  The buffer grows
+    with the data until it reaches ``capacity`` and then wraps, so a quiet
+    stream only holds what it wrote; ``release`` gives it back and offsets
+    keep counting either way.
+    """
+
+    __slots__ = ("capacity", "_buf", "_base", "_end")
+
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._buf = bytearray()
+        self._base = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return min(self._end - self._base, self.capacity)
+
+    @property
+    def resident_bytes(self) -> int:
+        """Bytes held by the buffer; equal to ``len(self)`` since it never outgrows its data."""
+        return len(self._buf)
+
+    @property
+    def end_offset(self) -> int:
+        """Absolute offset one past the newest byte."""
+        return self._end
+
+    @property
+    def start_offset(self) -> int:
+        """Absolute offset of the oldest byte still retained."""
+        return self._end - len(self)
+
+    def restart_at(self, offset: int) -> None:
+        """Drop everything and continue the stream at absolute ``offset``."""
+        self._buf = bytearray()
+        self._base = self._end = max(0, offset)
+
+    def release(self) -> int:
+        """Free the buffer, keeping the stream position; returns the bytes freed."""
+        freed = len(self._buf)
+        self._buf = bytearray()
+        self._base = self._end
+        return freed
+
+    def append(self, data: bytes) -> None:
+        size = len(data)
+        if not size:
+            return
+        view = memoryview(data)
+        if size >= self.capacity:
+            self._buf = bytearray(view[size - self.capacity :])
+            self._end += size
+            self._base = self._end - self.capacity
+            return
+        room = self.capacity - len(self._buf)
+        if room:
+            # Still growing: the buffer holds [_base, _end) contiguously from index 0.
+            taken = min(room, size)
+            self._buf += view[:taken]
+            self._end += taken
+            view = view[taken:]
+            size -= taken
+            if not size:
+                return
+        pos = (self._end - self._base) % self.capacity
+        first = min(size, self.capacity - pos)
+        self._buf[pos : pos + first] = view[:first]
+        if first < size:
+            self._buf[: size - first] = view[first:]
+        self._end += size
+
+    def views(self, start: int, end: int | None = None) -> List[memoryview]:
+        """Return slices covering ``[start, end)``, clamped to the retained window."""
+        end = self._end if end is None else min(end, self._end)
+        start = max(start, self.start_offset)
+        if start >= end:
+            return []
+        buf = memoryview(self._buf)
+        head = (start - self._base) % self.capacity
+        tail = head + (end - start)
+        if tail <= self.capacity:
+            return [buf[head:tail]]
+        return [buf[head:], buf[: tail - self.capacity]]
+
+    def read(self, start: int, max_bytes: int = 0) -> tuple[bytes, int]:
+        """Copy out ``[start, end_offset)``, keeping only the newest ``max_bytes``.
+
+        Returns the bytes and the absolute offset of the first byte returned.
+        """
+        begin = max(start, self.start_offset)
+        if max_bytes and self._end - begin > max_bytes:
+            begin = self._end - max_bytes
+        parts = self.views(begin)
+        if len(parts) == 1:
+            return parts[0].tobytes(), begin
+        return b"".join(parts), begin
@@ -0,0 +1,80 @@
+"""Incremental multi-pattern matching over live instance output streams."""
+from __future__ import annotations
+
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+LOOKBEHIND_BYTES = 4096
+CONTEXT_BYTES = 240
+
+
+class PatternWatch:
+    """A set of compiled byte regexes waiting for their first match on any of several streams.
+
+    Streams are fed chunk by chunk with the absolute offset at which the chunk
+    ends.  The last ``LOOKBEHIND_BYTES`` of each stream are kept so a match that
+    straddles two chunks is still found, but only matches *ending* in the new
+    chunk count, so nothing is reported twice.  The first hit (earliest end,
+    then lowest pattern index) wins and sets ``done``.
+    """
+
+    def __init__(self, patterns: List["re.Pattern[bytes]"], stream_ids: Iterable[str]) -> None:
+        self.patterns = patterns
+        self.pending = set(stream_ids)
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.exited: List[str] = []
+        self._tails: Dict[str, bytes] = {}
+
+    def prime(self, stream_id: str, history: bytes) -> None:
+        """Seed lookbehind with bytes that must not match on their own."""
+        with self.lock:
+            self._tails[stream_id] = history[-LOOKBEHIND_BYTES:]
+
+    def feed(self, stream_id: str, data: bytes, end_offset: int) -> bool:
+        """Scan ``data`` (ending at ``end_offset``); returns True once the watch is satisfied."""
+        if not data:
+            return self.done.is_set()
+        with self.lock:
+            if self.done.is_set():
+                return True
+            tail = self._tails.get(stream_id, b"")
+            window = tail + data
+            boundary = len(tail)
+            best = None
+            for index, pattern in enumerate(self.patterns):
+                for match in pattern.finditer(window):
+                    if match.end() > boundary and match.end() > match.start():
+                        if best is None or match.end() < best[1].end():
+                            best = (index, match)
+                        break
+            if best is None:
+                self._tails[stream_id] = window[-LOOKBEHIND_BYTES:]
+                return False
+            index, match = best
+            base = end_offset - len(window)
+            self.result = {
+                "instanceId": stream_id,
+                "patternIndex": index,
+                "pattern": self.patterns[index].pattern.decode("utf-8", errors="replace"),
+                "match": match.group(0).decode("utf-8", errors="replace"),
+                "groups": [group.decode("utf-8", errors="replace") if group is not None else None for group in match.groups()],
+                "offset": base + match.start(),
+                "endOffset": base + match.end(),
+                "before": window[max(0, match.start() - CONTEXT_BYTES) : match.start()].decode("utf-8", errors="replace"),
+                "after": window[match.end() : match.end() + CONTEXT_BYTES].decode("utf-8", errors="replace"),
+            }
+            self.done.set()
+            return True
+
+    def stream_closed(self, stream_id: str) -> None:
+        """Record that a watched stream ended; the watch gives up once all of them have."""
+        with self.lock:
+            if stream_id not in self.pending:
+                return
+            self.pending.discard(stream_id)
+            self.exited.append(stream_id)
+            if not self.pending:
+                self.done.set()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""Detached holder that owns one worker's PTY (or pipes) so it outlives the MCP server.
+
+codexctl-mcp.py runs this instead of forking the worker directly:
+
+    python3 mcp/pty_holder.py --socket S --exit-file F [--pty] -- cmd args...
+
+The holder double-forks into its own session, spawns the worker, and
+listens on the Unix socket ``S``.  A client that connects receives a JSON
+header plus the worker's terminal fds via SCM_RIGHTS (the PTY master, or the
+stdin write end and stdout read end), so a restarted server can reattach
+without the worker noticing.  With ``--owner-lock L`` only the process whose
+pid is recorded in ``L`` (the server holding that lock) gets the fds; anyone
+else gets ``{"error": ...}`` and nothing else.  When the worker exits the holder writes
+``{"returncode": N}`` to ``F``, removes the socket and exits.  With
+``--orphan-seconds T`` as well, a worker whose owning server has been gone
+for ``T`` seconds (no live pid in ``L``) is hung up, so workers do not outlive
+a server that is never restarted.  The original
+process exits 0 once the socket is listening, or 1 with the error on stderr.
+"""
+from __future__ import annotations
+
+import argparse
+import fcntl
+import json
+import os
+import socket
+import struct
+import subprocess
+import signal
+import sys
+import termios
+import threading
+import time
+from typing import List, Optional
+
+# How long a holder whose worker already exited keeps its socket open for a
+# server that has not collected the fds (and the buffered output) yet.
+UNCLAIMED_GRACE_SECONDS = 30.0
+# How often the owning server's pid is checked, and how long a hung-up worker gets before SIGKILL.
+OWNER_POLL_SECONDS = 5.0
+HANGUP_GRACE_SECONDS = 10.0
+
+
+def configure_slave_pty(fd: int, rows: int, cols: int) -> None:
+    """Raw-ish line discipline (no echo, no canonical mode) and the advertised window size."""
+    try:
+        attrs = termios.tcgetattr(fd)
+    except termios.error:
+        return
+    lflag = attrs[3]
+    if lflag & (termios.ECHO | termios.ICANON):
+        attrs[3] = lflag & ~(termios.ECHO | termios.ICANON)
+    attrs[6][termios.VMIN] = 1
+    attrs[6][termios.VTIME] = 0
+    try:
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+    except termios.error:
+        pass
+    try:
+        fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack("HHHH", rows, cols, 0, 0))
+    except OSError:
+        pass
+
+
+def _spawn(cmd: List[str], use_pty: bool, rows: int, cols: int) -> tuple[subprocess.Popen[bytes], List[int]]:
+    if use_pty:
+        import pty
+
+        master_fd, slave_fd = pty.openpty()
+        configure_slave_pty(slave_fd, rows, cols)
+        proc = subprocess.Popen(cmd, stdin=slave_fd, stdout=slave_fd, stderr=slave_fd, close_fds=True)
+        os.close(slave_fd)
+        return proc, [master_fd]
+    stdin_r, stdin_w = os.pipe()
+    stdout_r, stdout_w = os.pipe()
+    proc = subprocess.Popen(cmd, stdin=stdin_r, stdout=stdout_w, stderr=stdout_w, close_fds=True)
+    os.close(stdin_r)
+    os.close(stdout_w)
+    return proc, [stdin_w, stdout_r]
+
+
+def owner_pid(lock_path: str) -> Optional[int]:
+    """Pid the owning server wrote into its lock file, or None."""
+    try:
+        with open(lock_path, "r", encoding="utf-8") as handle:
+            return int(handle.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _owner_alive(lock_path: str) -> bool:
+    pid = owner_pid(lock_path)
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _wait_worker(proc: subprocess.Popen[bytes], owner_lock: Optional[str], orphan_seconds: float) -> int:
+    """Wait for the worker, hanging it up once no owning server has been alive for ``orphan_seconds``."""
+    if owner_lock is None or orphan_seconds <= 0:
+        return proc.wait()
+    orphaned_since: Optional[float] = None
+    while True:
+        try:
+            return proc.wait(timeout=OWNER_POLL_SECONDS)
+        except subprocess.TimeoutExpired:
+            pass
+        if _owner_alive(owner_lock):
+            orphaned_since = None
+            continue
+        now = time.monotonic()
+        if orphaned_since is None:
+            orphaned_since = now
+        elif now - orphaned_since >= orphan_seconds:
+            proc.send_signal(signal.SIGHUP)
+            try:
+                return proc.wait(timeout=HANGUP_GRACE_SECONDS)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                return proc.wait()
+
+
+def _peer_pid(conn: socket.socket) -> int:
+    creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)[0]
+
+
+def _serve(listener: socket.socket, header: bytes, fds: List[int], claimed: threading.Event, owner_lock: Optional[str]) -> None:
+    while True:
+        try:
+            conn, _ = listener.accept()
+        except OSError:
+            return
+        with conn:
+            try:
+                if owner_lock is not None:
+                    peer, owner = _peer_pid(conn), owner_pid(owner_lock)
+                    if peer != owner:
+                        conn.sendall(json.dumps({"error": f"pid {peer} is not the owning server (pid {owner})"}).encode("utf-8"))
+                        continue
+                socket.send_fds(conn, [header], fds)
+            except OSError:
+                continue
+        claimed.set()
+
+
+def _write_exit(path: str, returncode: int) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as handle:
+        json.dump({"returncode": returncode}, handle)
+    os.replace(tmp, path)
+
+
+def _run_holder(args: argparse.Namespace, report_fd: int) -> None:
+    try:
+        proc, fds = _spawn(args.cmd, args.pty, args.rows, args.cols)
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(args.socket)
+        listener.listen(4)
+    except Exception as exc:
+        os.write(report_fd, f"error: {exc}".encode("utf-8"))
+        os._exit(1)
+    header = json.dumps({"pid": proc.pid, "holderPid": os.getpid(), "pty": args.pty}).encode("utf-8")
+    claimed = threading.Event()
+    threading.Thread(target=_serve, args=(listener, header, fds, claimed, args.owner_lock), daemon=True).start()
+    os.write(report_fd, b"ok")
+    os.close(report_fd)
+    returncode = _wait_worker(proc, args.owner_lock, args.orphan_seconds)
+    try:
+        _write_exit(args.exit_file, returncode)
+        # A worker that exits straight away must still reach the server that launched it.
+        claimed.wait(UNCLAIMED_GRACE_SECONDS)
+    finally:
+        try:
+            os.unlink(args.socket)
+        except OSError:
+            pass
+        os._exit(0)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Hold a worker's terminal across MCP server restarts")
+    parser.add_argument("--socket", required=True, help="Unix socket to hand out the worker fds on")
+    parser.add_argument("--exit-file", required=True, help="Where to write the worker's exit status")
+    parser.add_argument("--owner-lock", help="Only hand the fds to the server whose pid is in this lock file")
+    parser.add_argument(
+        "--orphan-seconds", type=float, default=0.0, help="Hang up the worker after the owner has been gone this long (0 = never)"
+    )
+    parser.add_argument("--pty", action="store_true", help="Run the worker under a PTY instead of pipes")
+    parser.add_argument("--rows", type=int, default=40)
+    parser.add_argument("--cols", type=int, default=120)
+    parser.add_argument("cmd", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    if args.cmd and args.cmd[0] == "--":
+        args.cmd = args.cmd[1:]
+    if not args.cmd:
+        parser.error("missing worker command")
+
+    report_r, report_w = os.pipe()
+    if os.fork() > 0:
+        os.close(report_w)
+        chunks = []
+        while True:
+            chunk = os.read(report_r, 4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        message = b"".join(chunks).decode("utf-8", errors="replace")
+        if message == "ok":
+            return 0
+        sys.stderr.write((message or "holder exited before the worker started") + "\n")
+        return 1
+
+    os.close(report_r)
+    os.setsid()
+    if os.fork() > 0:
+        os._exit(0)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.close(devnull)
+    _run_holder(args, report_w)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,101 @@
+import re
+
+import pytest
+
+import log_index
+from transcript_store import SegmentedTranscript
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(log_index, "BLOCK_BYTES", 64)
+    monkeypatch.setattr(log_index, "MAX_BLOCK_BYTES", 256)
+    monkeypatch.setattr(log_index, "LINE_STRIDE", 4)
+
+
+def _transcript(tmp_path, lines):
+    store = SegmentedTranscript(tmp_path)
+    data = "".join(f"{line}\n" for line in lines).encode()
+    with store.active_path.open("ab") as handle:
+        handle.write(data)
+        store.note_active_size(handle.tell())
+    return store, data
+
+
+def test_postings_narrow_candidate_ranges(tmp_path, small_blocks):
+    lines = [f"row {i} ok filler text" for i in range(40)]
+    lines[25] = "row 25 kaboom happened"
+    store, data = _transcript(tmp_path, lines)
+    index = log_index.TranscriptIndex(store)
+    index.sync()
+    ranges = index.candidate_ranges(log_index.literal_runs("kaboom", False))
+    assert sum(end - start for start, end in ranges) < len(data)
+    assert any(b"kaboom" in store.read(start, end) for start, end in ranges)
+    unsearched = [(index._open_start, index.indexed_end)] if index.indexed_end > index._open_start else []
+    assert index.candidate_ranges(log_index.literal_runs("absent_word", False)) == unsearched
+
+
+def test_search_reports_line_numbers_and_context(tmp_path, small_blocks):
+    lines = [f"line {i} ok" for i in range(30)]
+    lines[17] = "line 17 ERROR boom"
+    store, _ = _transcript(tmp_path, lines)
+    index = log_index.TranscriptIndex(store)
+    index.sync()
+    runs = log_index.literal_runs(r"ERROR \w+", True)
+    hits = list(log_index.search(index, re.compile(rb"ERROR \w+"), runs, store.read, 1))
+    assert [(hit["line"], hit["text"], hit["before"], hit["after"]) for hit in hits] == [
+        (18, "line 17 ERROR boom", ["line 16 ok"], ["line 18 ok"])
+    ]
+
+
+def test_line_offsets_use_sparse_marks(tmp_path, small_blocks):
+    lines = [f"l{i}" for i in range(23)]
+    store, data = _transcript(tmp_path, lines)
+    index = log_index.TranscriptIndex(store)
+    index.sync()
+    assert index.line_count == 23
+    for number in (1, 4, 5, 13, 23):
+        offset = index.line_offset(number, store.read)
+        assert data[offset:].split(b"\n", 1)[0] == f"l{number - 1}".encode()
+        assert index.line_number(offset, store.read) == number
+    assert index.line_offset(99, store.read) is None
+
+
+def test_journal_replay_matches_live_index(tmp_path, small_blocks):
+    lines = [f"entry {i} alpha beta_{i % 3}" for i in range(60)]
+    store, data = _transcript(tmp_path, lines)
+    journal = tmp_path / "segments" / log_index.JOURNAL_NAME
+    live = log_index.TranscriptIndex(store, journal)
+    live.append(0, data)
+    assert journal.exists()
+    replayed = log_index.TranscriptIndex(store, journal)
+    assert replayed.indexed_end == live._open_start
+    replayed.sync()
+    assert list(replayed.block_starts) == list(live.block_starts)
+    assert list(replayed.line_marks) == list(live.line_marks)
+    assert replayed.line_count == live.line_count
+    assert {token: list(ids) for token, ids in replayed.postings.items()} == {
+        token: list(ids) for token, ids in live.postings.items()
+    }
+
+
+def test_journal_drops_torn_and_stale_records(tmp_path, small_blocks):
+    store, data = _transcript(tmp_path, [f"entry {i} gamma" for i in range(40)])
+    journal = tmp_path / "segments" / log_index.JOURNAL_NAME
+    log_index.TranscriptIndex(store, journal).append(0, data)
+    good = journal.read_bytes()
+    journal.write_bytes(good + b'{"s": 1, "e":')
+    log_index.TranscriptIndex(store, journal)
+    assert journal.read_bytes() == good
+    last = good.rstrip(b"\n").rsplit(b"\n", 1)[-1]
+    stale_start = int(re.search(rb'"e":(\d+)', last).group(1))
+    journal.write_bytes(good + b'{"s":%d,"e":%d,"l":1,"m":[],"t":"x"}\n' % (stale_start, len(data) + 100))
+    index = log_index.TranscriptIndex(store, journal)
+    assert index.indexed_end <= len(data)
+    assert journal.read_bytes() == good
+
+
+def test_literal_runs_mark_open_ends():
+    assert log_index.literal_runs("foo.bar", False) == [("foo", True, False), ("bar", False, True)]
+    assert log_index.literal_runs(r"error: \d+ items?", True) == [("error", True, False), ("item", False, True)]
+    assert log_index.literal_runs("ab 12345", False) == []
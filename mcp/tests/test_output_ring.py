@@ -0,0 +1,70 @@
+import pytest
+
+from output_ring import OutputRing
+
+
+def test_offsets_are_absolute_across_wraps():
+    ring = OutputRing(8)
+    ring.append(b"abcdef")
+    ring.append(b"ghij")
+    assert ring.end_offset == 10
+    assert ring.start_offset == 2
+    assert ring.read(0) == (b"cdefghij", 2)
+    assert ring.read(7) == (b"hij", 7)
+
+
+def test_views_cover_the_wrapped_range():
+    ring = OutputRing(8)
+    ring.append(b"012345")
+    ring.append(b"6789ab")
+    parts = ring.views(5, 11)
+    assert len(parts) == 2
+    assert b"".join(part.tobytes() for part in parts) == b"56789a"
+
+
+def test_read_keeps_only_the_newest_max_bytes():
+    ring = OutputRing(16)
+    ring.append(b"hello world")
+    assert ring.read(0, max_bytes=5) == (b"world", 6)
+
+
+def test_chunk_larger_than_capacity_keeps_its_tail():
+    ring = OutputRing(4)
+    ring.append(b"xy")
+    ring.append(b"0123456789")
+    assert ring.end_offset == 12
+    assert ring.read(0) == (b"6789", 8)
+
+
+def test_buffer_grows_with_the_data():
+    ring = OutputRing(1024)
+    assert ring.resident_bytes == 0
+    ring.append(b"x" * 100)
+    assert ring.resident_bytes == len(ring) == 100
+    ring.append(b"y" * 2000)
+    assert ring.resident_bytes == len(ring) == 1024
+
+
+def test_release_frees_memory_and_keeps_counting():
+    ring = OutputRing(8)
+    ring.append(b"abcdef")
+    assert ring.release() == 6
+    assert ring.resident_bytes == 0
+    assert ring.start_offset == ring.end_offset == 6
+    assert ring.read(0) == (b"", 6)
+    ring.append(b"gh")
+    assert ring.read(0) == (b"gh", 6)
+
+
+def test_restart_at_continues_at_the_given_offset():
+    ring = OutputRing(8)
+    ring.append(b"abc")
+    ring.restart_at(100)
+    assert (ring.start_offset, ring.end_offset, ring.resident_bytes) == (100, 100, 0)
+    ring.append(b"0123456789")
+    assert ring.read(0) == (b"23456789", 102)
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        OutputRing(0)
@@ -0,0 +1,56 @@
+import re
+
+from pattern_watch import LOOKBEHIND_BYTES, PatternWatch
+
+
+def _watch(*patterns, streams=("a",)):
+    return PatternWatch([re.compile(pattern) for pattern in patterns], streams)
+
+
+def test_match_split_across_chunks():
+    watch = _watch(rb"Approve\? \[y/n\]")
+    assert not watch.feed("a", b"output... Appr", 14)
+    assert watch.feed("a", b"ove? [y/n] ", 25)
+    assert watch.result["offset"] == 10
+    assert watch.result["endOffset"] == 24
+    assert watch.result["before"] == "output... "
+
+
+def test_match_split_over_many_small_chunks():
+    watch = _watch(rb"READY")
+    offset = 0
+    for chunk in (b"xxRE", b"A", b"D", b"Yzz"):
+        offset += len(chunk)
+        done = watch.feed("a", chunk, offset)
+    assert done
+    assert (watch.result["offset"], watch.result["endOffset"]) == (2, 7)
+
+
+def test_old_matches_are_not_reported_again():
+    watch = _watch(rb"done")
+    watch.prime("a", b"already done\n")
+    assert not watch.feed("a", b"more output\n", 25)
+    assert watch.feed("a", b"now done\n", 34)
+    assert watch.result["offset"] == 29
+
+
+def test_earliest_match_wins_across_patterns():
+    watch = _watch(rb"second", rb"first")
+    assert watch.feed("a", b"first then second", 17)
+    assert watch.result["patternIndex"] == 1
+    assert watch.result["match"] == "first"
+
+
+def test_lookbehind_is_bounded():
+    watch = _watch(rb"needle")
+    watch.feed("a", b"x" * (LOOKBEHIND_BYTES * 3), LOOKBEHIND_BYTES * 3)
+    assert len(watch._tails["a"]) == LOOKBEHIND_BYTES
+
+
+def test_gives_up_when_every_stream_closed():
+    watch = _watch(rb"never", streams=("a", "b"))
+    watch.stream_closed("a")
+    assert not watch.done.is_set()
+    watch.stream_closed("b")
+    assert watch.done.is_set()
+    assert watch.result is None and watch.exited == ["a", "b"]
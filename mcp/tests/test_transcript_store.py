@@ -0,0 +1,66 @@
+from transcript_store import SegmentedTranscript
+
+
+def _write(store, data):
+    with store.active_path.open("ab") as handle:
+        handle.write(data)
+        store.note_active_size(handle.tell())
+
+
+def _fill(tmp_path, parts):
+    store = SegmentedTranscript(tmp_path)
+    tmp_path.mkdir(parents=True, exist_ok=True)
+    for part in parts:
+        _write(store, part)
+        store.roll()
+    return store
+
+
+def test_offsets_track_writes_without_stat(tmp_path):
+    store = SegmentedTranscript(tmp_path)
+    assert (store.start_offset, store.end_offset) == (0, 0)
+    _write(store, b"hello\n")
+    assert store.end_offset == 6
+    assert store.read(0, 6) == b"hello\n"
+
+
+def test_roll_keeps_the_logical_stream(tmp_path):
+    store = _fill(tmp_path, [b"first\n", b"second\n"])
+    _write(store, b"third\n")
+    assert [segment.start for segment in store.segments] == [0, 6]
+    assert store.base_offset == 13
+    assert store.end_offset == 19
+    assert store.read(0, 19) == b"first\nsecond\nthird\n"
+    assert store.read(3, 16) == b"st\nsecond\nthi"
+
+
+def test_compressed_segments_read_across_frames(tmp_path, monkeypatch):
+    monkeypatch.setattr("transcript_store.FRAME_BYTES", 1000)
+    payload = bytes(range(256)) * 20
+    store = _fill(tmp_path, [payload])
+    _write(store, b"tail")
+    segment = store.segments[0]
+    store.compress(segment, 6)
+    assert segment.compressed and len(segment.frames) == 6
+    assert segment.path.name.endswith(".log.gz")
+    assert store.read(0, len(payload)) == payload
+    assert store.read(990, 2010) == payload[990:2010]
+    assert store.read(len(payload) - 2, len(payload) + 4) == payload[-2:] + b"tail"
+
+
+def test_reload_restores_segments_and_offsets(tmp_path):
+    store = _fill(tmp_path, [b"a" * 50, b"b" * 50])
+    store.compress(store.segments[0], 6)
+    _write(store, b"c" * 10)
+    again = SegmentedTranscript(tmp_path)
+    assert [segment.compressed for segment in again.segments] == [True, False]
+    assert (again.start_offset, again.end_offset) == (0, 110)
+    assert again.read(45, 105) == b"a" * 5 + b"b" * 50 + b"c" * 5
+
+
+def test_drop_oldest_moves_the_start(tmp_path):
+    store = _fill(tmp_path, [b"old\n", b"new\n"])
+    store.drop_oldest()
+    assert store.start_offset == 4
+    assert store.read(0, 8) == b"new\n"
+    assert SegmentedTranscript(tmp_path).start_offset == 4
@@ -0,0 +1,405 @@
+"""Segmented transcript storage: a plain active ``output.log`` plus compressed closed segments."""
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import queue
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Tuple
+
+ACTIVE_NAME = "output.log"
+SEGMENT_DIR = "segments"
+MANIFEST_NAME = "manifest.json"
+FRAME_BYTES = 1_048_576
+FRAME_CACHE_SIZE = 8
+MAP_CACHE_SIZE = 4
+
+
+@dataclass
+class Segment:
+    """One closed slice ``[start, end)`` of the logical transcript stream.
+
+    ``frames`` lists ``(logical_offset, file_offset)`` for every independently
+    decompressible gzip member; it is empty while the segment is still raw.
+    """
+
+    start: int
+    end: int
+    path: Path
+    frames: List[Tuple[int, int]] = field(default_factory=list)
+
+    @property
+    def compressed(self) -> bool:
+        return bool(self.frames)
+
+    @property
+    def index_path(self) -> Path:
+        return self.path.with_name(f"{self.start:016d}.idx")
+
+    def disk_bytes(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+
+class SegmentedTranscript:
+    """Logical append-only byte stream for one instance directory.
+
+    New output always goes to ``output.log`` (the active segment), so tail/grep
+    on that file keeps working.  ``roll`` moves it into ``segments/`` once it
+    is large enough; ``compress`` rewrites a closed segment as concatenated
+    gzip members of ``FRAME_BYTES`` each plus a small JSON offset index, so any
+    logical byte range can be read by inflating only the frames it touches.
+    ``zcat segments/*.log.gz`` still yields the original bytes.
+
+    Raw files (the active log and not-yet-compressed segments) are read
+    through a few cached read-only mmaps, so a range read is one slice of the
+    page cache instead of open/seek/read; the active map is re-created when a
+    read reaches past its length.
+
+    ``start_offset``/``end_offset`` are plain attributes, kept current by
+    ``note_active_size`` (called by the writer after each write), ``roll`` and
+    ``drop_oldest``, so callers holding an instance lock never stat the file
+    or wait for a read in progress.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.active_path = directory / ACTIVE_NAME
+        self.segment_dir = directory / SEGMENT_DIR
+        self.lock = threading.RLock()
+        self.base_offset = 0
+        self.segments: List[Segment] = []
+        self._start = 0
+        self._end = 0
+        self._frame_cache: "OrderedDict[Tuple[int, int], bytes]" = OrderedDict()
+        self._maps: "OrderedDict[Path, mmap.mmap]" = OrderedDict()
+        self._load()
+
+    # -- state ---------------------------------------------------------------
+    def _load(self) -> None:
+        manifest = self.segment_dir / MANIFEST_NAME
+        try:
+            self.base_offset = int(json.loads(manifest.read_text(encoding="utf-8")).get("base", 0))
+        except (OSError, ValueError, AttributeError):
+            self.base_offset = 0
+        paths = sorted(self.segment_dir.glob("*.log*")) if self.segment_dir.is_dir() else []
+        for path in paths:
+            stem = path.name.split(".", 1)[0]
+            if not stem.isdigit() or path.name.endswith(".tmp"):
+                continue
+            start = int(stem)
+            if path.suffix == ".gz":
+                try:
+                    meta = json.loads(path.with_name(f"{stem}.idx").read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    logging.warning("transcript segment %s has no readable index; skipping", path)
+                    continue
+                segment = Segment(start, int(meta["end"]), path, [tuple(frame) for frame in meta["frames"]])
+            else:
+                if path.with_name(f"{stem}.log.gz").exists():
+                    continue  # compression finished but the raw copy was not removed yet
+                segment = Segment(start, start + path.stat().st_size, path)
+            self.segments.append(segment)
+        if self.segments:
+            self.base_offset = max(self.base_offset, self.segments[-1].end)
+        self._start = self.segments[0].start if self.segments else self.base_offset
+        try:
+            self._end = self.base_offset + self.active_path.stat().st_size
+        except OSError:
+            self._end = self.base_offset
+
+    def _write_manifest(self) -> None:
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+        target = self.segment_dir / MANIFEST_NAME
+        tmp = target.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"base": self.base_offset}), encoding="utf-8")
+        os.replace(tmp, target)
+
+    @property
+    def start_offset(self) -> int:
+        return self._start
+
+    @property
+    def end_offset(self) -> int:
+        return self._end
+
+    def note_active_size(self, size: int) -> None:
+        """Record the active segment's size after a write."""
+        with self.lock:
+            self._end = self.base_offset + size
+
+    def release(self) -> None:
+        """Drop cached mmaps and inflated frames; reads recreate them on demand."""
+        with self.lock:
+            for path in list(self._maps):
+                self._unmap(path)
+            self._frame_cache.clear()
+
+    def disk_bytes(self) -> int:
+        with self.lock:
+            closed = sum(segment.disk_bytes() for segment in self.segments)
+        try:
+            return closed + self.active_path.stat().st_size
+        except OSError:
+            return closed
+
+    # -- writer side -----------------------------------------------------------
+    def roll(self) -> Optional[Segment]:
+        """Close the active segment; the caller must have closed its write handle."""
+        with self.lock:
+            try:
+                size = self.active_path.stat().st_size
+            except OSError:
+                return None
+            if size == 0:
+                return None
+            self.segment_dir.mkdir(parents=True, exist_ok=True)
+            segment = Segment(self.base_offset, self.base_offset + size, self.segment_dir / f"{self.base_offset:016d}.log")
+            self._unmap(self.active_path)
+            os.replace(self.active_path, segment.path)
+            self.segments.append(segment)
+            self.base_offset = segment.end
+            self._write_manifest()
+            self.active_path.touch()
+            return segment
+
+    def compress(self, segment: Segment, level: int) -> None:
+        """Rewrite a raw closed segment as framed gzip; readers switch over atomically."""
+        if segment.compressed or not segment.path.exists():
+            return
+        target = segment.path.with_name(f"{segment.start:016d}.log.gz")
+        tmp = target.with_name(target.name + ".tmp")
+        frames: List[Tuple[int, int]] = []
+        with segment.path.open("rb") as source, tmp.open("wb") as sink:
+            logical = segment.start
+            while True:
+                chunk = source.read(FRAME_BYTES)
+                if not chunk:
+                    break
+                frames.append((logical, sink.tell()))
+                packer = zlib.compressobj(level, zlib.DEFLATED, 31)
+                sink.write(packer.compress(chunk) + packer.flush())
+                logical += len(chunk)
+            sink.flush()
+            os.fsync(sink.fileno())
+        index_tmp = segment.index_path.with_suffix(".idx.tmp")
+        index_tmp.write_text(json.dumps({"start": segment.start, "end": segment.end, "frames": frames}), encoding="utf-8")
+        with self.lock:
+            os.replace(index_tmp, segment.index_path)
+            os.replace(tmp, target)
+            raw = segment.path
+            segment.path = target
+            segment.frames = frames
+            self._unmap(raw)
+            raw.unlink(missing_ok=True)
+
+    def drop_oldest(self) -> Optional[Segment]:
+        with self.lock:
+            if not self.segments:
+                return None
+            segment = self.segments.pop(0)
+            self._unmap(segment.path)
+            segment.path.unlink(missing_ok=True)
+            segment.index_path.unlink(missing_ok=True)
+            for key in [key for key in self._frame_cache if key[0] == segment.start]:
+                del self._frame_cache[key]
+            self._start = self.segments[0].start if self.segments else self.base_offset
+            if not self.segments:
+                self._write_manifest()  # keep the logical base once no segment file records it
+            return segment
+
+    def enforce_retention(self, max_age: float, max_bytes: int) -> int:
+        """Drop closed segments older than ``max_age`` seconds or beyond ``max_bytes`` on disk."""
+        dropped = 0
+        now = time.time()
+        while True:
+            with self.lock:
+                if not self.segments:
+                    return dropped
+                oldest = self.segments[0]
+                try:
+                    too_old = max_age > 0 and now - oldest.path.stat().st_mtime > max_age
+                except OSError:
+                    too_old = True
+                too_big = max_bytes > 0 and sum(segment.disk_bytes() for segment in self.segments) > max_bytes
+                if not (too_old or too_big):
+                    return dropped
+                self.drop_oldest()
+                dropped += 1
+
+    # -- reader side -----------------------------------------------------------
+    def read(self, start: int, end: int) -> bytes:
+        """Bytes ``[start, end)`` of the logical stream; dropped ranges read as empty."""
+        parts: List[bytes] = []
+        with self.lock:
+            start = max(start, self.segments[0].start if self.segments else self.base_offset)
+            for segment in self.segments:
+                if start >= end:
+                    break
+                if segment.end <= start:
+                    continue
+                if segment.start >= end:
+                    break
+                stop = min(end, segment.end)
+                parts.append(self._read_segment(segment, start, stop))
+                start = stop
+            if start < end:
+                parts.append(self._read_raw(self.active_path, start - self.base_offset, end - self.base_offset))
+        return b"".join(parts)
+
+    def _read_segment(self, segment: Segment, start: int, end: int) -> bytes:
+        if not segment.compressed:
+            return self._read_raw(segment.path, start - segment.start, end - segment.start)
+        parts: List[bytes] = []
+        for number, (frame_start, _) in enumerate(segment.frames):
+            frame_end = segment.frames[number + 1][0] if number + 1 < len(segment.frames) else segment.end
+            if frame_end <= start or frame_start >= end:
+                continue
+            data = self._frame(segment, number)
+            parts.append(data[max(0, start - frame_start) : end - frame_start])
+        return b"".join(parts)
+
+    def _frame(self, segment: Segment, number: int) -> bytes:
+        key = (segment.start, number)
+        cached = self._frame_cache.get(key)
+        if cached is not None:
+            self._frame_cache.move_to_end(key)
+            return cached
+        offset = segment.frames[number][1]
+        with segment.path.open("rb") as handle:
+            handle.seek(offset)
+            if number + 1 < len(segment.frames):
+                blob = handle.read(segment.frames[number + 1][1] - offset)
+            else:
+                blob = handle.read()
+        data = zlib.decompress(blob, 31)
+        self._frame_cache[key] = data
+        if len(self._frame_cache) > FRAME_CACHE_SIZE:
+            self._frame_cache.popitem(last=False)
+        return data
+
+    def _read_raw(self, path: Path, start: int, end: int) -> bytes:
+        if end <= start:
+            return b""
+        mapped = self._maps.get(path)
+        if mapped is None or len(mapped) < end:
+            self._unmap(path)
+            mapped = self._map(path)
+            if mapped is None:
+                return self._read_file(path, start, end)
+        self._maps.move_to_end(path)
+        return mapped[max(0, start) : end]
+
+    def _map(self, path: Path) -> Optional[mmap.mmap]:
+        try:
+            with path.open("rb") as handle:
+                if os.fstat(handle.fileno()).st_size == 0:
+                    return None
+                mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None  # empty file or a filesystem without mmap support
+        self._maps[path] = mapped
+        if len(self._maps) > MAP_CACHE_SIZE:
+            self._maps.popitem(last=False)[1].close()
+        return mapped
+
+    def _unmap(self, path: Path) -> None:
+        mapped = self._maps.pop(path, None)
+        if mapped is not None:
+            mapped.close()
+
+    @staticmethod
+    def _read_file(path: Path, start: int, end: int) -> bytes:
+        if end <= start:
+            return b""
+        try:
+            with path.open("rb") as handle:
+                handle.seek(max(0, start))
+                return handle.read(end - max(0, start))
+        except OSError:
+            return b""
+
+
+class SegmentCompactor:
+    """Daemon thread that compresses rolled segments and applies retention.
+
+    ``retention`` is called after every compression and every ``sweep_interval``
+    seconds so age-based limits apply even to idle transcripts.
+    """
+
+    def __init__(self, level: int, retention: Callable[[], None], sweep_interval: float = 60.0) -> None:
+        self.level = level
+        self.retention = retention
+        self.sweep_interval = sweep_interval
+        self._queue: "queue.Queue[Tuple[SegmentedTranscript, Segment]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, store: SegmentedTranscript, segment: Segment) -> None:
+        self._ensure_started()
+        self._queue.put((store, segment))
+
+    def submit_pending(self, stores: Iterable[SegmentedTranscript]) -> None:
+        """Queue raw segments left behind by an earlier run."""
+        for store in stores:
+            with store.lock:
+                pending = [segment for segment in store.segments if not segment.compressed]
+            for segment in pending:
+                self.submit(store, segment)
+
+    def _ensure_started(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="codexhive-log-compactor", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                store, segment = self._queue.get(timeout=self.sweep_interval)
+            except queue.Empty:
+                self._retain()
+                continue
+            if self.level > 0:
+                try:
+                    store.compress(segment, self.level)
+                except OSError as exc:
+                    logging.warning("compressing transcript segment %s failed: %s", segment.path, exc)
+            self._retain()
+
+    def _retain(self) -> None:
+        try:
+            self.retention()
+        except OSError as exc:
+            logging.warning("transcript retention failed: %s", exc)
+
+
+def enforce_total_retention(stores: Iterable[SegmentedTranscript], max_bytes: int) -> int:
+    """Drop the globally oldest closed segments until all stores fit ``max_bytes``."""
+    if max_bytes <= 0:
+        return 0
+    stores = list(stores)
+    dropped = 0
+    while sum(store.disk_bytes() for store in stores) > max_bytes:
+        candidates = []
+        for store in stores:
+            with store.lock:
+                if store.segments:
+                    try:
+                        candidates.append((store.segments[0].path.stat().st_mtime, id(store), store))
+                    except OSError:
+                        candidates.append((0.0, id(store), store))
+        if not candidates:
+            break
+        min(candidates, key=lambda item: (item[0], item[1]))[2].drop_oldest()
+        dropped += 1
+    return dropped
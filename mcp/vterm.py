@@ -0,0 +1,319 @@
+"""Minimal incremental VT100/xterm screen model for worker PTY output."""
+from __future__ import annotations
+
+import codecs
+import re
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+_CONTROL = re.compile(r"[\x00-\x1f\x7f]")
+ESCAPE_SEQUENCE = re.compile(
+    r"\x1b(?:"
+    r"\[(?P<csi_params>[0-?]*)(?P<csi_inter>[ -/]*)(?P<csi_final>[@-~])"
+    r"|\](?P<osc>[^\x07\x1b]*)(?:\x07|\x1b\\)"
+    r"|[PX^_][^\x1b]*\x1b\\"
+    r"|(?P<esc_inter>[ -/]*)(?P<esc_final>[0-OQ-WYZ\\`a-~])"
+    r")"
+)
+PARTIAL_ESCAPE = re.compile(r"\x1b(?:\[[0-?]*[ -/]*|\][^\x07\x1b]*\x1b?|[PX^_][^\x1b]*\x1b?|[ -/]*)\Z")
+MAX_PENDING_CHARS = 65_536
+ALT_SCREEN_MODES = {"47", "1047", "1049"}
+
+
+class VirtualScreen:
+    """Rows x cols character grid fed incrementally from a PTY byte stream.
+
+    Only what matters for rendering text is modelled: cursor motion, erase,
+    insert/delete, scroll regions, the alternate screen and scrollback.
+    Colours and other attributes are discarded.  Every row remembers the
+    ``revision`` that last changed it so callers can ask for diffs.
+    """
+
+    def __init__(self, rows: int = 40, cols: int = 120, scrollback: int = 1000) -> None:
+        self.rows = max(1, rows)
+        self.cols = max(1, cols)
+        self.revision = 0
+        self.scrollback: Deque[Tuple[int, str]] = deque(maxlen=max(0, scrollback))
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = ""
+        self._main = self._blank_grid()
+        self._alt: Optional[List[List[str]]] = None
+        self._grid = self._main
+        self._row_rev = [0] * self.rows
+        self._rev = 0
+        self.row = 0
+        self.col = 0
+        self._saved = (0, 0)
+        self._top = 0
+        self._bottom = self.rows - 1
+
+    # -- public API -----------------------------------------------------
+    @property
+    def cursor(self) -> Tuple[int, int]:
+        """0-based cursor position (column clamped while a wrap is pending)."""
+        return self.row, min(self.col, self.cols - 1)
+
+    def feed(self, data: bytes) -> None:
+        text = self._pending + self._decoder.decode(data)
+        self._pending = ""
+        self._rev = self.revision + 1
+        self._process(text)
+        if self._rev in self._row_rev or (self.scrollback and self.scrollback[-1][0] == self._rev):
+            self.revision = self._rev
+
+    def lines(self) -> List[str]:
+        return ["".join(row).rstrip() for row in self._grid]
+
+    def changed_since(self, revision: int) -> List[Tuple[int, str]]:
+        return [(index, "".join(row).rstrip()) for index, row in enumerate(self._grid) if self._row_rev[index] > revision]
+
+    def scrollback_since(self, revision: int) -> List[str]:
+        return [text for rev, text in self.scrollback if rev > revision]
+
+    # -- parser -----------------------------------------------------------
+    def _process(self, text: str) -> None:
+        pos = 0
+        length = len(text)
+        while pos < length:
+            match = _CONTROL.search(text, pos)
+            end = match.start() if match else length
+            if end > pos:
+                self._put_text(text[pos:end])
+            if match is None:
+                return
+            char = text[end]
+            if char != "\x1b":
+                self._control(char)
+                pos = end + 1
+                continue
+            seq = ESCAPE_SEQUENCE.match(text, end)
+            if seq is None:
+                if PARTIAL_ESCAPE.match(text, end) and length - end <= MAX_PENDING_CHARS:
+                    self._pending = text[end:]
+                    return
+                pos = end + 1
+                continue
+            if seq.group("csi_final"):
+                self._csi(seq.group("csi_params"), seq.group("csi_inter"), seq.group("csi_final"))
+            elif seq.group("esc_final") and not seq.group("esc_inter"):
+                self._esc(seq.group("esc_final"))
+            pos = seq.end()
+
+    def _control(self, char: str) -> None:
+        if char == "\r":
+            self.col = 0
+        elif char in "\n\x0b\x0c":
+            self._linefeed()
+        elif char == "\b":
+            self.col = max(0, min(self.col, self.cols - 1) - 1)
+        elif char == "\t":
+            self.col = min(self.cols - 1, (self.col // 8 + 1) * 8)
+
+    def _esc(self, final: str) -> None:
+        if final == "7":
+            self._saved = (self.row, self.col)
+        elif final == "8":
+            self.row, self.col = self._saved
+        elif final == "D":
+            self._linefeed()
+        elif final == "E":
+            self.col = 0
+            self._linefeed()
+        elif final == "M":
+            if self.row == self._top:
+                self._scroll_down(1)
+            else:
+                self.row = max(0, self.row - 1)
+        elif final == "c":
+            self._grid[:] = self._blank_grid()
+            self.row = self.col = 0
+            self._top, self._bottom = 0, self.rows - 1
+            self._touch_all()
+
+    def _csi(self, raw_params: str, inter: str, final: str) -> None:
+        private = raw_params[:1] in {"?", ">", "<", "="}
+        body = raw_params[1:] if private else raw_params
+        params = [int(part) if part.isdigit() else 0 for part in body.split(";")] if body else []
+
+        def arg(index: int = 0, default: int = 1) -> int:
+            value = params[index] if index < len(params) else 0
+            return value or default
+
+        if inter:
+            return
+        if private:
+            if raw_params[0] == "?" and final in "hl":
+                for mode in body.split(";"):
+                    if mode in ALT_SCREEN_MODES:
+                        self._set_alt_screen(final == "h", save_cursor=mode == "1049")
+            return
+        if final == "A":
+            self.row = max(self._top if self.row >= self._top else 0, self.row - arg())
+        elif final == "B":
+            self.row = min(self._bottom if self.row <= self._bottom else self.rows - 1, self.row + arg())
+        elif final == "C" or final == "a":
+            self.col = min(self.cols - 1, self.col + arg())
+        elif final == "D":
+            self.col = max(0, min(self.col, self.cols - 1) - arg())
+        elif final == "E":
+            self.row = min(self.rows - 1, self.row + arg())
+            self.col = 0
+        elif final == "F":
+            self.row = max(0, self.row - arg())
+            self.col = 0
+        elif final == "G" or final == "`":
+            self.col = min(self.cols - 1, arg() - 1)
+        elif final == "H" or final == "f":
+            self.row = min(self.rows - 1, arg(0) - 1)
+            self.col = min(self.cols - 1, arg(1) - 1)
+        elif final == "d":
+            self.row = min(self.rows - 1, arg() - 1)
+        elif final == "e":
+            self.row = min(self.rows - 1, self.row + arg())
+        elif final == "J":
+            self._erase_display(arg(0, 0))
+        elif final == "K":
+            self._erase_line(arg(0, 0))
+        elif final == "X":
+            col = min(self.col, self.cols - 1)
+            self._fill(self.row, col, min(self.cols, col + arg()))
+        elif final == "@":
+            col = min(self.col, self.cols - 1)
+            line = self._grid[self.row]
+            count = min(arg(), self.cols - col)
+            line[col:col] = [" "] * count
+            del line[self.cols :]
+            self._touch(self.row)
+        elif final == "P":
+            col = min(self.col, self.cols - 1)
+            line = self._grid[self.row]
+            count = min(arg(), self.cols - col)
+            del line[col : col + count]
+            line.extend([" "] * count)
+            self._touch(self.row)
+        elif final == "L":
+            if self._top <= self.row <= self._bottom:
+                self._insert_lines(self.row, arg())
+        elif final == "M":
+            if self._top <= self.row <= self._bottom:
+                self._delete_lines(self.row, arg())
+        elif final == "S":
+            self._scroll_up(arg())
+        elif final == "T":
+            self._scroll_down(arg())
+        elif final == "r":
+            top = arg(0) - 1
+            bottom = arg(1, self.rows) - 1
+            if 0 <= top < bottom < self.rows:
+                self._top, self._bottom = top, bottom
+                self.row, self.col = 0, 0
+        elif final == "s":
+            self._saved = (self.row, self.col)
+        elif final == "u":
+            self.row, self.col = self._saved
+
+    # -- grid operations --------------------------------------------------
+    def _blank_row(self) -> List[str]:
+        return [" "] * self.cols
+
+    def _blank_grid(self) -> List[List[str]]:
+        return [self._blank_row() for _ in range(self.rows)]
+
+    def _touch(self, row: int) -> None:
+        self._row_rev[row] = self._rev
+
+    def _touch_range(self, start: int, end: int) -> None:
+        for row in range(start, end + 1):
+            self._row_rev[row] = self._rev
+
+    def _touch_all(self) -> None:
+        self._touch_range(0, self.rows - 1)
+
+    def _put_text(self, text: str) -> None:
+        while text:
+            if self.col >= self.cols:
+                self.col = 0
+                self._linefeed()
+            space = self.cols - self.col
+            piece = text[:space]
+            self._grid[self.row][self.col : self.col + len(piece)] = piece
+            self._touch(self.row)
+            self.col += len(piece)
+            text = text[space:]
+
+    def _fill(self, row: int, start: int, end: int) -> None:
+        if end > start:
+            self._grid[row][start:end] = [" "] * (end - start)
+            self._touch(row)
+
+    def _erase_line(self, mode: int) -> None:
+        col = min(self.col, self.cols - 1)
+        if mode == 0:
+            self._fill(self.row, col, self.cols)
+        elif mode == 1:
+            self._fill(self.row, 0, col + 1)
+        else:
+            self._fill(self.row, 0, self.cols)
+
+    def _erase_display(self, mode: int) -> None:
+        if mode == 0:
+            self._erase_line(0)
+            rows = range(self.row + 1, self.rows)
+        elif mode == 1:
+            self._erase_line(1)
+            rows = range(0, self.row)
+        else:
+            rows = range(0, self.rows)
+        for row in rows:
+            self._fill(row, 0, self.cols)
+
+    def _linefeed(self) -> None:
+        if self.row == self._bottom:
+            self._scroll_up(1)
+        elif self.row < self.rows - 1:
+            self.row += 1
+
+    def _scroll_up(self, count: int) -> None:
+        count = min(count, self._bottom - self._top + 1)
+        for _ in range(count):
+            line = self._grid.pop(self._top)
+            if self._top == 0 and self._grid is self._main and self.scrollback.maxlen:
+                self.scrollback.append((self._rev, "".join(line).rstrip()))
+            self._grid.insert(self._bottom, self._blank_row())
+        self._touch_range(self._top, self._bottom)
+
+    def _scroll_down(self, count: int) -> None:
+        count = min(count, self._bottom - self._top + 1)
+        for _ in range(count):
+            del self._grid[self._bottom]
+            self._grid.insert(self._top, self._blank_row())
+        self._touch_range(self._top, self._bottom)
+
+    def _insert_lines(self, row: int, count: int) -> None:
+        count = min(count, self._bottom - row + 1)
+        for _ in range(count):
+            del self._grid[self._bottom]
+            self._grid.insert(row, self._blank_row())
+        self._touch_range(row, self._bottom)
+
+    def _delete_lines(self, row: int, count: int) -> None:
+        count = min(count, self._bottom - row + 1)
+        for _ in range(count):
+            del self._grid[row]
+            self._grid.insert(self._bottom, self._blank_row())
+        self._touch_range(row, self._bottom)
+
+    def _set_alt_screen(self, enable: bool, save_cursor: bool) -> None:
+        if enable and self._alt is None:
+            if save_cursor:
+                self._saved = (self.row, self.col)
+            self._alt = self._blank_grid()
+            self._grid = self._alt
+        elif not enable and self._alt is not None:
+            self._alt = None
+            self._grid = self._main
+            if save_cursor:
+                self.row, self.col = self._saved
+        else:
+            return
+        self._touch_all()